@@ -0,0 +1,97 @@
+"""
+Serialization benchmark: request validation, response rendering and
+provider payloads, with and without the fast path.
+
+    python -m benchmarks.bench_serialization [--documents 8] [--doc-kb 256]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse
+
+from src.api.models import QueryRequest
+from src.api.responses import FastJSONResponse
+from src.core.serialization import backend, dumps, loads
+
+
+class UntypedQueryRequest(BaseModel):
+    """Previous request model: documents as free-form dicts"""
+    query: str = Field(..., min_length=1, max_length=2000)
+    context: Optional[Dict[str, Any]] = Field(default_factory=dict)
+    user_documents: Optional[List[Dict[str, Any]]] = None
+
+
+def build_payload(documents: int, doc_kb: int) -> bytes:
+    paragraph = "El agua hierve a 100 grados al nivel del mar. La presión cambia el punto de ebullición.\n\n"
+    content = (paragraph * (doc_kb * 1024 // len(paragraph) + 1))[:doc_kb * 1024]
+    return json.dumps({
+        "query": "¿A qué temperatura hierve el agua?",
+        "mode": "auto",
+        "user_documents": [
+            {"name": f"doc{i}.md", "content": content, "type": "text/markdown",
+             "size": len(content), "uploaded_at": "2024-01-01T00:00:00Z"}
+            for i in range(documents)
+        ]
+    }).encode("utf-8")
+
+
+def build_response(chunks: int) -> Dict[str, Any]:
+    return {
+        "response": "[NORMAL]Respuesta verificada.[/NORMAL] " * 50,
+        "metadata": {
+            "retrieval": {"chunk_ids": [f"doc.md#{i}" for i in range(chunks)]},
+            "verification": {"claims": [
+                {"text": f"Afirmación {i} con acentos y ñ", "supported": i % 3 != 0,
+                 "score": i / chunks, "chunk_ids": [f"doc.md#{i}"]}
+                for i in range(chunks)
+            ]}
+        }
+    }
+
+
+def bench(label: str, fn, number: int) -> float:
+    seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    print(f"  {label:<44} {seconds * 1000:9.3f} ms")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=8)
+    parser.add_argument("--doc-kb", type=int, default=256)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    body = build_payload(args.documents, args.doc_kb)
+    print(f"JSON backend: {backend()} | request body: {len(body) / 1024 / 1024:.1f} MiB")
+
+    print("Request parsing + validation")
+    old = bench("json.loads + untyped model", lambda: UntypedQueryRequest(**json.loads(body)), args.number)
+    new = bench("loads + typed model", lambda: QueryRequest(**loads(body)), args.number)
+    raw = bench("typed model_validate_json (bytes)", lambda: QueryRequest.model_validate_json(body), args.number)
+    print(f"  speedup: {old / new:.1f}x ({old / raw:.1f}x from raw bytes)")
+
+    response = build_response(500)
+    print("Response rendering")
+    old = bench("JSONResponse", lambda: JSONResponse(response), args.number * 10)
+    new = bench("FastJSONResponse", lambda: FastJSONResponse(response), args.number * 10)
+    print(f"  speedup: {old / new:.1f}x")
+
+    provider_body = json.dumps({"model": "gpt", "choices": [{"message": {"content": "x" * 20000}}]}).encode()
+    payload = {"model": "gpt", "messages": [{"role": "user", "content": body.decode("utf-8")}]}
+    print("Provider payloads")
+    old = bench("json.dumps(...).encode + json.loads", lambda: (json.dumps(payload).encode(), json.loads(provider_body)), args.number)
+    new = bench("dumps + loads (bytes)", lambda: (dumps(payload), loads(provider_body)), args.number)
+    print(f"  speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
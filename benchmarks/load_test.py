@@ -0,0 +1,332 @@
+"""
+Load test: concurrent comparison-UI users against a local mock provider.
+
+Each virtual user does what static/index.html does: validate the key once,
+then for every question send /api/query-raw and /api/query in parallel
+with its documents attached. Users arrive as a Poisson process; each stage
+in --rates runs for --duration seconds, and the report shows where the
+completed comparisons stop following the offered load.
+
+By default the server is started in a subprocess with its provider URLs
+pointed at the mock (SUBOTAI__LLM__PROVIDER_URLS). With --target, start
+the server yourself with that variable set to the printed mock URL.
+
+    python -m benchmarks.load_test [--rates 1,2,4,8] [--duration 20] [--users 64]
+                                   [--questions 3] [--documents 2] [--doc-kb 16]
+                                   [--provider-latency 0.4] [--target http://127.0.0.1:8000]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+QUESTIONS = [
+    "¿Qué dice el documento sobre los plazos de entrega?",
+    "¿Cuál es la capital de Australia?",
+    "Resume los puntos principales del informe",
+    "¿Quién escribió Cien años de soledad?",
+    "¿Qué riesgos menciona el documento y cómo se mitigan?",
+    "What does the report say about delivery deadlines?",
+]
+
+_WORDS = ("plazo entrega informe riesgo proveedor contrato calidad coste equipo "
+          "revisión cliente proyecto fase mitigación presupuesto calendario").split()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_documents(count: int, kb: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Synthetic documents shaped like the UI's uploads"""
+    rng = random.Random(seed)
+    documents = []
+    for i in range(count):
+        sentences, size = [], 0
+        while size < kb * 1024:
+            sentence = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+            sentences.append(sentence)
+            size += len(sentence) + 1
+        content = "\n\n".join(" ".join(sentences[j:j + 5]) for j in range(0, len(sentences), 5))
+        documents.append({
+            "name": f"informe_{i}.txt",
+            "content": content,
+            "type": "text/plain",
+            "size": len(content.encode("utf-8")),
+            "uploaded_at": "2024-01-01T00:00:00Z"
+        })
+    return documents
+
+
+def mock_provider(latency: float, jitter: float) -> Starlette:
+    """OpenAI-compatible chat completions with log-normal latency"""
+    sigma = math.sqrt(math.log(1 + jitter ** 2)) if jitter > 0 else 0.0
+    mu = math.log(latency) - sigma ** 2 / 2 if latency > 0 else 0.0
+    calls = Counter()
+
+    async def completions(request: Request):
+        body = await request.json()
+        calls["requests"] += 1
+        if latency > 0:
+            await asyncio.sleep(random.lognormvariate(mu, sigma))
+        prompt = body["messages"][-1]["content"]
+        content = "OK" if len(prompt) < 10 else (
+            "[NORMAL]Según el documento, los plazos de entrega dependen de la fase del proyecto.[/NORMAL] "
+            "[ROJO]Probablemente haya revisiones adicionales.[/ROJO]"
+        )
+        return JSONResponse({
+            "model": body.get("model", "mock"),
+            "choices": [{"message": {"role": "assistant", "content": content}}]
+        })
+
+    app = Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])])
+    app.state.calls = calls
+    return app
+
+
+async def start_mock(app: Starlette, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server
+
+
+def spawn_server(port: int, mock_url: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["SUBOTAI__LLM__PROVIDER_URLS"] = json.dumps({"openai": mock_url, "deepseek": mock_url})
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.join(os.path.dirname(__file__), '..'), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become healthy")
+
+
+class StageStats:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.latency: Dict[str, List[float]] = {"validate": [], "query-raw": [], "query": [], "comparison": []}
+        self.errors: Counter = Counter()
+        self.requests: Counter = Counter()
+        self.sessions = 0
+        self.shed = 0
+        self.active = 0
+        self.max_active = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        comparisons = len(self.latency["comparison"])
+        total_requests = sum(self.requests.values())
+        endpoints = {}
+        for name, values in self.latency.items():
+            array = np.asarray(values) * 1000 if values else None
+            endpoints[name] = {
+                "count": len(values),
+                "p50_ms": round(float(np.percentile(array, 50)), 1) if values else None,
+                "p95_ms": round(float(np.percentile(array, 95)), 1) if values else None,
+                "p99_ms": round(float(np.percentile(array, 99)), 1) if values else None,
+            }
+        return {
+            "offered_users_per_s": self.rate,
+            "sessions": self.sessions,
+            "shed_arrivals": self.shed,
+            "max_active_users": self.max_active,
+            "comparisons_per_s": round(comparisons / self.elapsed, 2) if self.elapsed else 0.0,
+            "requests_per_s": round(total_requests / self.elapsed, 2) if self.elapsed else 0.0,
+            "error_rate": round(sum(self.errors.values()) / total_requests, 4) if total_requests else 0.0,
+            "errors": dict(self.errors),
+            "endpoints": endpoints,
+        }
+
+
+async def timed(client: httpx.AsyncClient, stats: StageStats, name: str, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+    started = time.perf_counter()
+    stats.requests[name] += 1
+    try:
+        response = await client.post(path, **kwargs)
+    except httpx.HTTPError as e:
+        stats.errors[f"{name}:{type(e).__name__}"] += 1
+        return None
+    stats.latency[name].append(time.perf_counter() - started)
+    if response.status_code != 200:
+        stats.errors[f"{name}:{response.status_code}"] += 1
+        return None
+    data = response.json()
+    if data.get("error") or (data.get("metadata") or {}).get("error"):
+        stats.errors[f"{name}:error_body"] += 1
+    return data
+
+
+async def user_session(client: httpx.AsyncClient, stats: StageStats, args, documents, rng: random.Random):
+    stats.active += 1
+    stats.max_active = max(stats.max_active, stats.active)
+    try:
+        api_key = f"sk-load-{rng.randrange(10 ** 9)}"
+        if await timed(client, stats, "validate", "/api/validate-key",
+                       json={"api_key": api_key, "provider": "openai"}) is None:
+            return
+        headers = {"Authorization": f"Bearer {api_key}", "X-Provider": "openai", "X-Documents-Language": "es"}
+        for _ in range(args.questions):
+            query = rng.choice(QUESTIONS)
+            started = time.perf_counter()
+            raw, subotai = await asyncio.gather(
+                timed(client, stats, "query-raw", "/api/query-raw", headers=headers,
+                      json={"query": query, "user_documents": documents}),
+                timed(client, stats, "query", "/api/query", headers=headers,
+                      json={"query": query, "mode": "auto", "user_documents": documents}),
+            )
+            if raw is not None and subotai is not None:
+                stats.latency["comparison"].append(time.perf_counter() - started)
+            await asyncio.sleep(rng.expovariate(1.0 / args.think_time) if args.think_time > 0 else 0)
+    finally:
+        stats.active -= 1
+
+
+async def run_stage(client: httpx.AsyncClient, rate: float, args, documents, rng: random.Random) -> StageStats:
+    stats = StageStats(rate)
+    sessions = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < args.duration:
+        await asyncio.sleep(rng.expovariate(rate))
+        if stats.active >= args.users:
+            stats.shed += 1
+            continue
+        stats.sessions += 1
+        sessions.append(asyncio.ensure_future(user_session(client, stats, args, documents, rng)))
+    if sessions:
+        await asyncio.wait(sessions, timeout=args.drain_timeout)
+        for task in sessions:
+            task.cancel()
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def find_saturation(summaries: List[Dict[str, Any]], questions: int) -> Optional[float]:
+    """First stage whose throughput falls behind the offered load, p95 doubles or errors exceed 1%"""
+    baseline = summaries[0]["endpoints"]["comparison"]["p95_ms"] if summaries else None
+    for summary in summaries:
+        offered = summary["offered_users_per_s"] * questions
+        p95 = summary["endpoints"]["comparison"]["p95_ms"]
+        if (summary["comparisons_per_s"] < 0.8 * offered or summary["error_rate"] > 0.01
+                or summary["shed_arrivals"] or (baseline and p95 and p95 > 2 * baseline)):
+            return summary["offered_users_per_s"]
+    return None
+
+
+def print_report(summaries: List[Dict[str, Any]], saturation: Optional[float], provider_calls: int):
+    print(f"\n{'users/s':>8} {'sessions':>8} {'active':>6} {'cmp/s':>7} {'req/s':>7} {'errors':>7}"
+          f" {'cmp p50':>9} {'cmp p95':>9} {'cmp p99':>9} {'query p95':>10} {'raw p95':>9}")
+    for s in summaries:
+        cmp_ = s["endpoints"]["comparison"]
+        print(f"{s['offered_users_per_s']:>8.2f} {s['sessions']:>8d} {s['max_active_users']:>6d}"
+              f" {s['comparisons_per_s']:>7.2f} {s['requests_per_s']:>7.2f} {s['error_rate']:>7.2%}"
+              f" {cmp_['p50_ms'] or 0:>9.1f} {cmp_['p95_ms'] or 0:>9.1f} {cmp_['p99_ms'] or 0:>9.1f}"
+              f" {s['endpoints']['query']['p95_ms'] or 0:>10.1f} {s['endpoints']['query-raw']['p95_ms'] or 0:>9.1f}")
+        if s["errors"]:
+            print(f"{'':>8} errors: {s['errors']}")
+    print(f"\nMock provider calls: {provider_calls}")
+    if saturation is None:
+        print("No saturation within the tested rates")
+    else:
+        print(f"Saturation begins at ~{saturation:g} users/s (throughput behind offered load, p95 x2 or errors > 1%)")
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    mock_port = args.mock_port or free_port()
+    mock_app = mock_provider(args.provider_latency, args.provider_jitter)
+    mock = await start_mock(mock_app, mock_port)
+    mock_url = f"http://127.0.0.1:{mock_port}/v1/chat/completions"
+
+    server = None
+    target = args.target
+    if target is None:
+        port = free_port()
+        server = spawn_server(port, mock_url)
+        target = f"http://127.0.0.1:{port}"
+    else:
+        print(f"Start the server with SUBOTAI__LLM__PROVIDER_URLS='{json.dumps({'openai': mock_url})}'")
+
+    documents = make_documents(args.documents, args.doc_kb, args.seed)
+    limits = httpx.Limits(max_connections=args.users * 2 + 8, max_keepalive_connections=args.users * 2 + 8)
+    summaries = []
+    try:
+        async with httpx.AsyncClient(base_url=target, limits=limits, timeout=args.request_timeout) as client:
+            await wait_ready(client)
+            print(f"Target {target} | mock provider {args.provider_latency * 1000:.0f} ms | "
+                  f"{args.documents} docs x {args.doc_kb} KiB | {args.questions} questions per user")
+            for rate in args.rates:
+                stats = await run_stage(client, rate, args, documents, rng)
+                summaries.append(stats.summary())
+                print(f"  stage {rate:g} users/s: {summaries[-1]['comparisons_per_s']} comparisons/s")
+        saturation = find_saturation(summaries, args.questions)
+        print_report(summaries, saturation, mock_app.state.calls["requests"])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        mock.should_exit = True
+        await asyncio.sleep(0.1)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"stages": summaries, "saturation_users_per_s": saturation}, f, indent=2)
+    return summaries
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", type=lambda v: [float(x) for x in v.split(",")], default=[1, 2, 4, 8],
+                        help="user arrival rates per second, one stage each")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of arrivals per stage")
+    parser.add_argument("--users", type=int, default=64, help="max concurrent users (extra arrivals are shed)")
+    parser.add_argument("--questions", type=int, default=3, help="comparisons per user")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds between a user's questions")
+    parser.add_argument("--documents", type=int, default=2, help="documents attached per user")
+    parser.add_argument("--doc-kb", type=int, default=16, help="size of each document in KiB")
+    parser.add_argument("--provider-latency", type=float, default=0.4, help="mean mock provider latency in seconds")
+    parser.add_argument("--provider-jitter", type=float, default=0.3, help="coefficient of variation of that latency")
+    parser.add_argument("--target", default=None, help="running server URL (default: start one)")
+    parser.add_argument("--mock-port", type=int, default=None)
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="seconds to wait for users after a stage")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,3 +2,4 @@
 SUBOTAI - Strategic AI Reasoning Engine
 """
 
+__version__ = "1.0.0"
@@ -0,0 +1,169 @@
+"""
+Rutas de administración para SUBOTAI - Configuración en caliente
+"""
+
+import os
+import secrets
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from src.core.config import config_manager, get_config
+from src.core.profiling import ProfilerBusy, cpu_profiler, memory_profiler
+from src.core.query_log import query_log, read_log, server_documents, summarize
+from src.core.warmup import cache_warmer
+from src.rag.bulk_ingest import bulk_ingestor
+from src.rag.knowledge_base import knowledge_base
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+ADMIN_TOKEN_ENV = "SUBOTAI_ADMIN_TOKEN"
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Admin endpoints are disabled unless SUBOTAI_ADMIN_TOKEN is set"""
+    expected = os.environ.get(ADMIN_TOKEN_ENV)
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+
+@router.get("/config", dependencies=[Depends(require_admin)])
+async def get_active_config() -> Dict[str, Any]:
+    """Configuración activa, versión y momento de la última recarga"""
+    return config_manager.to_dict()
+
+
+@router.patch("/config", dependencies=[Depends(require_admin)])
+async def update_config(overrides: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+    """
+    Aplica cambios parciales sobre la configuración activa, sin reiniciar.
+
+    Body (ejemplo):
+        {"llm": {"timeout": 15}, "retrieval": {"top_k": 4}}
+    """
+    try:
+        config_manager.update(overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.info(f"⚙️ Configuración actualizada en caliente: {sorted(overrides)}")
+    return config_manager.to_dict()
+
+
+@router.post("/config/reload", dependencies=[Depends(require_admin)])
+async def reload_config() -> Dict[str, Any]:
+    """Recarga desde el fichero (SUBOTAI_CONFIG_FILE) y variables SUBOTAI__*; descarta cambios en caliente"""
+    try:
+        config_manager.reload()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Config not reloaded: {e}")
+    return config_manager.to_dict()
+
+
+@router.get("/warmup", dependencies=[Depends(require_admin)])
+async def get_warmup() -> Dict[str, Any]:
+    """Estado del pre-calentamiento de cachés"""
+    return cache_warmer.get_stats()
+
+
+@router.post("/warmup", dependencies=[Depends(require_admin)])
+async def start_warmup() -> Dict[str, Any]:
+    """Lanza el pre-calentamiento en segundo plano con el corpus configurado (warmup.corpus)"""
+    if not cache_warmer.start():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Warm-up already running")
+    return cache_warmer.get_stats()
+
+
+@router.get("/ingest", dependencies=[Depends(require_admin)])
+async def get_ingest() -> Dict[str, Any]:
+    """Progreso de la última ingesta (ficheros, shards, bytes, MB/s) y corpus activo"""
+    return {"job": bulk_ingestor.get_stats(), "knowledge_base": knowledge_base.get_stats()}
+
+
+@router.post("/ingest", dependencies=[Depends(require_admin)])
+async def start_ingest(
+    path: Optional[str] = None,
+    workers: Optional[int] = Query(None, ge=0, le=256)
+) -> Dict[str, Any]:
+    """
+    Re-importa una carpeta de documentos (por defecto la actual) en el pool
+    de procesos. Las consultas usan el corpus anterior hasta que termina.
+    """
+    path = path or knowledge_base.documents_path
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Not a directory: {path}")
+    if not bulk_ingestor.start(path, lambda corpus: knowledge_base.install(corpus, path), workers=workers):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Ingestion already running")
+    return {"job": bulk_ingestor.get_stats()}
+
+
+@router.get("/query-log", dependencies=[Depends(require_admin)])
+async def get_query_log(top: int = 10) -> Dict[str, Any]:
+    """Estado del escritor y resumen del registro: preguntas frecuentes, etapas lentas, documentos sin uso"""
+    summary = await run_in_threadpool(
+        lambda: summarize(
+            read_log(get_config().query_log.directory), server_documents(knowledge_base.documents_path), top=top
+        )
+    )
+    return {"writer": query_log.get_stats(), "summary": summary}
+
+
+@router.post("/profile/cpu", dependencies=[Depends(require_admin)], response_class=PlainTextResponse)
+async def profile_cpu(
+    seconds: float = Query(10.0, gt=0, le=120),
+    mode: str = Query("sample", pattern="^(sample|cprofile)$"),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    idle: bool = False,
+    top: int = Query(50, ge=1, le=1000)
+) -> PlainTextResponse:
+    """
+    Perfil de CPU durante `seconds` sobre las peticiones en curso.
+    mode=sample: pilas colapsadas (flamegraph.pl, speedscope); mode=cprofile: tabla pstats.
+    """
+    try:
+        output = await cpu_profiler.profile(seconds, mode=mode, interval=interval_ms / 1000, idle=idle, top=top)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return PlainTextResponse(output)
+
+
+@router.post("/profile/memory/start", dependencies=[Depends(require_admin)])
+async def start_memory_profile(frames: int = Query(25, ge=1, le=100)) -> Dict[str, Any]:
+    """Activa tracemalloc (con coste en cada asignación hasta /profile/memory/stop)"""
+    return memory_profiler.start(frames)
+
+
+@router.get("/profile/memory/snapshot", dependencies=[Depends(require_admin)])
+async def memory_snapshot(
+    top: int = Query(25, ge=1, le=500),
+    key: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    baseline: bool = False
+) -> Dict[str, Any]:
+    """Mayores asignaciones y totales por área (base de conocimiento, cachés, buffers de peticiones)"""
+    try:
+        return await run_in_threadpool(memory_profiler.snapshot, top, key, baseline)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get("/profile/memory/diff", dependencies=[Depends(require_admin)])
+async def memory_diff(
+    top: int = Query(25, ge=1, le=500),
+    key: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+) -> Dict[str, Any]:
+    """Diferencia con la instantánea tomada con baseline=true"""
+    try:
+        return await run_in_threadpool(memory_profiler.diff, top, key)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.post("/profile/memory/stop", dependencies=[Depends(require_admin)])
+async def stop_memory_profile() -> Dict[str, Any]:
+    return memory_profiler.stop()
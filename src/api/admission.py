@@ -0,0 +1,184 @@
+"""
+Admission control and load shedding for SUBOTAI API routes
+"""
+
+import math
+import time
+import asyncio
+import logging
+import itertools
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from src.core.config import AdmissionConfig, get_config
+from src.llm.scheduler import current_workload
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first when a slot frees up
+PRIORITIES = {'interactive': 0, 'batch': 1, 'warmup': 2}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, route: str, reason: str, retry_after: int):
+        super().__init__(f"Request to {route} rejected: {reason}")
+        self.route = route
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Global in-flight cap with a bounded FIFO wait queue per route.
+    Freed slots go to the waiting request with the best priority class,
+    oldest first. Limits are read from the active config on every call so
+    they can be tuned at runtime.
+    """
+
+    def __init__(self, config: Optional[AdmissionConfig] = None):
+        self._config = config
+        self.in_flight = 0
+        self._queues: Dict[str, Deque[Tuple[int, asyncio.Future]]] = {}
+        self._sequence = itertools.count()
+        self._admitted: Dict[str, int] = {}
+        self._rejected: Dict[str, Dict[str, int]] = {}
+        # Exponentially weighted service time, used for Retry-After
+        self._service_time = 1.0
+
+    @property
+    def config(self) -> AdmissionConfig:
+        return self._config or get_config().admission
+
+    def route_class(self, route: str) -> Optional[str]:
+        config = self.config
+        if not config.enabled:
+            return None
+        return config.routes.get(route)
+
+    def _priority(self, route: str) -> int:
+        return PRIORITIES.get(self.config.routes.get(route, 'batch'), len(PRIORITIES))
+
+    def _has_priority_waiters(self, priority: int) -> bool:
+        return any(queue and self._priority(route) <= priority for route, queue in self._queues.items())
+
+    def retry_after(self) -> int:
+        waiting = sum(len(q) for q in self._queues.values())
+        slots = max(self.config.max_in_flight, 1)
+        return max(1, math.ceil((waiting + 1) * self._service_time / slots))
+
+    def _reject(self, route: str, reason: str) -> AdmissionRejected:
+        counts = self._rejected.setdefault(route, {})
+        counts[reason] = counts.get(reason, 0) + 1
+        logger.warning(f"Admission: shedding request to {route} ({reason})")
+        return AdmissionRejected(route, reason, self.retry_after())
+
+    async def acquire(self, route: str):
+        """Take an execution slot or wait for one; raises AdmissionRejected"""
+        config = self.config
+        priority = self._priority(route)
+
+        if self.in_flight < config.max_in_flight and not self._has_priority_waiters(priority):
+            self.in_flight += 1
+            self._admitted[route] = self._admitted.get(route, 0) + 1
+            return
+
+        queue = self._queues.setdefault(route, deque())
+        queue_size = config.queue_sizes.get(config.routes.get(route, 'batch'), 0)
+        if len(queue) >= queue_size:
+            raise self._reject(route, "queue_full")
+
+        entry = (next(self._sequence), asyncio.get_running_loop().create_future())
+        queue.append(entry)
+        try:
+            await asyncio.wait_for(entry[1], timeout=config.max_queue_wait)
+        except asyncio.TimeoutError:
+            raise self._reject(route, "queue_timeout")
+        finally:
+            if entry in queue:
+                queue.remove(entry)
+        self._admitted[route] = self._admitted.get(route, 0) + 1
+
+    def release(self, route: str, elapsed: Optional[float] = None):
+        """Free a slot and hand it to the next waiter"""
+        self.in_flight = max(self.in_flight - 1, 0)
+        if elapsed is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.in_flight < self.config.max_in_flight:
+            candidates = [
+                (self._priority(route), queue[0][0], route)
+                for route, queue in self._queues.items() if queue
+            ]
+            if not candidates:
+                return
+            _, _, route = min(candidates)
+            _, future = self._queues[route].popleft()
+            if future.done():
+                continue  # Waiter already timed out or was cancelled
+            self.in_flight += 1
+            future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        config = self.config
+        return {
+            "enabled": config.enabled,
+            "in_flight": self.in_flight,
+            "max_in_flight": config.max_in_flight,
+            "queue_depth": {route: len(q) for route, q in self._queues.items()},
+            "admitted": dict(self._admitted),
+            "rejected": {route: dict(counts) for route, counts in self._rejected.items()},
+            "avg_service_time": round(self._service_time, 4)
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the admission controller to configured routes"""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] == "OPTIONS"
+                or self.controller.route_class(scope["path"]) is None):
+            await self.app(scope, receive, send)
+            return
+
+        route = scope["path"]
+        # Clase de las llamadas al LLM de la petición: la de la ruta, o una más baja (X-Workload)
+        workload = self.controller.route_class(route)
+        requested = dict(scope["headers"]).get(b"x-workload", b"").decode("latin-1").lower()
+        if PRIORITIES.get(requested, -1) > PRIORITIES.get(workload, len(PRIORITIES)):
+            workload = requested
+        current_workload.set(workload)
+
+        try:
+            await self.controller.acquire(route)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=503,
+                content={
+                    "error": True,
+                    "message": "Server overloaded, retry later",
+                    "details": {"route": route, "reason": e.reason}
+                },
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route, time.perf_counter() - started)
+
+
+# Global instance
+admission_controller = AdmissionController()
@@ -5,13 +5,23 @@ Main application with web interface and API
 
 import logging
 import os
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
 
 from .routes import router as api_router
+from .admission import AdmissionMiddleware, admission_controller
+from .responses import FastJSONResponse
+from .static_assets import StaticAssetStore, HTML_CACHE_CONTROL, ASSET_CACHE_CONTROL
+from src import __version__
+from src.core.config import get_config
 from src.core.subotai_core import get_subotai_core
+from src.core.warmup import cache_warmer
+from src.rag.bulk_ingest import bulk_ingestor
+from src.core.query_log import query_log
+from src.llm.llm_client import llm_client
+from src.llm.scheduler import llm_scheduler
 
 # Configure logging
 logging.basicConfig(
@@ -27,12 +37,18 @@ def create_app() -> FastAPI:
     app = FastAPI(
         title="SUBOTAI Reasoning Engine API",
         description="REST API for SUBOTAI - Advanced reasoning system with Truth Shield, Quality Gate, and multiple reasoning modes",
-        version="1.0.0",
+        version=__version__,
         docs_url="/docs",
         redoc_url="/redoc",
-        openapi_url="/openapi.json"
+        openapi_url="/openapi.json",
+        default_response_class=FastJSONResponse
     )
     
+    # Admission control: cap in-flight requests and shed load early (503 + Retry-After).
+    # Registered before CORS so it runs inside it: 503s carry CORS headers and
+    # preflights are answered without taking a slot
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+    
     # Configure CORS
     app.add_middleware(
         CORSMiddleware,
@@ -42,13 +58,25 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
-    # Serve static files (web interface)
+    # Compress large API responses (precompressed static assets are left untouched)
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+    
+    # Serve static files (web interface) from memory, precompressed and content-hashed
     static_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "static")
     os.makedirs(static_dir, exist_ok=True)  # Create static directory if it doesn't exist
     
-    if os.path.exists(static_dir):
-        app.mount("/static", StaticFiles(directory=static_dir), name="static")
-        logger.info(f"Static files mounted at /static from {static_dir}")
+    static_store = StaticAssetStore(static_dir)
+    static_store.load()
+    app.state.static_assets = static_store
+    logger.info(f"Static files served at /static from memory ({static_dir})")
+    
+    @app.get("/static/{path:path}", include_in_schema=False)
+    async def serve_static(path: str, request: Request):
+        """Serve a static asset from memory"""
+        asset = static_store.get(path)
+        if asset is None:
+            return JSONResponse(content={"detail": "Not Found"}, status_code=404)
+        return static_store.response(request, asset, ASSET_CACHE_CONTROL)
     
     # Include API routes
     app.include_router(api_router, prefix="/api")
@@ -57,13 +85,17 @@ def create_app() -> FastAPI:
     from .auth_routes import router as auth_router
     app.include_router(auth_router, prefix="/api")
     
+    # Include admin routes (require X-Admin-Token)
+    from .admin_routes import router as admin_router
+    app.include_router(admin_router, prefix="/api/admin")
+    
     # Web interface route
     @app.get("/app")
-    async def serve_web_interface():
+    async def serve_web_interface(request: Request):
         """Servir la interfaz web de comparación"""
-        html_path = os.path.join(static_dir, "index.html")
-        if os.path.exists(html_path):
-            return FileResponse(html_path)
+        asset = static_store.get("index.html")
+        if asset is not None:
+            return static_store.response(request, asset, HTML_CACHE_CONTROL)
         else:
             return JSONResponse(
                 content={
@@ -85,7 +117,7 @@ def create_app() -> FastAPI:
         return {
             "message": "SUBOTAI Reasoning Engine API",
             "status": "operational", 
-            "version": "1.0.0",
+            "version": __version__,
             "web_interface": "/app",
             "documentation": "/docs",
             "api_docs": "/redoc",
@@ -114,9 +146,20 @@ def create_app() -> FastAPI:
             subotai = get_subotai_core()
             if subotai.initialize():
                 logger.info("✓ SUBOTAI core initialized successfully")
-                logger.info("✓ Version: 1.0.0")
+                logger.info(f"✓ Version: {__version__}")
                 logger.info("✓ All subsystems operational")
                 logger.info("=" * 60)
+                # Instantánea de estado para /health y /status
+                subotai.status_monitor.add_source("admission", admission_controller.get_stats)
+                subotai.status_monitor.add_source("scheduler", llm_scheduler.get_stats)
+                subotai.status_monitor.add_source("warmup", lambda: {"job": cache_warmer.get_stats()})
+                subotai.status_monitor.add_source("ingestion", lambda: {"job": bulk_ingestor.get_stats()})
+                subotai.status_monitor.start()
+                # Registro de consultas: escritor en segundo plano
+                query_log.start()
+                # Pre-calentar cachés en segundo plano; el servidor ya acepta tráfico
+                if get_config().warmup.enabled:
+                    cache_warmer.start()
             else:
                 logger.error("✗ Failed to initialize SUBOTAI core")
         except Exception as e:
@@ -128,6 +171,11 @@ def create_app() -> FastAPI:
     async def shutdown_event():
         logger.info("=" * 60)
         logger.info("Shutting down SUBOTAI API server...")
+        await cache_warmer.stop()
+        await bulk_ingestor.stop()
+        await get_subotai_core().status_monitor.stop()
+        await query_log.stop()
+        await llm_client.aclose()
         logger.info("=" * 60)
     
     # Global exception handler
@@ -0,0 +1,52 @@
+"""
+Request cancellation: client disconnects and deadlines
+"""
+
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Any, Awaitable, Optional
+
+from fastapi import Request
+
+from src.core.deadline import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before the response is ready"""
+
+
+async def run_cancellable(
+    request: Request,
+    work: Awaitable[Any],
+    deadline: Optional[Deadline] = None,
+    poll_interval: float = 0.25
+) -> Any:
+    """
+    Run `work` as a task and cancel it when the client disconnects or the
+    deadline passes. Cancellation propagates into the pending httpx call,
+    which closes the upstream connection instead of letting the provider
+    keep generating tokens.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            timeout = poll_interval
+            if deadline is not None:
+                timeout = min(timeout, max(deadline.remaining(), 0.0))
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+            if done:
+                return task.result()
+            if deadline is not None and deadline.expired():
+                logger.warning(f"Deadline exceeded on {request.url.path}, cancelling upstream work")
+                raise DeadlineExceeded()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected from {request.url.path}, cancelling upstream work")
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
@@ -15,14 +15,25 @@ class ProcessingMode(str, Enum):
     DEBATE = "debate"
     STEPS = "steps"
     FAST = "fast"
+    EXTRACTIVE = "extractive"
+
+
+class UserDocument(BaseModel):
+    """Document sent inline from the browser (larger files: POST /api/documents)"""
+    name: str = Field(..., min_length=1, max_length=255, description="File name")
+    content: str = Field(..., max_length=2_000_000, description="Document text")
+    type: Optional[str] = Field(default=None, max_length=128, description="MIME type")
+    size: Optional[int] = Field(default=None, ge=0, description="Original size in bytes")
+    uploaded_at: Optional[str] = Field(default=None, max_length=64, description="Upload timestamp")
 
 
 class QueryRequest(BaseModel):
     """Request model for query processing"""
     query: str = Field(..., min_length=1, max_length=2000, description="User query to process")
-    context: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Additional context")
+    context: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Additional client context (accepted, not used by the pipeline)")
     mode: ProcessingMode = Field(default=ProcessingMode.AUTO, description="Processing mode override")
-    user_documents: Optional[List[Dict[str, Any]]] = Field(default=None, description="User-uploaded documents from browser")
+    user_documents: Optional[List[UserDocument]] = Field(default=None, max_length=16, description="User-uploaded documents from browser")
+    document_ids: Optional[List[str]] = Field(default=None, max_length=32, description="Handles returned by POST /api/documents")
     
     class Config:
         json_schema_extra = {
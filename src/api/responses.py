@@ -0,0 +1,16 @@
+"""
+Response classes for the SUBOTAI API
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from src.core.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available (compact, UTF-8, numpy-aware)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
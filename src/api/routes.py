@@ -3,15 +3,25 @@ SUBOTAI API Routes - REST endpoints for all functionality
 """
 
 import logging
-from fastapi import APIRouter, HTTPException, status, Depends, Header
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Request, Response
 from typing import Dict, Any, Optional
 
 from .models import (
     QueryRequest, QueryResponse, SystemStatusResponse, 
-    HealthResponse, ErrorResponse, ProcessingMode
+    HealthResponse, ErrorResponse
 )
 from src.core.subotai_core import get_subotai_core, SubotaiCore
 from src.llm.llm_client import llm_client
+from src.llm.scheduler import llm_scheduler
+from src.core.deadline import Deadline, DeadlineExceeded
+from src.core.metrics import mode_latency
+from src.logic.cascade import model_cascade
+from src.core.speculation import speculation
+from .admission import admission_controller
+from .cancellation import ClientDisconnected, run_cancellable
+from .uploads import UploadRejected, receive_documents
+from src.rag.analyzers import normalize_language
+from src.rag.document_store import document_store
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +33,40 @@ def get_subotai() -> SubotaiCore:
     return get_subotai_core()
 
 
+# Non-standard status used by nginx for "client closed request"
+CLIENT_CLOSED_REQUEST = 499
+
+
+def get_tenant(authorization: Optional[str] = Header(None)) -> str:
+    """Dependency requiring the Bearer API key; returns its fingerprint (never the key)"""
+    if not authorization or not authorization.startswith("Bearer ") or not authorization.split(" ")[1]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="API key required (Authorization: Bearer <api_key>)"
+        )
+    return llm_scheduler.tenant_for(authorization.split(" ")[1])
+
+
+def get_deadline(
+    x_deadline: Optional[str] = Header(None, alias="X-Deadline"),
+    x_request_timeout: Optional[str] = Header(None, alias="X-Request-Timeout")
+) -> Optional[Deadline]:
+    """Dependency building the request deadline from headers"""
+    try:
+        deadline = Deadline.from_headers(x_deadline, x_request_timeout)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid X-Deadline / X-Request-Timeout header"
+        )
+    if deadline is not None and deadline.expired():
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Deadline already exceeded"
+        )
+    return deadline
+
+
 @router.post(
     "/query",
     response_model=QueryResponse,
@@ -31,14 +75,17 @@ def get_subotai() -> SubotaiCore:
     responses={
         200: {"model": QueryResponse, "description": "Query processed successfully"},
         400: {"model": ErrorResponse, "description": "Invalid request"},
-        500: {"model": ErrorResponse, "description": "Internal server error"}
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        504: {"model": ErrorResponse, "description": "Deadline exceeded"}
     }
 )
 async def process_query(
     request: QueryRequest,
+    http_request: Request,
     authorization: Optional[str] = Header(None),
     x_provider: Optional[str] = Header(None, alias="X-Provider"),
     x_docs_language: Optional[str] = Header(None, alias="X-Documents-Language"),
+    deadline: Optional[Deadline] = Depends(get_deadline),
     subotai: SubotaiCore = Depends(get_subotai)
 ) -> QueryResponse:
     """
@@ -51,9 +98,14 @@ async def process_query(
     - Response Formatting (structured output)
     
     Returns both the formatted response and comprehensive metadata about the processing.
+    
+    Optional X-Deadline (unix timestamp) or X-Request-Timeout (seconds) headers
+    bound the whole pipeline. Work is cancelled if the client disconnects.
     """
     try:
-        context = request.context or {}
+        # The pipeline context is built only from headers and typed, size-bounded
+        # request fields; the free-form `request.context` is never forwarded
+        context: Dict[str, Any] = {}
         
         # Extraer API key del header
         if authorization and authorization.startswith("Bearer "):
@@ -66,28 +118,52 @@ async def process_query(
             context['provider'] = 'openai'  # Por defecto
         
         # Obtener idioma de los documentos del header
-        if x_docs_language:
-            context['docs_language'] = x_docs_language.lower()
-        else:
-            context['docs_language'] = 'es'  # Por defecto español
+        # (solo los admitidos: cada idioma nuevo crearía un analizador y un índice del corpus)
+        context['docs_language'] = normalize_language(x_docs_language)  # Por defecto español
+        if x_docs_language and context['docs_language'] != x_docs_language.lower().split('-')[0]:
+            logger.warning(f"Idioma de documentos no admitido: {x_docs_language!r}, se usa 'es'")
         
         # ✅ Añadir documentos de usuario al contexto
         if request.user_documents:
-            context['user_documents'] = request.user_documents
+            context['user_documents'] = [
+                {"name": doc.name, "content": doc.content} for doc in request.user_documents
+            ]
             logger.info(f"📁 Usuario envió {len(request.user_documents)} documentos")
         
-        if request.mode != ProcessingMode.AUTO:
-            context['forced_mode'] = request.mode.value
+        # Documentos subidos antes por streaming (POST /documents)
+        if request.document_ids:
+            try:
+                context['stored_documents'] = document_store.resolve(
+                    request.document_ids, llm_scheduler.tenant_for(context.get('api_key') or '')
+                )
+            except KeyError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Unknown or expired document handle: {e.args[0]}"
+                )
+        
+        # Always from the validated enum: the mode labels metrics and the query log
+        context['forced_mode'] = request.mode.value
         
         context['clean_output'] = True
+        context['deadline'] = deadline
         
-        result = await subotai.process_query(request.query, context)
+        result = await run_cancellable(http_request, subotai.process_query(request.query, context), deadline)
         
         return QueryResponse(
             response=result["response"],
             metadata=result["metadata"]
         )
         
+    except HTTPException:
+        raise
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except DeadlineExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Deadline exceeded while processing query"
+        )
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(
@@ -213,6 +289,114 @@ async def get_metrics(
         )
 
 
+@router.get(
+    "/admission",
+    summary="Get admission control stats",
+    description="In-flight requests, queue depth per route and rejection counts",
+    responses={
+        200: {"description": "Admission stats retrieved successfully"}
+    }
+)
+async def get_admission_stats() -> Dict[str, Any]:
+    """
+    Admission control counters:
+    - In-flight requests and configured cap
+    - Queue depth per route
+    - Admitted and rejected (queue_full / queue_timeout) counts per route
+    """
+    return admission_controller.get_stats()
+
+
+@router.get(
+    "/scheduler",
+    summary="Get LLM call scheduler stats",
+    description="Queue wait per priority class against its objective, in-flight calls and queues per tenant",
+    responses={
+        200: {"description": "Scheduler stats retrieved successfully"}
+    }
+)
+async def get_scheduler_stats() -> Dict[str, Any]:
+    """
+    Weighted fair scheduling of upstream LLM calls:
+    - In-flight calls and global cap
+    - Per class: weight, queued, dispatched, rejected and wait percentiles vs objective
+    - Waiting queues per tenant (API key fingerprint) and class, with their deficit
+    """
+    return llm_scheduler.get_stats()
+
+
+@router.get(
+    "/latency",
+    summary="Get latency per processing mode and cascade tier",
+    description="End-to-end latency histograms per processing mode (with share of requests within the mode budget) and model cascade stats",
+    responses={
+        200: {"description": "Latency histograms retrieved successfully"}
+    }
+)
+async def get_latency(
+    subotai: SubotaiCore = Depends(get_subotai)
+) -> Dict[str, Any]:
+    """
+    Latency per mode (auto, normal, fast, strict, ...):
+    - count, mean, p50/p95/p99 (bucket upper bounds) and max in ms
+    - within_budget: share of requests finished inside the profile timeout
+    - answer cache hit rate (cache-first modes)
+    - model cascade: escalation rate and latency per tier
+    - speculative direct answers: time saved and tokens wasted
+    """
+    return {
+        "modes": mode_latency.snapshot(),
+        "answer_cache": subotai.answer_cache.get_stats(),
+        "cascade": model_cascade.get_stats(),
+        "speculation": speculation.get_stats()
+    }
+
+
+@router.post(
+    "/documents",
+    summary="Upload documents",
+    description="Stream documents (multipart/form-data or raw body) into the document store and get handles for /query",
+    responses={
+        200: {"description": "Documents ingested"},
+        400: {"model": ErrorResponse, "description": "Malformed upload"},
+        401: {"model": ErrorResponse, "description": "Missing API key"},
+        413: {"model": ErrorResponse, "description": "Size or count limit exceeded"}
+    }
+)
+async def upload_documents(http_request: Request, tenant: str = Depends(get_tenant)) -> Dict[str, Any]:
+    """
+    Upload documents without embedding them in the query JSON.
+    
+    The body is streamed to spool files and limits (file size, file count,
+    request size) are enforced while it arrives. Each document is chunked
+    and indexed once; pass the returned handles as `document_ids` in /query.
+    
+    Raw uploads name the document with the X-Filename header. Requires the
+    same Bearer API key as /query; handles only work with that key.
+    """
+    try:
+        documents = await receive_documents(http_request, tenant)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    return {"documents": documents, "count": len(documents)}
+
+
+@router.delete(
+    "/documents/{handle}",
+    summary="Delete an uploaded document",
+    responses={
+        200: {"description": "Document deleted"},
+        401: {"model": ErrorResponse, "description": "Missing API key"},
+        404: {"model": ErrorResponse, "description": "Unknown document handle"}
+    }
+)
+async def delete_document(handle: str, tenant: str = Depends(get_tenant)) -> Dict[str, Any]:
+    """Drop an uploaded document (of the caller's API key) before its handle expires"""
+    if not document_store.remove(handle, tenant):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown document handle")
+    return {"deleted": handle}
+
+
 @router.post(
     "/query-raw",
     summary="Query LLM directly without SUBOTAI filters",
@@ -225,8 +409,10 @@ async def get_metrics(
 )
 async def query_raw(
     request: QueryRequest,
+    http_request: Request,
     authorization: Optional[str] = Header(None),
-    x_provider: Optional[str] = Header(None, alias="X-Provider")
+    x_provider: Optional[str] = Header(None, alias="X-Provider"),
+    deadline: Optional[Deadline] = Depends(get_deadline)
 ) -> Dict[str, Any]:
     """
     Query the LLM directly without SUBOTAI processing.
@@ -248,18 +434,35 @@ async def query_raw(
         api_key = authorization.split(" ")[1]
         provider = x_provider.lower() if x_provider else "openai"
         
-        # USAR CLIENTE UNIFICADO
-        result = await llm_client.query(
-            prompt=request.query,
-            api_key=api_key,
-            provider=provider
-        )
+        # Reusar la llamada especulativa de /api/query para la misma consulta, si la hay
+        result = None
+        speculative = speculation.claim(speculation.key(api_key, provider, request.query))
+        if speculative is not None:
+            try:
+                result = await run_cancellable(http_request, speculation.wait(speculative), deadline)
+            except (ClientDisconnected, DeadlineExceeded):
+                raise
+            except Exception:
+                result = None
+            if result is not None and not result["success"]:
+                result = None
+        
+        # USAR CLIENTE UNIFICADO (cancelado si el cliente se desconecta)
+        if result is None:
+            speculative = None
+            result = await run_cancellable(http_request, llm_client.query(
+                prompt=request.query,
+                api_key=api_key,
+                provider=provider,
+                deadline=deadline
+            ), deadline)
         
         if result["success"]:
             return {
                 "response": result["response"],
                 "provider": provider,
-                "filtered": False
+                "filtered": False,
+                **({"speculative": True} if speculative is not None else {})
             }
         else:
             return {
@@ -269,6 +472,15 @@ async def query_raw(
                 "error": result["error"]
             }
         
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except DeadlineExceeded:
+        return {
+            "response": "⏱️ Deadline exceeded",
+            "provider": x_provider.lower() if x_provider else "openai",
+            "filtered": False,
+            "error": "Deadline exceeded"
+        }
     except Exception as e:
         logger.error(f"Error in raw query: {e}")
         return {
@@ -291,6 +503,10 @@ async def root():
             "/status": "GET - System status and metrics", 
             "/health": "GET - Health check",
             "/metrics": "GET - Detailed metrics",
+            "/admission": "GET - Admission control stats",
+            "/scheduler": "GET - LLM call scheduler stats",
+            "/latency": "GET - Latency per processing mode and cascade tier",
+            "/documents": "POST - Upload documents (streaming), returns handles",
             "/docs": "API documentation"
         }
     }
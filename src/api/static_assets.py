@@ -0,0 +1,141 @@
+"""
+In-memory static asset pipeline: precompressed, content-hashed, cacheable
+"""
+
+import os
+import gzip
+import hashlib
+import logging
+import mimetypes
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:  # Declared in requirements.txt; brotli variants are skipped if missing
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Types worth compressing; images and fonts are already compressed
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_MIN_COMPRESS_SIZE = 512
+
+HTML_CACHE_CONTROL = "no-cache"
+ASSET_CACHE_CONTROL = "public, max-age=3600"
+
+
+@dataclass
+class StaticAsset:
+    """A static file held in memory with its precompressed variants"""
+    path: str
+    content_type: str
+    etag: str
+    identity: bytes
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}; a q of 0 means not acceptable"""
+    encodings: Dict[str, float] = {}
+    for item in header.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[coding.lower()] = q
+    return encodings
+
+
+def _acceptable(encodings: Dict[str, float], coding: str) -> bool:
+    return encodings.get(coding, encodings.get("*", 0.0)) > 0
+
+
+class StaticAssetStore:
+    """
+    Loads every file under the static directory once, computes a content
+    hash ETag and precompresses text assets with gzip (and brotli when
+    available). Requests are answered from memory with 304 support.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+
+    def load(self) -> int:
+        self.assets.clear()
+        if not os.path.isdir(self.directory):
+            return 0
+
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                full_path = os.path.join(root, filename)
+                rel_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    self.assets[rel_path] = self._build(rel_path, f.read())
+
+        total = sum(len(a.identity) for a in self.assets.values())
+        logger.info(f"Static assets loaded in memory: {len(self.assets)} files, {total} bytes")
+        return len(self.assets)
+
+    @staticmethod
+    def _build(path: str, data: bytes) -> StaticAsset:
+        # Starlette appends "; charset=utf-8" to text/* media types itself
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        asset = StaticAsset(
+            path=path,
+            content_type=content_type,
+            etag=f'"{hashlib.sha256(data).hexdigest()[:16]}"',
+            identity=data
+        )
+        if content_type.startswith(_COMPRESSIBLE) and len(data) >= _MIN_COMPRESS_SIZE:
+            asset.gzip = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                asset.br = brotli.compress(data, quality=11)
+        return asset
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path.lstrip("/"))
+
+    def response(self, request: Request, asset: StaticAsset, cache_control: str) -> Response:
+        headers = {
+            "ETag": asset.etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding"
+        }
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if asset.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+        accept = accepted_encodings(request.headers.get("accept-encoding", ""))
+        # Explicit identity keeps GZipMiddleware from overriding a q=0 refusal
+        body = asset.identity
+        headers["Content-Encoding"] = "identity"
+        if asset.br is not None and _acceptable(accept, "br"):
+            body = asset.br
+            headers["Content-Encoding"] = "br"
+        elif asset.gzip is not None and _acceptable(accept, "gzip"):
+            body = asset.gzip
+            headers["Content-Encoding"] = "gzip"
+
+        return Response(content=body, media_type=asset.content_type, headers=headers)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self.assets),
+            "identity_bytes": sum(len(a.identity) for a in self.assets.values()),
+            "gzip_bytes": sum(len(a.gzip) for a in self.assets.values() if a.gzip),
+            "brotli_bytes": sum(len(a.br) for a in self.assets.values() if a.br)
+        }
@@ -0,0 +1,221 @@
+"""
+Streaming document uploads: multipart or raw bodies spooled part by part
+"""
+
+import re
+import logging
+from tempfile import SpooledTemporaryFile
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+
+from src.core.config import UploadConfig, get_config
+from src.rag.document_store import StoredDocument, document_store
+
+logger = logging.getLogger(__name__)
+
+# Header block of a single part; anything larger is malformed
+_MAX_HEADER_BYTES = 16 * 1024
+_BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+_PARAM_RE = re.compile(r'(\w+)="([^"]*)"')
+
+
+class UploadRejected(Exception):
+    """Raised when an upload breaks a limit or is malformed"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class _Part:
+    """A file part being spooled"""
+
+    def __init__(self, filename: str, spool_bytes: int):
+        self.filename = filename
+        self.size = 0
+        self.file = SpooledTemporaryFile(max_size=spool_bytes)
+
+
+class UploadSession:
+    """
+    Consumes the request body as it arrives. Each file part is written to
+    a spool file (memory first, disk past `spool_memory_bytes`) and handed
+    to ingestion as soon as it completes. Limits are enforced on every
+    received block, so an oversized upload is refused without buffering it.
+    """
+
+    def __init__(self, boundary: Optional[bytes] = None, filename: Optional[str] = None,
+                 config: Optional[UploadConfig] = None, tenant: str = ""):
+        self.config = config or get_config().uploads
+        self.tenant = tenant
+        self.boundary = boundary
+        self.received = 0
+        self.files = 0
+        self.documents: List[StoredDocument] = []
+        self._part: Optional[_Part] = None
+        self._skip_part = False
+        self._state = "preamble"
+        # The first boundary is not preceded by CRLF
+        self._buffer = b"\r\n"
+        self._delimiter = b"\r\n--" + boundary if boundary else b""
+        if boundary is None:
+            self._begin_part(filename or "document.txt")
+
+    async def feed(self, data: bytes):
+        self.received += len(data)
+        if self.received > self.config.max_request_bytes:
+            raise UploadRejected(413, f"Upload exceeds {self.config.max_request_bytes} bytes")
+        if self.boundary is None:
+            self._write(data)
+            return
+
+        self._buffer += data
+        while True:
+            if self._state == "preamble":
+                index = self._buffer.find(self._delimiter)
+                if index < 0:
+                    self._buffer = self._buffer[-len(self._delimiter):]
+                    return
+                self._buffer = self._buffer[index + len(self._delimiter):]
+                self._state = "boundary"
+
+            elif self._state == "boundary":
+                if len(self._buffer) < 2:
+                    return
+                if self._buffer.startswith(b"--"):
+                    self._state = "done"
+                    self._buffer = b""
+                    return
+                if not self._buffer.startswith(b"\r\n"):
+                    raise UploadRejected(400, "Malformed multipart body")
+                self._buffer = self._buffer[2:]
+                self._state = "headers"
+
+            elif self._state == "headers":
+                index = self._buffer.find(b"\r\n\r\n")
+                if index < 0:
+                    if len(self._buffer) > _MAX_HEADER_BYTES:
+                        raise UploadRejected(400, "Multipart headers too large")
+                    return
+                headers = self._buffer[:index].decode("utf-8", errors="replace")
+                self._buffer = self._buffer[index + 4:]
+                self._start_multipart_part(headers)
+                self._state = "body"
+
+            elif self._state == "body":
+                index = self._buffer.find(self._delimiter)
+                if index < 0:
+                    # Keep a tail that could be the start of the delimiter
+                    keep = len(self._delimiter) - 1
+                    if len(self._buffer) > keep:
+                        self._write(self._buffer[:-keep])
+                        self._buffer = self._buffer[-keep:]
+                    return
+                self._write(self._buffer[:index])
+                self._buffer = self._buffer[index + len(self._delimiter):]
+                await self._end_part()
+                self._state = "boundary"
+
+            else:  # done: epilogue is ignored
+                self._buffer = b""
+                return
+
+    async def finish(self) -> List[StoredDocument]:
+        if self.boundary is None:
+            await self._end_part()
+        elif self._state != "done":
+            raise UploadRejected(400, "Truncated multipart body")
+        if not self.documents:
+            raise UploadRejected(400, "No documents in upload")
+        return self.documents
+
+    def close(self):
+        if self._part is not None:
+            self._part.file.close()
+            self._part = None
+
+    def _start_multipart_part(self, headers: str):
+        disposition = ""
+        for line in headers.split("\r\n"):
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-disposition":
+                disposition = value
+        params = dict(_PARAM_RE.findall(disposition))
+        filename = params.get("filename")
+        # Plain form fields carry no document; their bytes are discarded
+        self._skip_part = not filename
+        if filename:
+            self._begin_part(filename.replace("\\", "/").rsplit("/", 1)[-1] or "document.txt")
+
+    def _begin_part(self, filename: str):
+        self.files += 1
+        if self.files > self.config.max_files:
+            raise UploadRejected(413, f"Too many files (max {self.config.max_files})")
+        self._part = _Part(filename, self.config.spool_memory_bytes)
+
+    def _write(self, data: bytes):
+        if self._skip_part or not data:
+            return
+        part = self._part
+        part.size += len(data)
+        if part.size > self.config.max_file_bytes:
+            raise UploadRejected(413, f"File '{part.filename}' exceeds {self.config.max_file_bytes} bytes")
+        part.file.write(data)
+
+    async def _end_part(self):
+        part, self._part = self._part, None
+        if self._skip_part or part is None or not part.size:
+            self._skip_part = False
+            if part is not None:
+                part.file.close()
+            return
+        try:
+            part.file.seek(0)
+            # Chunking is CPU work on a file: keep it off the event loop.
+            # The store itself is only touched from the loop
+            document = await run_in_threadpool(document_store.chunk, part.filename, part.file, part.size, self.tenant)
+            self.documents.append(document_store.put(document))
+        finally:
+            part.file.close()
+
+
+def _session_for(request: Request, tenant: str) -> UploadSession:
+    content_type = request.headers.get("content-type", "")
+    if content_type.lower().startswith("multipart/"):
+        match = _BOUNDARY_RE.search(content_type)
+        if not match:
+            raise UploadRejected(400, "Missing multipart boundary")
+        return UploadSession(boundary=match.group(1).encode("latin-1"), tenant=tenant)
+    filename = request.headers.get("x-filename") or request.query_params.get("name")
+    return UploadSession(filename=filename, tenant=tenant)
+
+
+async def receive_documents(request: Request, tenant: str) -> List[Dict[str, Any]]:
+    """
+    Stream the request body into the document store. Accepts
+    multipart/form-data (one document per file part) or a raw body named
+    by the X-Filename header or `name` query parameter. The handles belong
+    to `tenant` (fingerprint of the uploader's API key).
+    Raises UploadRejected; returns the new document handles.
+    """
+    config = get_config().uploads
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > config.max_request_bytes:
+        raise UploadRejected(413, f"Upload exceeds {config.max_request_bytes} bytes")
+
+    session = _session_for(request, tenant)
+    try:
+        async for data in request.stream():
+            await session.feed(data)
+        documents = await session.finish()
+    except UploadRejected:
+        # Documents already ingested from this request are not kept
+        for document in session.documents:
+            document_store.remove(document.handle, tenant)
+        raise
+    finally:
+        session.close()
+    return [document.to_dict() for document in documents]
@@ -0,0 +1,72 @@
+"""
+In-process LRU cache with per-entry time to live
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire after `ttl` seconds. Size and TTL come
+    from a callable so they follow config reloads without rebuilding.
+    Thread-safe: retrievals also run in worker threads (asyncio.to_thread).
+    """
+
+    def __init__(self, settings: Callable[[], Tuple[int, float]]):
+        self._settings = settings
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """(value, age in seconds) or None"""
+        _, ttl = self._settings()
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is None or now - entry[0] > ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], now - entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        maxsize, _ = self._settings()
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def make_key(*parts: Any) -> str:
+    """Stable digest of the given parts (strings, numbers, nested tuples)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
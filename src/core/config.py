@@ -2,12 +2,24 @@
 Configuration with Truth Shield AND Quality Gate settings
 """
 
+import os
+import copy
+import json
+import time
+import logging
 from dotenv import load_dotenv
-from dataclasses import dataclass, field
-from typing import Dict, Any
+from dataclasses import dataclass, field, is_dataclass, asdict
+from typing import Dict, Any, Callable, List, Mapping, Optional, Tuple, Union, get_args, get_origin, get_type_hints
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Optional JSON file with overrides, then SUBOTAI__SECTION__KEY=value env vars
+CONFIG_FILE_ENV = "SUBOTAI_CONFIG_FILE"
+DEFAULT_CONFIG_FILE = "config/subotai.json"
+ENV_PREFIX = "SUBOTAI__"
+
 
 @dataclass
 class TruthShieldConfig:
@@ -33,6 +45,8 @@ class TruthShieldConfig:
 @dataclass
 class QualityGateConfig:
     """Quality Gate specific configuration"""
+    # Local quality metrics on every answer (no extra LLM calls)
+    enabled: bool = True
     clarity_threshold: float = 70.0
     truth_risk_threshold: float = 40.0
     quality_threshold: float = 75.0
@@ -53,6 +67,297 @@ class QualityGateConfig:
             }
 
 
+@dataclass
+class RetrievalConfig:
+    """Knowledge base retrieval configuration"""
+    # Relevance gate: minimum share of query terms the best chunk must cover
+    relevance_gate_enabled: bool = True
+    relevance_threshold: float = 0.3
+    # Chunks sent to the judge after local retrieval
+    top_k: int = 8
+    # Near-duplicate collapsing (MinHash estimated Jaccard similarity)
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.8
+    dedup_window_factor: int = 4
+
+
+@dataclass
+class CompressionConfig:
+    """Extractive context compression before the judge call"""
+    enabled: bool = True
+    # Share of the retrieved tokens kept (0-1) and absolute cap (0 = no cap)
+    ratio: float = 0.5
+    token_budget: int = 1500
+    # Neighbouring sentences kept around each selected sentence
+    neighbors: int = 1
+
+
+@dataclass
+class ExtractiveConfig:
+    """Zero-LLM extractive answers for FAQ-style chunks"""
+    enabled: bool = True
+    confidence_threshold: float = 0.75
+    # Top retrieved chunks inspected for question/answer pairs
+    max_candidates: int = 3
+
+
+@dataclass
+class VerifierConfig:
+    """Local claim-to-source alignment of the judge output"""
+    enabled: bool = True
+    # Minimum alignment score (0-1) for a [NORMAL] claim to stay verified
+    support_threshold: float = 0.5
+    # Numbers in a claim must appear in the supporting chunk
+    check_numbers: bool = True
+
+
+@dataclass
+class AdmissionConfig:
+    """API admission control and load shedding"""
+    enabled: bool = True
+    # Requests executing at once across all admitted routes
+    max_in_flight: int = 32
+    # Seconds a request may wait in its route queue before being shed
+    max_queue_wait: float = 10.0
+    # Route path -> priority class (interactive is served before batch)
+    routes: Dict[str, str] = field(default_factory=dict)
+    # Bounded wait queue per route, by priority class
+    queue_sizes: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.routes:
+            self.routes = {
+                '/api/query': 'interactive',
+                '/api/query-raw': 'interactive',
+                '/api/validate-key': 'interactive',
+                '/api/documents': 'batch'
+            }
+        if not self.queue_sizes:
+            self.queue_sizes = {
+                'interactive': 64,
+                'batch': 16
+            }
+
+
+@dataclass
+class DeadlineConfig:
+    """End-to-end request deadlines (X-Deadline / X-Request-Timeout)"""
+    # Applied when the client sends no deadline header (None = no deadline)
+    default_timeout: Optional[float] = None
+    max_timeout: float = 120.0
+    # Minimum remaining budget (seconds) to start an upstream LLM call
+    min_llm_budget: float = 1.0
+    # Minimum remaining budget (seconds) to run optional local stages
+    min_stage_budget: float = 0.05
+
+
+@dataclass
+class UploadConfig:
+    """Streaming document uploads (/api/documents)"""
+    max_file_bytes: int = 10 * 1024 * 1024
+    max_files: int = 8
+    # Whole request body, checked against Content-Length and while streaming
+    max_request_bytes: int = 32 * 1024 * 1024
+    # Part bytes kept in memory before the spool file moves to disk
+    spool_memory_bytes: int = 1024 * 1024
+    # Uploaded documents kept for queries to reference by handle
+    max_documents: int = 256
+    handle_ttl: float = 3600.0
+
+
+@dataclass
+class LLMConfig:
+    """Upstream LLM calls and the shared HTTP connection pool"""
+    timeout: float = 30.0
+    connect_timeout: float = 5.0
+    max_tokens: int = 1000
+    temperature: float = 0.7
+    # Connection pool (rebuilt on reload when these change)
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    # Endpoint per provider, overriding the public API (proxies, local mocks)
+    provider_urls: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class SchedulerConfig:
+    """Weighted fair scheduling (deficit round-robin) of upstream LLM calls"""
+    enabled: bool = True
+    # LLM calls in flight at once across all tenants
+    max_concurrent: int = 16
+    # Tokens (prompt + max answer) a flow of weight 1 may send per round
+    quantum: int = 1000
+    # Priority class -> weight (share of the calls when classes compete)
+    class_weights: Dict[str, float] = field(default_factory=dict)
+    # Tenant (API key fingerprint, see /api/scheduler) -> weight; others weigh 1
+    tenant_weights: Dict[str, float] = field(default_factory=dict)
+    # Calls waiting per tenant and class; beyond this they fail fast
+    max_queue_per_tenant: int = 256
+    # Seconds a call may wait for a slot (never beyond the request deadline)
+    max_queue_wait: float = 30.0
+    # Queue wait objective per class (p95, ms)
+    wait_objectives_ms: Dict[str, float] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.class_weights:
+            self.class_weights = {'interactive': 8.0, 'batch': 2.0, 'warmup': 1.0}
+        if not self.wait_objectives_ms:
+            self.wait_objectives_ms = {'interactive': 250.0, 'batch': 5000.0}
+
+    def validate(self):
+        """A flow with no quantum would never be served. Raises ValueError"""
+        if self.quantum <= 0:
+            raise ValueError(f"scheduler.quantum must be positive: {self.quantum}")
+        for section in ("class_weights", "tenant_weights"):
+            for name, weight in getattr(self, section).items():
+                if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight <= 0:
+                    raise ValueError(f"scheduler.{section}.{name} must be a positive number: {weight!r}")
+
+
+@dataclass
+class CacheConfig:
+    """In-process cache sizes"""
+    # Term dictionary translations (LRU entries)
+    translation_size: int = 4096
+    # MinHash signatures of user chunks (LRU entries)
+    signature_size: int = 20000
+    # Final answers by query + documents (LRU entries, seconds)
+    answer_size: int = 512
+    answer_ttl: float = 300.0
+    # Server-document retrieval results by query (LRU entries, seconds)
+    retrieval_size: int = 2048
+    retrieval_ttl: float = 900.0
+
+
+@dataclass
+class ModeProfile:
+    """Execution profile of a ProcessingMode (None = global setting)"""
+    # Model per provider, e.g. {"openai": "gpt-4o-mini"}
+    models: Dict[str, str] = field(default_factory=dict)
+    max_tokens: Optional[int] = None
+    # Chunks packed for the judge and compression budget
+    top_k: Optional[int] = None
+    token_budget: Optional[int] = None
+    compression_ratio: Optional[float] = None
+    # Pipeline deadline in seconds; never extends the client deadline
+    timeout: Optional[float] = None
+    # Answer from the answer cache before retrieving
+    cache_first: bool = False
+    # Force the local claim verifier on or off
+    verify: Optional[bool] = None
+    # Allow the model cascade to escalate (None = cascade.enabled)
+    cascade: Optional[bool] = None
+
+
+def _fast_profile() -> ModeProfile:
+    return ModeProfile(models={"openai": "gpt-4o-mini"}, max_tokens=400, top_k=1,
+                       token_budget=400, timeout=8.0, cache_first=True, verify=False, cascade=False)
+
+
+def _strict_profile() -> ModeProfile:
+    return ModeProfile(top_k=12, token_budget=4000, compression_ratio=1.0, verify=True)
+
+
+@dataclass
+class ModesConfig:
+    """Per-mode execution profiles; other modes use `normal`"""
+    normal: ModeProfile = field(default_factory=ModeProfile)
+    fast: ModeProfile = field(default_factory=_fast_profile)
+    strict: ModeProfile = field(default_factory=_strict_profile)
+
+    def profile(self, mode: Optional[str]) -> ModeProfile:
+        return getattr(self, mode) if mode in ('fast', 'strict') else self.normal
+
+
+@dataclass
+class CascadeConfig:
+    """
+    Model cascade: cheap model first, stronger model only for weak answers.
+    Opt-in (globally or per mode profile): tiers replace the client's default
+    model and escalations are billed to the user's key.
+    """
+    enabled: bool = False
+    # Models per provider, cheapest first
+    tiers: Dict[str, List[str]] = field(default_factory=dict)
+    # Local answer score (0-100) below which the next tier is asked
+    escalation_threshold: float = 55.0
+    # Weights of the local score signals
+    coverage_weight: float = 0.40
+    support_weight: float = 0.35
+    confidence_weight: float = 0.25
+
+    def __post_init__(self):
+        if not self.tiers:
+            self.tiers = {
+                'openai': ['gpt-4o-mini', 'gpt-4o'],
+                'deepseek': ['deepseek-chat', 'deepseek-reasoner']
+            }
+
+
+@dataclass
+class SpeculationConfig:
+    """Speculative direct-answer call started alongside retrieval"""
+    enabled: bool = False
+    # Modes that speculate (strict and extractive always wait for the gate)
+    modes: List[str] = field(default_factory=lambda: ['auto', 'normal', 'fast'])
+    # Keep an unused answer for the raw pane instead of cancelling the call
+    keep_for_raw: bool = True
+    # Seconds a parked answer waits for /api/query-raw before it counts as wasted
+    raw_ttl: float = 30.0
+
+
+@dataclass
+class WarmupConfig:
+    """Cache pre-warming from a query corpus, in the background at startup"""
+    enabled: bool = False
+    # Query log directories/files, JSONL (query/question/title fields) or plain text files
+    corpus: List[str] = field(default_factory=lambda: ['requests.jsonl', 'logs/queries'])
+    # Most frequent queries to warm
+    top_n: int = 50
+    # Warm-up retrievals per second
+    rate: float = 2.0
+    docs_language: str = "es"
+
+
+@dataclass
+class QueryLogConfig:
+    """Append-only binary query log, written in the background"""
+    enabled: bool = True
+    directory: str = "logs/queries"
+    # Rotation: new file past this size, oldest files beyond max_files deleted
+    max_file_bytes: int = 16 * 1024 * 1024
+    max_files: int = 8
+    # Seconds between background flushes
+    flush_interval: float = 0.5
+    # Records waiting for the writer; beyond this new records are dropped
+    max_pending: int = 10000
+
+
+@dataclass
+class StatusConfig:
+    """Status snapshot refreshed in the background (health and status endpoints read it)"""
+    refresh_interval: float = 5.0
+
+
+@dataclass
+class IngestionConfig:
+    """Document ingestion: chunking, MinHash and per-shard indexes in a process pool"""
+    # Worker processes (0: one per CPU core; 1: in-process, no pool)
+    workers: int = 0
+    # Folders with fewer files are ingested in-process at startup
+    parallel_min_files: int = 32
+    # Shards per worker: smaller shards balance better and report progress more often
+    shards_per_worker: int = 4
+    # Document languages whose indexes are built with the shards (others stay on demand)
+    languages: List[str] = field(default_factory=lambda: ['es'])
+    # multiprocessing start method (spawn: safe with the server's threads)
+    start_method: str = "spawn"
+    # Corpus saved by `python -m src.rag.bulk_ingest --output`, opened at startup
+    # instead of ingesting the documents folder (empty: ingest the folder)
+    corpus_file: str = ""
+
+
 @dataclass
 class SubotaiConfig:
     """Main configuration class with both Truth Shield and Quality Gate"""
@@ -63,6 +368,57 @@ class SubotaiConfig:
     # Quality Gate Configuration
     quality_gate: QualityGateConfig = field(default_factory=QualityGateConfig)
 
+    # Retrieval Configuration
+    retrieval: RetrievalConfig = field(default_factory=RetrievalConfig)
+
+    # Context Compression Configuration
+    compression: CompressionConfig = field(default_factory=CompressionConfig)
+
+    # Extractive Answer Configuration
+    extractive: ExtractiveConfig = field(default_factory=ExtractiveConfig)
+
+    # Claim Verifier Configuration
+    verifier: VerifierConfig = field(default_factory=VerifierConfig)
+
+    # API Admission Control Configuration
+    admission: AdmissionConfig = field(default_factory=AdmissionConfig)
+
+    # Request Deadline Configuration
+    deadlines: DeadlineConfig = field(default_factory=DeadlineConfig)
+
+    # Document Upload Configuration
+    uploads: UploadConfig = field(default_factory=UploadConfig)
+
+    # LLM Calls and Connection Pool Configuration
+    llm: LLMConfig = field(default_factory=LLMConfig)
+
+    # LLM Call Scheduler Configuration
+    scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
+
+    # Cache Configuration
+    caches: CacheConfig = field(default_factory=CacheConfig)
+
+    # Processing Mode Profiles
+    modes: ModesConfig = field(default_factory=ModesConfig)
+
+    # Model Cascade Configuration
+    cascade: CascadeConfig = field(default_factory=CascadeConfig)
+
+    # Speculative Direct Answer Configuration
+    speculation: SpeculationConfig = field(default_factory=SpeculationConfig)
+
+    # Cache Pre-warming Configuration
+    warmup: WarmupConfig = field(default_factory=WarmupConfig)
+
+    # Query Log Configuration
+    query_log: QueryLogConfig = field(default_factory=QueryLogConfig)
+
+    # Status Snapshot Configuration
+    status: StatusConfig = field(default_factory=StatusConfig)
+
+    # Document Ingestion Configuration
+    ingestion: IngestionConfig = field(default_factory=IngestionConfig)
+
     # Existing configurations
     model_settings: Dict[str, Any] = field(default_factory=dict)
     safety_filters: Dict[str, Any] = field(default_factory=dict)
@@ -81,5 +437,165 @@ class SubotaiConfig:
             }
 
 
+def _unwrap_optional(annotation: Any) -> Tuple[Any, bool]:
+    """Optional[X] -> (X, True); anything else -> (annotation, False)"""
+    args = get_args(annotation)
+    if get_origin(annotation) is Union and type(None) in args:
+        return next(arg for arg in args if arg is not type(None)), True
+    return annotation, False
+
+
+def _coerce(annotation: Any, value: Any, key: str, from_env: bool = False) -> Any:
+    """
+    Check an override against the field's annotation. Only environment
+    variables arrive as text, so only they are parsed into the field type
+    """
+    expected, optional = _unwrap_optional(annotation)
+    origin = get_origin(expected) or expected
+    if from_env and isinstance(value, str) and origin not in (str, Any):
+        text = value.strip()
+        if optional and text.lower() in ("", "none", "null"):
+            return None
+        if origin is bool:
+            if text.lower() not in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+                raise ValueError(f"Invalid boolean for {key}: {value!r}")
+            return text.lower() in ("1", "true", "yes", "on")
+        if origin is int:
+            value = int(text)
+        elif origin is float:
+            value = float(text)
+        else:
+            # Dicts and lists are given as JSON
+            value = json.loads(text)
+
+    if value is None:
+        if optional:
+            return None
+        raise ValueError(f"{key} cannot be null")
+    if origin is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if origin is int and isinstance(value, bool):
+        raise ValueError(f"Invalid type for {key}: expected int")
+    if isinstance(origin, type) and not isinstance(value, origin):
+        raise ValueError(f"Invalid type for {key}: expected {origin.__name__}")
+    return value
+
+
+def apply_overrides(config: Any, overrides: Mapping[str, Any], prefix: str = "",
+                    from_env: bool = False) -> None:
+    """
+    Merge nested overrides into a config dataclass in place; unknown keys,
+    values of the wrong type and values rejected by a section's validate()
+    raise ValueError
+    """
+    hints = get_type_hints(type(config))
+    for key, value in overrides.items():
+        path = f"{prefix}{key}"
+        if key not in hints:
+            raise ValueError(f"Unknown config key: {path}")
+        current = getattr(config, key)
+        if is_dataclass(current):
+            if not isinstance(value, Mapping):
+                raise ValueError(f"Config section {path} expects an object")
+            apply_overrides(current, value, f"{path}.", from_env)
+        elif isinstance(current, dict) and isinstance(value, Mapping):
+            # Entries are merged and checked against the dict's value type
+            value_type = (get_args(hints[key]) or (str, Any))[1]
+            setattr(config, key, {**current, **{
+                name: _coerce(value_type, item, f"{path}.{name}", from_env)
+                for name, item in value.items()
+            }})
+        else:
+            setattr(config, key, _coerce(hints[key], value, path, from_env))
+    validate = getattr(config, "validate", None)
+    if validate is not None:
+        validate()
+
+
+def env_overrides(environ: Mapping[str, str]) -> Dict[str, Any]:
+    """SUBOTAI__LLM__TIMEOUT=20 -> {"llm": {"timeout": "20"}}"""
+    overrides: Dict[str, Any] = {}
+    for name, value in environ.items():
+        if not name.startswith(ENV_PREFIX):
+            continue
+        keys = name[len(ENV_PREFIX):].lower().split("__")
+        target = overrides
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return overrides
+
+
+def load_config(path: Optional[str] = None, environ: Optional[Mapping[str, str]] = None) -> SubotaiConfig:
+    """Defaults, then the JSON config file, then environment variables"""
+    environ = os.environ if environ is None else environ
+    config = SubotaiConfig()
+    path = path or environ.get(CONFIG_FILE_ENV, DEFAULT_CONFIG_FILE)
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            apply_overrides(config, json.load(f))
+    apply_overrides(config, env_overrides(environ), from_env=True)
+    return config
+
+
+class ConfigManager:
+    """
+    Holds the active configuration and swaps it atomically on reload.
+    Components read get_config() at call time, so new values apply to the
+    next request; listeners rebuild resources such as connection pools.
+    """
+
+    def __init__(self, config: Optional[SubotaiConfig] = None):
+        if config is None:
+            try:
+                config = load_config()
+            except (OSError, ValueError) as e:
+                logger.error(f"Invalid configuration, using defaults: {e}")
+                config = SubotaiConfig()
+        self._config = config
+        self._listeners: List[Callable[[SubotaiConfig], None]] = []
+        self.version = 1
+        self.loaded_at = time.time()
+
+    @property
+    def config(self) -> SubotaiConfig:
+        return self._config
+
+    def subscribe(self, listener: Callable[[SubotaiConfig], None]):
+        self._listeners.append(listener)
+
+    def reload(self, path: Optional[str] = None) -> SubotaiConfig:
+        """Rebuild from file + env (drops runtime updates). Raises ValueError/OSError"""
+        return self._swap(load_config(path))
+
+    def update(self, overrides: Mapping[str, Any]) -> SubotaiConfig:
+        """Apply runtime overrides on top of the active config. Raises ValueError"""
+        config = copy.deepcopy(self._config)
+        apply_overrides(config, overrides)
+        return self._swap(config)
+
+    def _swap(self, config: SubotaiConfig) -> SubotaiConfig:
+        self._config = config
+        self.version += 1
+        self.loaded_at = time.time()
+        for listener in self._listeners:
+            try:
+                listener(config)
+            except Exception as e:
+                logger.error(f"Config reload listener failed: {e}")
+        logger.info(f"⚙️ Configuration reloaded (version {self.version})")
+        return config
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": self.version, "loaded_at": self.loaded_at, "config": asdict(self._config)}
+
+
 # Default configuration
 DEFAULT_CONFIG = SubotaiConfig()
+
+config_manager = ConfigManager()
+
+
+def get_config() -> SubotaiConfig:
+    """Return the active configuration"""
+    return config_manager.config
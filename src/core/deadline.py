@@ -0,0 +1,66 @@
+"""
+End-to-end request deadlines
+"""
+
+import time
+from typing import Optional
+
+from src.core.config import get_config
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of time budget"""
+
+
+class Deadline:
+    """
+    Absolute deadline on the monotonic clock, shared by every stage of a
+    request (core, retrieval, LLM client).
+    """
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_timeout(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    @classmethod
+    def from_headers(cls, x_deadline: Optional[str] = None, x_timeout: Optional[str] = None) -> Optional["Deadline"]:
+        """
+        Build a deadline from request headers:
+        - X-Deadline: absolute unix timestamp in seconds
+        - X-Request-Timeout: relative timeout in seconds
+        The earliest one wins; the configured maximum always applies.
+        Raises ValueError on malformed values.
+        """
+        config = get_config().deadlines
+        budgets = []
+        if x_deadline:
+            budgets.append(float(x_deadline) - time.time())
+        if x_timeout:
+            budgets.append(float(x_timeout))
+        if not budgets and config.default_timeout:
+            budgets.append(config.default_timeout)
+        if not budgets:
+            return None
+        return cls.from_timeout(min(min(budgets), config.max_timeout))
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def has_budget(self, seconds: float) -> bool:
+        """Whether a stage needing `seconds` can still finish in time"""
+        return self.remaining() >= seconds
+
+    def timeout(self, cap: float) -> float:
+        """Timeout for a blocking call, never beyond the deadline"""
+        return max(min(cap, self.remaining()), 0.0)
+
+    def to_dict(self) -> dict:
+        return {"remaining": round(self.remaining(), 3)}
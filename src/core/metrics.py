@@ -0,0 +1,98 @@
+"""
+Latency histograms per label (processing mode, cascade tier, ...)
+"""
+
+import time
+import bisect
+from typing import Any, Dict, List, Optional
+
+# Bucket upper bounds in milliseconds; the last bucket is +inf
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram: O(log buckets) per observation, constant memory"""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "within_budget", "budgeted")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.within_budget = 0
+        self.budgeted = 0
+
+    def observe(self, elapsed_ms: float, budget_ms: Optional[float] = None):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if budget_ms is not None:
+            self.budgeted += 1
+            self.within_budget += elapsed_ms <= budget_ms
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (max for the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return float(LATENCY_BUCKETS_MS[index]) if index < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 2),
+            "within_budget": round(self.within_budget / self.budgeted, 4) if self.budgeted else None,
+            "buckets": {
+                (f"le_{bound}" if i < len(LATENCY_BUCKETS_MS) else "inf"): n
+                for i, (bound, n) in enumerate(zip(LATENCY_BUCKETS_MS + (None,), self.counts))
+            }
+        }
+
+
+class LatencyMetrics:
+    """Histograms keyed by label"""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def observe(self, label: str, elapsed_ms: float, budget_ms: Optional[float] = None):
+        histogram = self._histograms.get(label)
+        if histogram is None:
+            histogram = self._histograms[label] = LatencyHistogram()
+        histogram.observe(elapsed_ms, budget_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {label: histogram.snapshot() for label, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        self._histograms.clear()
+
+
+class StageTimer:
+    """Milliseconds per pipeline stage, measured between consecutive laps (repeated stages add up)"""
+
+    __slots__ = ("timings", "_last")
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + (now - self._last) * 1000, 3)
+        self._last = now
+
+
+# Global instance: end-to-end query latency per processing mode
+mode_latency = LatencyMetrics()
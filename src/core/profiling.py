@@ -0,0 +1,201 @@
+"""
+On-demand profiling - Time-boxed CPU profiles and tracemalloc snapshots
+
+Nothing is installed while inactive: the sampler thread, cProfile hooks
+and tracemalloc only exist between start and stop.
+"""
+
+import io
+import os
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames of threads that are only waiting (dropped unless idle=True)
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py", "thread.py")
+
+# Memory areas: allocations whose traceback passes through these files
+MEMORY_AREAS = {
+    "knowledge_base": ("src/rag/knowledge_base.py", "src/rag/ingestion.py", "src/rag/index.py",
+                       "src/rag/document_store.py"),
+    "caches": ("src/core/cache.py", "src/rag/term_dictionary.py", "src/rag/dedup.py"),
+    "request_buffers": ("src/api/uploads.py", "starlette/requests.py", "starlette/formparsers.py",
+                        "fastapi/routing.py", "src/api/responses.py"),
+}
+
+
+class ProfilerBusy(RuntimeError):
+    """A CPU profile is already running"""
+
+
+class CpuProfiler:
+    """
+    - sample: a thread reads every other thread's stack each interval and
+      returns collapsed stacks ("thread;outer;...;inner count"), the input
+      format of flamegraph.pl / speedscope / inferno
+    - cprofile: deterministic profile of the event loop thread (all
+      requests it runs meanwhile), as a pstats table; work sent to worker
+      threads is not included
+    """
+
+    def __init__(self):
+        self.active: Optional[str] = None
+
+    async def profile(self, seconds: float, mode: str = "sample", interval: float = 0.005,
+                      idle: bool = False, top: int = 50) -> str:
+        if self.active is not None:
+            raise ProfilerBusy(f"{self.active} profile already running")
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.active = mode
+        logger.info(f"🔬 Perfil de CPU ({mode}) durante {seconds:g}s")
+        try:
+            if mode == "sample":
+                return await self._sample(seconds, interval, idle)
+            return await self._cprofile(seconds, top)
+        finally:
+            self.active = None
+
+    async def _sample(self, seconds: float, interval: float, idle: bool) -> str:
+        counts: Counter = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample_loop, args=(stop, interval, idle, counts), name="subotai-sampler", daemon=True
+        )
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+    @staticmethod
+    def _sample_loop(stop: threading.Event, interval: float, idle: bool, counts: Counter):
+        own = threading.get_ident()
+        while not stop.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if not idle and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                counts[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    async def _cprofile(seconds: float, top: int) -> str:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+
+class MemoryProfiler:
+    """tracemalloc snapshots (top allocations and per-area totals) and diffs against a baseline"""
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self.started_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 25) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.started_at = time.time()
+            logger.info(f"🔬 tracemalloc activado ({frames} marcos)")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        tracemalloc.stop()
+        self._baseline = None
+        self.started_at = None
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            "started_at": self.started_at,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "baseline": self._baseline is not None
+        }
+
+    def _take(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    @staticmethod
+    def _areas(snapshot: tracemalloc.Snapshot) -> Dict[str, Dict[str, int]]:
+        areas = {name: {"bytes": 0, "blocks": 0} for name in MEMORY_AREAS}
+        for trace in snapshot.traces:
+            files = [frame.filename.replace(os.sep, "/") for frame in trace.traceback]
+            for name, suffixes in MEMORY_AREAS.items():
+                if any(f.endswith(suffixes) for f in files):
+                    areas[name]["bytes"] += trace.size
+                    areas[name]["blocks"] += 1
+                    break
+        return areas
+
+    def snapshot(self, top: int = 25, key: str = "lineno", baseline: bool = False) -> Dict[str, Any]:
+        snapshot = self._take()
+        if baseline:
+            self._baseline = snapshot
+        stats = snapshot.statistics(key)
+        return {
+            **self.status(),
+            "total_bytes": sum(stat.size for stat in stats),
+            "areas": self._areas(snapshot),
+            "top": [
+                {"location": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+                for stat in stats[:top]
+            ]
+        }
+
+    def diff(self, top: int = 25, key: str = "lineno") -> Dict[str, Any]:
+        if self._baseline is None:
+            raise RuntimeError("No baseline snapshot (take one with baseline=true)")
+        snapshot = self._take()
+        stats = snapshot.compare_to(self._baseline, key)
+        return {
+            **self.status(),
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "top": [
+                {"location": str(stat.traceback[0]), "size_diff": stat.size_diff, "bytes": stat.size,
+                 "count_diff": stat.count_diff}
+                for stat in stats[:top]
+            ]
+        }
+
+
+# Global instances
+cpu_profiler = CpuProfiler()
+memory_profiler = MemoryProfiler()
@@ -0,0 +1,266 @@
+"""
+Query log - Append-only, length-prefixed binary records written in the background
+
+File layout: MAGIC, then per record a little-endian uint32 length followed
+by the JSON payload. Files rotate by size; a truncated tail (crash while
+writing) is ignored by the reader.
+
+    python -m src.core.query_log [logs/queries] [--top 10] [--documents src/rag/documents]
+"""
+
+import os
+import sys
+import time
+import struct
+import asyncio
+import threading
+import logging
+import argparse
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from src.core.config import get_config
+from src.core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SQL1"
+SUFFIX = ".qlog"
+_LENGTH = struct.Struct("<I")
+
+
+class QueryLog:
+    """
+    record() only appends a small dict to an in-memory queue; a background
+    task encodes and writes batches from a worker thread every
+    flush_interval. Nothing is queued while the writer is not running, and
+    records beyond max_pending are dropped (counted), never awaited.
+    """
+
+    def __init__(self):
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()  # un flush final puede solaparse con el del escritor
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._file_path: Optional[str] = None
+        self._file_size = 0
+        self._sequence = 0
+        self.written = 0
+        self.dropped = 0
+        self.bytes_written = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, query: str, context: Dict[str, Any], result: Dict[str, Any]):
+        if not self.running or not get_config().query_log.enabled:
+            return
+        if len(self._pending) >= get_config().query_log.max_pending:
+            self.dropped += 1
+            return
+        metadata = result.get("metadata", {})
+        profile = metadata.get("profile") or {}
+        cache_hit = bool(profile.get("cache_hit"))
+        self._pending.append({
+            "ts": round(time.time(), 3),
+            "query": query,
+            "mode": profile.get("mode", context.get("forced_mode", "auto")),
+            "path": metadata.get("mode"),
+            "provider": context.get("provider", "openai"),
+            "latency_ms": profile.get("latency_ms"),
+            "timings": {} if cache_hit else metadata.get("timings") or {},
+            "chunks": (metadata.get("retrieval") or {}).get("chunk_ids", []),
+            "cache_hit": cache_hit,
+            "colors": (metadata.get("quality_metrics") or {}).get("color_ratios"),
+            "error": bool(metadata.get("error"))
+        })
+
+    def start(self) -> bool:
+        if self.running or not get_config().query_log.enabled:
+            return False
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self):
+        """Stop the writer after a last flush"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(get_config().query_log.flush_interval)
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error(f"Error escribiendo el registro de consultas: {e}")
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch = [self._pending.popleft() for _ in range(len(self._pending))]
+        await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        config = get_config().query_log
+        buffer = bytearray()
+        for entry in batch:
+            payload = dumps(entry)
+            buffer += _LENGTH.pack(len(payload))
+            buffer += payload
+        with self._lock:
+            if self._file is None or self._file_size + len(buffer) > config.max_file_bytes:
+                self._rotate(config.directory, config.max_files)
+            self._file.write(buffer)
+            self._file.flush()
+            self._file_size += len(buffer)
+            self.written += len(batch)
+            self.bytes_written += len(buffer)
+
+    def _rotate(self, directory: str, max_files: int):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(directory, exist_ok=True)
+        self._sequence += 1
+        name = f"queries-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._sequence:04d}{SUFFIX}"
+        self._file_path = os.path.join(directory, name)
+        self._file = open(self._file_path, "wb")
+        self._file.write(MAGIC)
+        self._file_size = len(MAGIC)
+        for old in log_files(directory)[:-max_files]:
+            os.remove(old)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": get_config().query_log.enabled,
+            "running": self.running,
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "bytes_written": self.bytes_written,
+            "file": self._file_path
+        }
+
+
+def log_files(path: str) -> List[str]:
+    """Log files of a directory, oldest first (or the file itself)"""
+    if os.path.isfile(path):
+        return [path]
+    if not os.path.isdir(path):
+        return []
+    files = [os.path.join(path, name) for name in os.listdir(path) if name.endswith(SUFFIX)]
+    return sorted(files, key=lambda p: (os.path.getmtime(p), p))
+
+
+def read_log(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of a log file or directory, oldest first"""
+    for file_path in log_files(path):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            logger.warning(f"Ignorado (no es un registro de consultas): {file_path}")
+            continue
+        offset = len(MAGIC)
+        while offset + _LENGTH.size <= len(data):
+            (length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            if offset + length > len(data):
+                break  # registro incompleto al final del fichero
+            yield loads(data[offset:offset + length])
+            offset += length
+
+
+def summarize(records: Iterable[Dict[str, Any]], documents: Iterable[str] = (), top: int = 10) -> Dict[str, Any]:
+    """Top questions, per-stage latency (slowest first) and server documents never retrieved"""
+    questions: Counter = Counter()
+    first_seen: Dict[str, str] = {}
+    stages: Dict[str, List[float]] = {}
+    retrieved: Counter = Counter()
+    modes: Counter = Counter()
+    total = cache_hits = errors = 0
+    for record in records:
+        total += 1
+        key = " ".join(record["query"].lower().split())
+        questions[key] += 1
+        first_seen.setdefault(key, record["query"])
+        modes[record.get("mode")] += 1
+        cache_hits += record.get("cache_hit", False)
+        errors += record.get("error", False)
+        for stage, ms in (record.get("timings") or {}).items():
+            stages.setdefault(stage, []).append(ms)
+        for chunk_id in record.get("chunks") or ():
+            retrieved[chunk_id.rsplit("#", 1)[0]] += 1
+
+    stage_stats = {}
+    for stage, values in stages.items():
+        array = np.asarray(values, dtype=np.float64)
+        stage_stats[stage] = {
+            "count": int(array.size),
+            "mean_ms": round(float(array.mean()), 2),
+            "p95_ms": round(float(np.percentile(array, 95)), 2),
+            "max_ms": round(float(array.max()), 2)
+        }
+    return {
+        "queries": total,
+        "cache_hit_rate": round(cache_hits / total, 4) if total else 0.0,
+        "errors": errors,
+        "modes": dict(modes),
+        "top_questions": [(first_seen[key], count) for key, count in questions.most_common(top)],
+        "slowest_stages": dict(sorted(stage_stats.items(), key=lambda item: item[1]["mean_ms"], reverse=True)),
+        "documents_retrieved": dict(retrieved.most_common(top)),
+        "never_retrieved": sorted(doc for doc in documents if doc not in retrieved)
+    }
+
+
+def server_documents(documents_path: str) -> List[str]:
+    """Documentos del servidor (mismos nombres que los ids de fragmento)"""
+    from src.rag.ingestion import SUPPORTED_EXTENSIONS
+    if not os.path.isdir(documents_path):
+        return []
+    return sorted(
+        name for name in os.listdir(documents_path)
+        if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=get_config().query_log.directory, help="log file or directory")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--documents", default="src/rag/documents", help="server documents folder")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    summary = summarize(read_log(args.path), server_documents(args.documents), top=args.top)
+    elapsed = time.perf_counter() - started
+
+    print(f"{summary['queries']} consultas en {elapsed * 1000:.1f} ms | caché: {summary['cache_hit_rate']:.1%} | errores: {summary['errors']}")
+    print(f"Modos: {summary['modes']}")
+    print("\nPreguntas más frecuentes")
+    for query, count in summary["top_questions"]:
+        print(f"  {count:6d}  {query}")
+    print("\nEtapas más lentas")
+    for stage, stats in summary["slowest_stages"].items():
+        print(f"  {stage:<14} media {stats['mean_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms  max {stats['max_ms']:9.2f} ms  ({stats['count']})")
+    print("\nDocumentos nunca recuperados")
+    for doc in summary["never_retrieved"] or ["(ninguno)"]:
+        print(f"  {doc}")
+
+
+# Global instance
+query_log = QueryLog()
+
+if __name__ == "__main__":
+    sys.exit(main())
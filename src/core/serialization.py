@@ -0,0 +1,38 @@
+"""
+Fast JSON serialization with orjson, falling back to the standard library
+"""
+
+import json
+from typing import Any
+
+try:  # Optional dependency: ~5-10x faster dumps/loads on large payloads
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for numpy scalars/arrays in the stdlib path"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def backend() -> str:
+    return "orjson" if orjson is not None else "json"
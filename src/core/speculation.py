@@ -0,0 +1,167 @@
+"""
+Speculative direct answers - LLM call overlapped with retrieval
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+from src.core.cache import make_key
+from src.core.config import get_config
+from src.llm.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeCall:
+    """Direct-answer LLM call started before the relevance gate decided"""
+
+    __slots__ = ("key", "task", "prompt_tokens", "started", "finished", "retrieval_ms", "used", "settled")
+
+    def __init__(self, key: str, task: "asyncio.Future", prompt_tokens: int):
+        self.key = key
+        self.task = task
+        self.prompt_tokens = prompt_tokens
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.retrieval_ms: Optional[float] = None
+        self.used = False
+        self.settled = False
+        task.add_done_callback(self._done)
+
+    def _done(self, task: "asyncio.Future"):
+        self.finished = time.perf_counter()
+        if not task.cancelled():
+            task.exception()  # retrieved so an unused failure is not logged as lost
+
+    def pending(self) -> bool:
+        """Not consumed yet by the direct path"""
+        return not self.used and not self.task.cancelled()
+
+    def answer_tokens(self) -> int:
+        if not self.task.done() or self.task.cancelled() or self.task.exception() is not None:
+            return 0
+        return estimate_tokens(self.task.result().get("response") or "")
+
+    def to_metadata(self, outcome: str, saved_ms: float = 0.0) -> Dict[str, Any]:
+        return {
+            "outcome": outcome,
+            "used": self.used,
+            "retrieval_ms": round(self.retrieval_ms, 2) if self.retrieval_ms is not None else None,
+            "saved_ms": round(saved_ms, 2)
+        }
+
+
+class SpeculationTracker:
+    """
+    Starts the direct-answer call alongside retrieval. Off-topic queries
+    then wait max(retrieval, LLM) instead of the sum; on-topic ones cancel
+    the call, or park its answer for the raw pane (/api/query-raw with the
+    same key, provider and query), which reuses it instead of calling again.
+
+    Tracks time saved on used calls and tokens spent on answers nobody read
+    (prompt only for cancelled calls, prompt + answer for expired ones).
+    """
+
+    def __init__(self):
+        self._parked: Dict[str, SpeculativeCall] = {}
+        self._parked_at: Dict[str, float] = {}
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0
+        self.raw_reused = 0
+        self.expired = 0
+        self.time_saved_ms = 0.0
+        self.tokens_wasted = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def enabled_for(mode: str) -> bool:
+        config = get_config().speculation
+        return config.enabled and mode in config.modes
+
+    @staticmethod
+    def key(api_key: str, provider: str, query: str) -> str:
+        return make_key(api_key, provider, query)
+
+    def start(self, key: str, prompt: str, call: Awaitable[Dict[str, Any]]) -> SpeculativeCall:
+        self._expire()
+        self.started += 1
+        return SpeculativeCall(key, asyncio.ensure_future(call), estimate_tokens(prompt))
+
+    async def take(self, call: SpeculativeCall) -> Tuple[Dict[str, Any], float]:
+        """Await the speculative result for the direct path: (llm_client result, ms saved)"""
+        call.used = True
+        result = await call.task
+        call_ms = ((call.finished or time.perf_counter()) - call.started) * 1000
+        saved_ms = min(call.retrieval_ms or 0.0, call_ms)
+        self.used += 1
+        self.time_saved_ms += saved_ms
+        return result, saved_ms
+
+    def release(self, call: Optional[SpeculativeCall], park: bool = True) -> Optional[str]:
+        """Park the call for the raw pane, or cancel it if nothing will read it; returns the outcome"""
+        if call is None or call.settled:
+            return None
+        call.settled = True
+        if park and get_config().speculation.keep_for_raw and not call.task.cancelled():
+            self._parked[call.key] = call
+            self._parked_at[call.key] = time.monotonic()
+            return "used" if call.used else "parked"
+        if call.used:
+            return "used"
+        return self._discard(call)
+
+    def claim(self, key: str) -> Optional[SpeculativeCall]:
+        """Parked call for a raw pane request, if any (each call is claimed once)"""
+        self._expire()
+        call = self._parked.pop(key, None)
+        self._parked_at.pop(key, None)
+        if call is not None:
+            self.raw_reused += 1
+        return call
+
+    async def wait(self, call: SpeculativeCall) -> Dict[str, Any]:
+        result = await call.task
+        self.tokens_saved += call.prompt_tokens + call.answer_tokens()
+        return result
+
+    def _discard(self, call: SpeculativeCall) -> str:
+        """Unread call: cancel it if still running and count the tokens spent"""
+        if call.task.done():
+            self.tokens_wasted += call.prompt_tokens + call.answer_tokens()
+            return "discarded"
+        call.task.cancel()
+        self.cancelled += 1
+        self.tokens_wasted += call.prompt_tokens
+        return "cancelled"
+
+    def _expire(self):
+        ttl = get_config().speculation.raw_ttl
+        now = time.monotonic()
+        for key in [k for k, parked_at in self._parked_at.items() if now - parked_at > ttl]:
+            call = self._parked.pop(key)
+            del self._parked_at[key]
+            self.expired += 1
+            if not call.used:
+                self._discard(call)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": get_config().speculation.enabled,
+            "started": self.started,
+            "used": self.used,
+            "use_rate": round(self.used / self.started, 4) if self.started else 0.0,
+            "cancelled": self.cancelled,
+            "parked": len(self._parked),
+            "raw_reused": self.raw_reused,
+            "expired": self.expired,
+            "time_saved_ms": round(self.time_saved_ms, 2),
+            "mean_saved_ms": round(self.time_saved_ms / self.used, 2) if self.used else None,
+            "tokens_wasted": self.tokens_wasted,
+            "tokens_saved": self.tokens_saved
+        }
+
+# Global instance
+speculation = SpeculationTracker()
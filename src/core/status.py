@@ -0,0 +1,89 @@
+"""
+Status snapshot - Subsystem stats collected in the background, read in constant time
+"""
+
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+class StatusMonitor:
+    """
+    Sources are callables returning a dict of stats (optionally with their
+    own "status"). refresh() calls them all and swaps in a new snapshot; a
+    background task does it every status.refresh_interval, so health and
+    status probes only read the last snapshot and never touch providers,
+    the index or the disk.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._refreshed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
+    def add_source(self, name: str, source: Callable[[], Dict[str, Any]]):
+        self._sources[name] = source
+
+    def refresh(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        subsystems = {}
+        for name, source in list(self._sources.items()):
+            try:
+                subsystems[name] = {"status": "operational", **source()}
+            except Exception as e:
+                logger.error(f"Error leyendo el estado de {name}: {e}")
+                subsystems[name] = {"status": "error", "error": str(e)}
+        self._snapshot = {
+            "subsystems": subsystems,
+            "timestamp": datetime.now().isoformat(),
+            "refresh_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+        self._refreshed_at = time.monotonic()
+        self.refreshes += 1
+        return self._snapshot
+
+    @property
+    def snapshot(self) -> Dict[str, Any]:
+        """Last snapshot (built once on first read if the refresher is not running)"""
+        return self._snapshot if self._snapshot is not None else self.refresh()
+
+    def age(self) -> Optional[float]:
+        return time.monotonic() - self._refreshed_at if self._refreshed_at is not None else None
+
+    def stale(self) -> bool:
+        """The background refresher stopped keeping up (only meaningful while it runs)"""
+        age = self.age()
+        return self.running and age is not None and age > 3 * get_config().status.refresh_interval
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> bool:
+        if self.running:
+            return False
+        self.refresh()
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(get_config().status.refresh_interval)
+            self.refresh()
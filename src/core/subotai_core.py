@@ -1,17 +1,54 @@
 """
 SUBOTAI Core - Con Juez RAG y colores
 """
+import time
+import asyncio
 import logging
 from typing import Dict, Any, Optional
 from src.logic.reasoning_engine import ReasoningEngine
 from src.rag.knowledge_base import knowledge_base
 from src.rag.rag_orchestrator import rag_orchestrator
+from src.rag.relevance_gate import relevance_gate
+from src.rag.compression import context_compressor
+from src.rag.extractive import extractive_answerer
+from src.rag.verifier import claim_verifier
+from src.logic.quality_metrics import quality_metrics_engine
+from src.logic.cascade import model_cascade
+from src.core.cache import TTLCache, make_key
+from src.core.config import ModeProfile, get_config
+from src.core.deadline import Deadline
+from src.core.metrics import StageTimer, mode_latency
+from src.core.speculation import SpeculativeCall, speculation
+from src.core.query_log import query_log
+from src.core.status import StatusMonitor
+from src.llm.llm_client import llm_client
+from src.llm.scheduler import llm_scheduler
+from src.rag.document_store import document_store
+from src.rag.term_dictionary import term_dictionary
+from src import __version__
 
 logger = logging.getLogger(__name__)
 
 class SubotaiCore:
     def __init__(self):
         self.reasoning_engine = ReasoningEngine()
+        # Respuestas finales por consulta + documentos (modos cache-first)
+        self.answer_cache = TTLCache(lambda: (get_config().caches.answer_size, get_config().caches.answer_ttl))
+        # Instantánea del estado (refrescada en segundo plano por la app)
+        self.status_monitor = StatusMonitor()
+        self.status_monitor.add_source("reasoning_engine", self.reasoning_engine.get_status)
+        self.status_monitor.add_source("knowledge_base", lambda: knowledge_base.get_stats())
+        self.status_monitor.add_source("document_store", document_store.get_stats)
+        self.status_monitor.add_source("llm", self._llm_status)
+        self.status_monitor.add_source("caches", lambda: {
+            "answers": self.answer_cache.get_stats(),
+            "translations": term_dictionary.get_stats()
+        })
+        self.status_monitor.add_source("queues", lambda: {
+            "llm_in_flight": llm_client.in_flight,
+            "query_log_pending": query_log.get_stats()["pending"],
+            "speculation_parked": speculation.get_stats()["parked"]
+        })
         self._initialized = True
     
     def initialize(self) -> bool:
@@ -19,15 +56,154 @@ class SubotaiCore:
         self._initialized = True
         return True
     
+    @staticmethod
+    def _llm_status() -> Dict[str, Any]:
+        stats = llm_client.get_stats()
+        failing = [p for p, provider in stats["providers"].items() if provider["state"] == "failing"]
+        return {**stats, "status": "degraded" if failing else "operational"}
+    
+    def get_health(self) -> Dict[str, Any]:
+        """Sondeo del balanceador: lectura de la instantánea, sin tocar proveedores ni índice"""
+        return {
+            "status": "healthy" if self._initialized else "unhealthy",
+            "timestamp": self.status_monitor.snapshot["timestamp"],
+            "version": __version__
+        }
+    
+    def get_system_status(self) -> Dict[str, Any]:
+        """Estado por subsistema desde la instantánea (índice, pool, cachés, proveedores, colas)"""
+        snapshot = self.status_monitor.snapshot
+        subsystems = dict(snapshot["subsystems"])
+        subsystems["status_snapshot"] = {
+            "status": "stale" if self.status_monitor.stale() else "operational",
+            "age": round(self.status_monitor.age() or 0.0, 3),
+            "refreshes": self.status_monitor.refreshes,
+            "refresh_ms": snapshot["refresh_ms"]
+        }
+        healthy = all(sub.get("status") == "operational" for sub in subsystems.values())
+        return {
+            "status": "operational" if self._initialized and healthy else "degraded",
+            "initialized": self._initialized,
+            "subsystems": subsystems,
+            "timestamp": snapshot["timestamp"],
+            "version": __version__
+        }
+    
     async def process_query(self, query: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        if context is None:
-            context = {}
-            
+        """
+        Ejecuta la consulta con el perfil de su modo (FAST, STRICT, ...):
+        deadline, modelo, top-k, presupuesto de tokens, verificador y caché.
+        Registra la latencia total en el histograma del modo y la consulta
+        en el registro binario (escrito en segundo plano).
+        """
+        started = time.perf_counter()
+        context = dict(context or {})
+        mode = context.get('forced_mode', 'auto')
+        profile = get_config().modes.profile(mode)
+        self._apply_profile(context, profile)
+        
+        result = None
+        cache_key = self._cache_key(query, context)
+        if profile.cache_first and context.get('api_key'):
+            cached = self.answer_cache.get(cache_key)
+            if cached is not None:
+                value, age = cached
+                result = {"response": value["response"], "metadata": {**value["metadata"], "cache": {"hit": True, "age": round(age, 3)}}}
+        
+        if result is None:
+            result = await self._run_speculative(query, context, profile)
+            if self._cacheable(result):
+                self.answer_cache.set(cache_key, {"response": result["response"], "metadata": dict(result["metadata"])})
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        mode_latency.observe(mode, elapsed_ms, profile.timeout * 1000 if profile.timeout else None)
+        result["metadata"]["profile"] = {
+            "mode": mode,
+            "timeout": profile.timeout,
+            "cache_hit": "cache" in result["metadata"],
+            "latency_ms": round(elapsed_ms, 2)
+        }
+        query_log.record(query, context, result)
+        return result
+    
+    @staticmethod
+    def _apply_profile(context: Dict[str, Any], profile: ModeProfile):
+        """Deadline del perfil (nunca más largo que el del cliente) y opciones del LLM"""
+        if profile.timeout:
+            deadline = context.get('deadline')
+            profile_deadline = Deadline.from_timeout(profile.timeout)
+            if deadline is None or profile_deadline.expires_at < deadline.expires_at:
+                context['deadline'] = profile_deadline
+        llm_options = {}
+        if profile.models:
+            llm_options['models'] = profile.models
+        if profile.max_tokens:
+            llm_options['max_tokens'] = profile.max_tokens
+        context['llm_options'] = llm_options
+    
+    @staticmethod
+    def _cache_key(query: str, context: Dict[str, Any]) -> str:
+        """
+        Por tenant (huella de la API key): una key inventada no reutiliza
+        respuestas pagadas por otra. Incluye la versión del corpus, así una
+        re-importación no sirve respuestas del corpus anterior.
+        """
+        documents = tuple(
+            (doc.get('name'), make_key(doc.get('content'))) for doc in context.get('user_documents') or ()
+        )
+        handles = tuple(doc.handle for doc in context.get('stored_documents') or ())
+        return make_key(
+            " ".join(query.lower().split()), context.get('docs_language', 'es'),
+            context.get('provider', 'openai'), documents, handles,
+            llm_scheduler.tenant_for(context.get('api_key') or ''), knowledge_base.version
+        )
+    
+    @staticmethod
+    def _cacheable(result: Dict[str, Any]) -> bool:
+        """Solo respuestas completas: sin errores ni etapas omitidas por el deadline"""
+        metadata = result.get("metadata", {})
+        if metadata.get("error") or (metadata.get("deadline") or {}).get("skipped_stages"):
+            return False
+        issues = (metadata.get("quality_metrics") or {}).get("issues_detected", [])
+        return "error_response" not in issues and not result["response"].removeprefix("[ROJO]").startswith("Error")
+    
+    async def _run_speculative(self, query: str, context: Dict[str, Any], profile: ModeProfile) -> Dict[str, Any]:
+        """
+        Con la especulación activa, la llamada directa al LLM arranca junto a
+        la recuperación: si la compuerta falla ya está en curso; si pasa, se
+        cancela o se guarda para el panel raw.
+        """
+        mode = context.get('forced_mode', 'auto')
+        api_key = context.get('api_key')
+        if not api_key or not speculation.enabled_for(mode):
+            return await self._run_pipeline(query, context, profile)
+        
+        llm_options = model_cascade.first_options(context.get('llm_options', {}), escalate=profile.cascade)
+        provider = self.reasoning_engine.detect_provider(api_key, context.get('provider', 'openai'))
+        speculative = speculation.start(
+            speculation.key(api_key, provider, query), query,
+            self.reasoning_engine.query_llm(query, {**context, 'llm_options': llm_options})
+        )
         try:
+            result = await self._run_pipeline(query, context, profile, speculative)
+        except BaseException:
+            speculation.release(speculative, park=False)
+            raise
+        outcome = speculation.release(speculative, park=not result["metadata"].get("error"))
+        result["metadata"].setdefault("speculation", speculative.to_metadata(outcome))
+        return result
+    
+    async def _run_pipeline(self, query: str, context: Dict[str, Any], profile: ModeProfile,
+                            speculative: Optional[SpeculativeCall] = None) -> Dict[str, Any]:
+        try:
+            started = time.perf_counter()
             api_key = context.get('api_key')
             provider = context.get('provider', 'openai')
             docs_language = context.get('docs_language', 'es')
             user_documents = context.get('user_documents')  # ✅ Obtener docs de usuario
+            stored_documents = context.get('stored_documents')  # Documentos subidos (por handle)
+            mode = context.get('forced_mode', 'auto')
+            deadline = context.get('deadline')  # Deadline opcional de la petición
             
             if not api_key:
                 return {
@@ -35,37 +211,160 @@ class SubotaiCore:
                     "metadata": {"error": True}
                 }
             
+            if deadline is not None and deadline.expired():
+                return {
+                    "response": "Error: Deadline exceeded",
+                    "metadata": {"error": True, "deadline_exceeded": True}
+                }
+            
+            def has_budget() -> bool:
+                """¿Queda tiempo para etapas locales opcionales?"""
+                return deadline is None or deadline.has_budget(get_config().deadlines.min_stage_budget)
+            
+            skipped_stages = []
+            timer = StageTimer()  # ms por etapa, para el registro de consultas
+            
             # 1. BUSCAR EN BASE DE CONOCIMIENTO (A + documentos de usuario)
-            knowledge_content = knowledge_base.search(query, user_documents=user_documents)
+            retrieve_args = dict(
+                user_documents=user_documents, docs_language=docs_language,
+                deadline=deadline, stored_documents=stored_documents, top_k=profile.top_k
+            )
+            if speculative is None:
+                retrieval = knowledge_base.retrieve(query, **retrieve_args)
+            else:
+                # En un hilo, para que la llamada especulativa avance mientras tanto
+                retrieval = await asyncio.to_thread(knowledge_base.retrieve, query, **retrieve_args)
+                speculative.retrieval_ms = (time.perf_counter() - speculative.started) * 1000
+            knowledge_content = retrieval.content
+            timer.lap("retrieval")
+            
+            # 1b. COMPUERTA DE RELEVANCIA - consultas fuera de tema van directas
+            gate = relevance_gate.evaluate(retrieval)
             
             response = ""
             rag_used = False
+            compression = {"applied": False}
+            verification = None
+            cascade = None
+            speculation_metadata = None
             
-            if knowledge_content:
+            # 1c. CAMINO EXTRACTIVO - FAQ con alta confianza, sin llamar al LLM
+            extractive = extractive_answerer.answer(retrieval, mode=mode) if gate["passed"] else None
+            timer.lap("gate")
+            if extractive:
+                quality = self._quality(query, extractive["response"], retrieval, None)
+                timer.lap("quality")
+                return {
+                    "response": extractive["response"],
+                    "metadata": {
+                        "rag_used": True,
+                        "mode": "extractive",
+                        "verified": True,
+                        "llm_calls": 0,
+                        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+                        "extractive": extractive,
+                        "relevance_gate": gate,
+                        "retrieval": retrieval.to_metadata(),
+                        **quality,
+                        "timings": timer.timings
+                    }
+                }
+            
+            if gate["passed"]:
+                # 1d. COMPRESIÓN EXTRACTIVA - solo las frases útiles llegan al Juez
+                if has_budget():
+                    compressed = context_compressor.compress_retrieval(
+                        retrieval, token_budget=profile.token_budget, ratio=profile.compression_ratio
+                    )
+                else:
+                    skipped_stages.append("compression")
+                    compressed = {"content": retrieval.content, "kept_chunks": retrieval.packed_chunks, "stats": {"applied": False}}
+                knowledge_content = compressed["content"]
+                compression = compressed["stats"]
+                timer.lap("compression")
+                
                 # 2. USAR JUEZ RAG 
                 print(f"🔍 RAG encontrado: {len(knowledge_content)} caracteres")
                 print(f"📖 Idioma documentos BD: {docs_language}")
-                response = await rag_orchestrator.generate_response(
-                    query=query,
-                    knowledge_content=knowledge_content,
-                    api_key=api_key,
-                    provider=provider,
-                    docs_language=docs_language
+                verify = get_config().verifier.enabled if profile.verify is None else profile.verify
+                
+                async def judge(llm_options: Dict[str, Any]) -> str:
+                    return await rag_orchestrator.generate_response(
+                        query=query,
+                        knowledge_content=knowledge_content,
+                        api_key=api_key,
+                        provider=provider,
+                        docs_language=docs_language,
+                        deadline=deadline,
+                        **llm_options
+                    )
+                
+                def assess(answer: str) -> Dict[str, Any]:
+                    # 2b. VERIFICADOR LOCAL - los [NORMAL] sin soporte pasan a [ROJO]
+                    checked = None
+                    if verify and has_budget():
+                        timer.lap("generation")
+                        checked = claim_verifier.verify(answer, compressed["kept_chunks"], retrieval.docs_language)
+                        answer = checked.pop("response")
+                        timer.lap("verification")
+                    return {"response": answer, "verification": checked,
+                            **model_cascade.score(answer, retrieval.best_score, checked)}
+                
+                # Cascada: modelo barato primero, el fuerte solo si la puntuación local es baja
+                outcome = await model_cascade.run(
+                    judge, assess, context.get('llm_options', {}), deadline, escalate=profile.cascade
                 )
+                response, verification, cascade = outcome["response"], outcome["verification"], outcome["cascade"]
+                timer.lap("generation")
                 rag_used = True
+                if verify and verification is None:
+                    skipped_stages.append("verification")
             else:
                 # 3. RESPUESTA NORMAL (solo B)
-                logger.info("Sin información en BD - Respuesta normal")
-                result = await self.reasoning_engine.process_query(query, context)
-                response = result["response"]
+                logger.info(f"Sin información relevante en BD ({gate['reason']}) - Respuesta normal")
+                
+                speculated = {}
+                
+                async def direct(llm_options: Dict[str, Any]) -> str:
+                    if speculative is not None and speculative.pending():
+                        # Primer nivel: la llamada especulativa ya está en curso con estas opciones
+                        result, speculated["saved_ms"] = await speculation.take(speculative)
+                        return self.reasoning_engine.to_response(result)
+                    result = await self.reasoning_engine.process_query(query, {**context, 'llm_options': llm_options})
+                    return result["response"]
+                
+                def assess_direct(answer: str) -> Dict[str, Any]:
+                    return {"response": answer, **model_cascade.score(answer, grounded=False)}
+                
+                outcome = await model_cascade.run(
+                    direct, assess_direct, context.get('llm_options', {}), deadline, escalate=profile.cascade
+                )
+                cascade = outcome["cascade"]
+                timer.lap("generation")
+                if speculated:
+                    speculation_metadata = speculative.to_metadata("used", speculated["saved_ms"])
                 # Marcar toda la respuesta como no verificada
-                response = f"[ROJO]{response}[/ROJO]"
+                response = f"[ROJO]{outcome['response']}[/ROJO]"
             
+            quality = self._quality(query, response, retrieval if rag_used else None, verification)
+            timer.lap("quality")
             return {
                 "response": response,
                 "metadata": {
                     "rag_used": rag_used,
-                    "mode": "rag" if rag_used else "direct"
+                    "mode": "rag" if rag_used else "direct",
+                    "relevance_gate": gate,
+                    "retrieval": retrieval.to_metadata(),
+                    "compression": compression,
+                    "verification": verification,
+                    "cascade": cascade,
+                    **({"speculation": speculation_metadata} if speculation_metadata else {}),
+                    **quality,
+                    "timings": timer.timings,
+                    "deadline": {
+                        **deadline.to_dict(),
+                        "skipped_stages": skipped_stages
+                    } if deadline is not None else None
                 }
             }
             
@@ -75,6 +374,13 @@ class SubotaiCore:
                 "metadata": {"error": True}
             }
 
+    @staticmethod
+    def _quality(query: str, response: str, retrieval, verification) -> Dict[str, Any]:
+        """Métricas de calidad locales (quality_metrics, quality_gate, truth_risk_score)"""
+        if not get_config().quality_gate.enabled:
+            return {}
+        return quality_metrics_engine.evaluate(query, response, retrieval=retrieval, verification=verification)
+
 _subotai_instance = SubotaiCore()
 
 def get_subotai_core() -> SubotaiCore:
@@ -0,0 +1,143 @@
+"""
+Cache pre-warming - Frequent queries are retrieved before users ask
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import Counter
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core import subotai_core
+from src.core.config import get_config
+from src.core.query_log import SUFFIX as QUERY_LOG_SUFFIX, read_log
+
+logger = logging.getLogger(__name__)
+
+# JSONL fields holding the query text, first match wins
+QUERY_FIELDS = ("query", "question", "title")
+
+
+def read_corpus(path: str) -> Iterator[str]:
+    """Queries from a query log (file or directory), a JSONL file (QUERY_FIELDS) or a plain text file (one per line)"""
+    if os.path.isdir(path) or path.endswith(QUERY_LOG_SUFFIX):
+        yield from (record["query"] for record in read_log(path))
+        return
+    jsonl = path.endswith((".jsonl", ".ndjson"))
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if not jsonl:
+                yield line
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            for name in QUERY_FIELDS:
+                value = record.get(name)
+                if isinstance(value, str) and value.strip():
+                    yield value.strip()
+                    break
+
+
+def rank_queries(queries: Iterable[str], top_n: int) -> List[Tuple[str, int]]:
+    """(query, count) by frequency; case and spacing are ignored, ties keep corpus order"""
+    counts: Counter = Counter()
+    first_seen: Dict[str, str] = {}
+    for query in queries:
+        key = " ".join(query.lower().split())
+        if key:
+            counts[key] += 1
+            first_seen.setdefault(key, query)
+    return [(first_seen[key], count) for key, count in counts.most_common(top_n)]
+
+
+class CacheWarmer:
+    """
+    Background job that fills the retrieval cache for the most frequent
+    queries of the corpus, paced by `rate`. Answers are not warmed: the
+    answer cache is per API key and users bring their own, so no request
+    could hit them. The server accepts traffic meanwhile: retrieval runs
+    in a worker thread.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._reset()
+
+    def _reset(self):
+        self.status = "idle"
+        self.queries_ranked = 0
+        self.retrievals_warmed = 0
+        self.stopped_reason: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.elapsed = 0.0
+
+    def start(self, paths: Optional[List[str]] = None) -> bool:
+        """Schedule a run on the current loop; False if one is already running"""
+        if self._task is not None and not self._task.done():
+            return False
+        self._reset()
+        self.status = "scheduled"
+        self._task = asyncio.create_task(self.run(paths))
+        return True
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self, paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        config = get_config().warmup
+        self._reset()
+        self.status = "running"
+        self.started_at = time.time()
+        started = time.perf_counter()
+        try:
+            paths = [p for p in (paths or config.corpus) if os.path.exists(p)]
+            ranked = rank_queries(chain.from_iterable(read_corpus(p) for p in paths), config.top_n)
+            self.queries_ranked = len(ranked)
+            interval = 1.0 / config.rate if config.rate > 0 else 0.0
+            logger.info(f"🔥 Pre-calentando cachés: {len(ranked)} consultas de {len(paths)} ficheros")
+
+            for query, _ in ranked:
+                tick = time.perf_counter()
+                await asyncio.to_thread(subotai_core.knowledge_base.retrieve, query, docs_language=config.docs_language)
+                self.retrievals_warmed += 1
+                await asyncio.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+            self.status = "done"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Error pre-calentando cachés: {e}")
+            self.status = "failed"
+            self.stopped_reason = str(e)
+        finally:
+            self.elapsed = time.perf_counter() - started
+        logger.info(f"🔥 Pre-calentamiento terminado: {self.retrievals_warmed} recuperaciones")
+        return self.get_stats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "queries_ranked": self.queries_ranked,
+            "retrievals_warmed": self.retrievals_warmed,
+            "stopped_reason": self.stopped_reason,
+            "started_at": self.started_at,
+            "elapsed": round(self.elapsed, 3)
+        }
+
+# Global instance
+cache_warmer = CacheWarmer()
@@ -1,10 +1,17 @@
 """
 Cliente LLM unificado - Maneja TODOS los proveedores directamente
 """
+import time
+import asyncio
 import logging
 import httpx
 from typing import Dict, Any, Optional
 
+from src.core.config import LLMConfig, get_config
+from src.core.serialization import dumps, loads
+from src.llm.scheduler import SchedulerRejected, llm_scheduler
+from src.llm.tokens import estimate_tokens
+
 logger = logging.getLogger(__name__)
 
 class LLMClient:
@@ -23,6 +30,89 @@ class LLMClient:
             "openai": "gpt-3.5-turbo",
             "deepseek": "deepseek-chat"
         }
+        
+        # Pool de conexiones compartido (keep-alive), ligado a su event loop
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        self._pool_settings = None
+        
+        # Resultado de las llamadas por proveedor (para el estado del sistema)
+        self.in_flight = 0
+        self._providers: Dict[str, Dict[str, Any]] = {}
+    
+    # Fallos seguidos (red, timeout, 5xx) a partir de los que un proveedor se marca "failing"
+    FAILING_AFTER = 3
+    
+    def _record(self, provider: str, ok: bool, error: Optional[str] = None):
+        """Errores del proveedor (no los de la API key del usuario: 401/403/429)"""
+        stats = self._providers.setdefault(provider, {
+            "calls": 0, "failures": 0, "consecutive_failures": 0, "last_error": None, "last_success": None
+        })
+        stats["calls"] += 1
+        if ok:
+            stats["consecutive_failures"] = 0
+            stats["last_success"] = time.time()
+        else:
+            stats["failures"] += 1
+            stats["consecutive_failures"] += 1
+            stats["last_error"] = error
+    
+    def get_stats(self) -> Dict[str, Any]:
+        config = get_config().llm
+        return {
+            "pool": {
+                "open": self._client is not None,
+                "max_connections": config.max_connections,
+                "max_keepalive_connections": config.max_keepalive_connections
+            },
+            "in_flight": self.in_flight,
+            "providers": {
+                provider: {
+                    **stats,
+                    "state": "failing" if stats["consecutive_failures"] >= self.FAILING_AFTER else "ok"
+                }
+                for provider, stats in self._providers.items()
+            }
+        }
+    
+    @staticmethod
+    def _pool_key(config: LLMConfig) -> tuple:
+        return (config.max_connections, config.max_keepalive_connections,
+                config.keepalive_expiry, config.connect_timeout)
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Cliente httpx reutilizado; se recrea si cambia el pool en la config o el event loop"""
+        config = get_config().llm
+        loop = asyncio.get_running_loop()
+        settings = self._pool_key(config)
+        if self._client is not None and self._client_loop is loop and self._pool_settings == settings:
+            return self._client
+        
+        old_client, old_loop = self._client, self._client_loop
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(config.timeout, connect=config.connect_timeout)
+        )
+        self._client_loop, self._pool_settings = loop, settings
+        if old_client is not None and old_loop is loop:
+            # Peticiones en curso con el cliente anterior pueden terminar antes de cerrarlo
+            asyncio.ensure_future(self._close_later(old_client, config.timeout))
+        return self._client
+    
+    @staticmethod
+    async def _close_later(client: httpx.AsyncClient, delay: float):
+        await asyncio.sleep(delay)
+        await client.aclose()
+    
+    async def aclose(self):
+        """Cerrar el pool (apagado de la aplicación)"""
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = self._client_loop = self._pool_settings = None
     
     async def query(
         self, 
@@ -33,6 +123,10 @@ class LLMClient:
     ) -> Dict[str, Any]:
         """
         Query unificada a CUALQUIER proveedor
+        
+        kwargs opcionales: model, models ({proveedor: modelo}), temperature,
+        max_tokens, deadline (Deadline), workload (clase del planificador;
+        por defecto la del contexto)
         """
         try:
             print(f"🔍 LLMClient QUERY:")
@@ -40,7 +134,7 @@ class LLMClient:
             print(f"   API Key: {api_key[:10]}...")
             print(f"   Prompt: {prompt[:100]}...")
             
-            url = self.provider_urls.get(provider)
+            url = get_config().llm.provider_urls.get(provider) or self.provider_urls.get(provider)
             model = self.default_models.get(provider, "gpt-3.5-turbo")
             
             if not url:
@@ -50,39 +144,34 @@ class LLMClient:
                     "provider": provider
                 }
             
+            config = get_config().llm
             payload = {
-                "model": kwargs.get("model", model),
+                "model": kwargs.get("model") or kwargs.get("models", {}).get(provider) or model,
                 "messages": [{"role": "user", "content": prompt}],
-                "temperature": kwargs.get("temperature", 0.7),
-                "max_tokens": kwargs.get("max_tokens", 1000),
+                "temperature": kwargs.get("temperature", config.temperature),
+                "max_tokens": kwargs.get("max_tokens", config.max_tokens),
                 "stream": False
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    url,
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload
+            # Turno justo entre API keys y clases de carga (interactive, batch, warmup)
+            deadline = kwargs.get("deadline")
+            workload = llm_scheduler.workload_for(kwargs.get("workload"))
+            try:
+                await llm_scheduler.acquire(
+                    llm_scheduler.tenant_for(api_key), workload,
+                    estimate_tokens(prompt) + payload["max_tokens"], deadline
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "response": data["choices"][0]["message"]["content"],
-                        "provider": provider,
-                        "model": data["model"]
-                    }
-                else:
-                    error_msg = self._parse_error(response, provider)
-                    return {
-                        "success": False,
-                        "error": error_msg,
-                        "provider": provider
-                    }
+            except SchedulerRejected as e:
+                return {
+                    "success": False,
+                    "error": f"Demasiadas llamadas en espera a {provider} ({e.reason})",
+                    "provider": provider,
+                    "overloaded": True
+                }
+            try:
+                return await self._send(url, payload, api_key, provider, deadline)
+            finally:
+                llm_scheduler.release()
                     
         except Exception as e:
             print(f"🔍 LLMClient EXCEPTION: {e}")
@@ -93,6 +182,59 @@ class LLMClient:
                 "provider": provider
             }
     
+    async def _send(self, url: str, payload: Dict[str, Any], api_key: str, provider: str, deadline) -> Dict[str, Any]:
+        """Petición al proveedor (con turno del planificador ya concedido)"""
+        config = get_config().llm
+        # Respetar el deadline de la petición: no empezar si no da tiempo
+        timeout = config.timeout
+        if deadline is not None:
+            if not deadline.has_budget(get_config().deadlines.min_llm_budget):
+                return {
+                    "success": False,
+                    "error": f"Deadline agotado antes de llamar a {provider}",
+                    "provider": provider,
+                    "deadline_exceeded": True
+                }
+            timeout = deadline.timeout(timeout)
+        
+        client = await self._get_client()
+        self.in_flight += 1
+        try:
+            response = await client.post(
+                url,
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                },
+                content=dumps(payload),  # Bytes ya codificados, sin pasar por json de httpx
+                timeout=httpx.Timeout(timeout, connect=min(config.connect_timeout, timeout))
+            )
+        except httpx.HTTPError as e:
+            self._record(provider, False, type(e).__name__)
+            raise
+        finally:
+            self.in_flight -= 1
+        if response.status_code >= 500:
+            self._record(provider, False, f"HTTP {response.status_code}")
+        elif response.status_code == 200:
+            self._record(provider, True)
+        
+        if response.status_code == 200:
+            data = loads(response.content)
+            return {
+                "success": True,
+                "response": data["choices"][0]["message"]["content"],
+                "provider": provider,
+                "model": data["model"]
+            }
+        else:
+            error_msg = self._parse_error(response, provider)
+            return {
+                "success": False,
+                "error": error_msg,
+                "provider": provider
+            }
+    
     def _parse_error(self, response, provider: str) -> str:
         """Parsear errores de API"""
         if response.status_code == 401:
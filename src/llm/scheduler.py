@@ -0,0 +1,219 @@
+"""
+Planificador de llamadas al LLM - Reparto justo entre API keys y cargas de trabajo
+
+Cada (tenant, clase) es un flujo con su cola. Los flujos con llamadas en
+espera se atienden por deficit round-robin: en cada turno un flujo suma
+quantum * peso de la clase * peso del tenant a su déficit y envía llamadas
+mientras el coste (tokens de prompt + respuesta máxima) quepa en él. Un
+tope global limita las llamadas en curso; un usuario pesado solo alarga su
+propia cola.
+"""
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from src.core.cache import make_key
+from src.core.config import SchedulerConfig, get_config
+from src.core.metrics import LatencyMetrics
+
+logger = logging.getLogger(__name__)
+
+# Clase de prioridad de las llamadas del contexto actual (petición o tarea)
+current_workload: ContextVar[str] = ContextVar("subotai_workload", default="interactive")
+
+
+class SchedulerRejected(Exception):
+    """La llamada no obtuvo turno: cola llena o espera agotada"""
+
+    def __init__(self, workload: str, reason: str):
+        super().__init__(f"LLM call ({workload}) not scheduled: {reason}")
+        self.workload = workload
+        self.reason = reason
+
+
+class _Request:
+    __slots__ = ("future", "cost")
+
+    def __init__(self, future: asyncio.Future, cost: int):
+        self.future = future
+        self.cost = cost
+
+
+class _Flow:
+    __slots__ = ("tenant", "workload", "deficit", "queue")
+
+    def __init__(self, tenant: str, workload: str):
+        self.tenant = tenant
+        self.workload = workload
+        self.deficit = 0.0
+        self.queue: Deque[_Request] = deque()
+
+
+class LLMScheduler:
+    """
+    Tope global de llamadas en curso con colas por (tenant, clase) servidas
+    por deficit round-robin. Los límites y pesos se leen de la configuración
+    activa en cada llamada, así que se ajustan en caliente.
+    """
+
+    def __init__(self, config: Optional[SchedulerConfig] = None):
+        self._config = config
+        self.in_flight = 0
+        self._flows: Dict[Tuple[str, str], _Flow] = {}
+        self._active: Deque[_Flow] = deque()
+        self.waits = LatencyMetrics()
+        self.dispatched: Counter = Counter()
+        self.rejected: Counter = Counter()
+
+    @property
+    def config(self) -> SchedulerConfig:
+        return self._config or get_config().scheduler
+
+    @staticmethod
+    def tenant_for(api_key: str) -> str:
+        """Huella de la API key (nunca la key): identifica al tenant en pesos y estadísticas"""
+        return make_key("tenant", api_key)[:12]
+
+    def workload_for(self, workload: Optional[str] = None) -> str:
+        workload = workload or current_workload.get()
+        return workload if workload in self.config.class_weights else "batch"
+
+    def _quantum(self, flow: _Flow) -> float:
+        """Siempre positivo (al menos un token): con quantum 0 _dispatch no avanzaría nunca"""
+        config = self.config
+        quantum = config.quantum * config.class_weights.get(flow.workload, 1.0) * config.tenant_weights.get(flow.tenant, 1.0)
+        return max(quantum, 1.0)
+
+    async def acquire(self, tenant: str, workload: Optional[str] = None, cost: int = 1, deadline=None) -> float:
+        """Esperar turno; devuelve los ms de espera. Raises SchedulerRejected"""
+        config = self.config
+        workload = self.workload_for(workload)
+        if not config.enabled or (self.in_flight < config.max_concurrent and not self._active):
+            self._grant(workload)
+            self.waits.observe(workload, 0.0, config.wait_objectives_ms.get(workload))
+            return 0.0
+
+        flow = self._flows.get((tenant, workload))
+        if flow is None:
+            flow = self._flows[(tenant, workload)] = _Flow(tenant, workload)
+        if len(flow.queue) >= config.max_queue_per_tenant:
+            self.rejected[workload] += 1
+            raise SchedulerRejected(workload, "queue_full")
+
+        request = _Request(asyncio.get_running_loop().create_future(), max(1, cost))
+        flow.queue.append(request)
+        if len(flow.queue) == 1:
+            self._activate(flow)
+        self._dispatch()
+
+        timeout = config.max_queue_wait
+        if deadline is not None:
+            timeout = min(timeout, max(deadline.remaining() - get_config().deadlines.min_llm_budget, 0.0))
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(request.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if request.future.done():
+                self.release()  # el turno llegó justo al cancelar: se devuelve
+            else:
+                request.future.cancel()
+                self._remove(flow, request)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected[workload] += 1
+                raise SchedulerRejected(workload, "queue_timeout")
+            raise
+        finally:
+            if not flow.queue and flow not in self._active:
+                self._flows.pop((tenant, workload), None)
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.waits.observe(workload, wait_ms, config.wait_objectives_ms.get(workload))
+        return wait_ms
+
+    def release(self):
+        """Liberar una llamada en curso y dar el turno al siguiente flujo"""
+        self.in_flight = max(self.in_flight - 1, 0)
+        self._dispatch()
+
+    def _grant(self, workload: str):
+        self.in_flight += 1
+        self.dispatched[workload] += 1
+
+    def _activate(self, flow: _Flow):
+        """Flujo con llamadas en espera: al final de la ronda (si es el único, recibe ya su quantum)"""
+        self._active.append(flow)
+        if len(self._active) == 1:
+            flow.deficit += self._quantum(flow)
+
+    def _advance(self, drop: bool):
+        """Siguiente flujo en cabeza (el actual sale si se vació); la nueva cabeza suma su quantum"""
+        if drop:
+            self._active.popleft().deficit = 0.0
+        else:
+            self._active.rotate(-1)
+        if self._active:
+            self._active[0].deficit += self._quantum(self._active[0])
+
+    def _remove(self, flow: _Flow, request: _Request):
+        if request in flow.queue:
+            head = bool(self._active) and self._active[0] is flow
+            flow.queue.remove(request)
+            if not flow.queue and flow in self._active:
+                if head:
+                    self._advance(drop=True)
+                else:
+                    self._active.remove(flow)
+                    flow.deficit = 0.0
+
+    def _dispatch(self):
+        while self.in_flight < self.config.max_concurrent and self._active:
+            flow = self._active[0]
+            request = flow.queue[0]
+            if request.future.done():
+                flow.queue.popleft()  # cancelada mientras esperaba
+                if not flow.queue:
+                    self._advance(drop=True)
+                continue
+            if request.cost > flow.deficit:
+                self._advance(drop=False)
+                continue
+            flow.queue.popleft()
+            flow.deficit -= request.cost
+            if not flow.queue:
+                self._advance(drop=True)
+            self._grant(flow.workload)
+            request.future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        config = self.config
+        waits = self.waits.snapshot()
+        classes = {}
+        for workload in config.class_weights:
+            wait = waits.get(workload, {})
+            objective = config.wait_objectives_ms.get(workload)
+            p95 = wait.get("p95_ms")
+            classes[workload] = {
+                "weight": config.class_weights[workload],
+                "queued": sum(len(f.queue) for f in self._flows.values() if f.workload == workload),
+                "dispatched": self.dispatched[workload],
+                "rejected": self.rejected[workload],
+                "wait": {key: wait.get(key) for key in ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")},
+                "objective_p95_ms": objective,
+                "objective_met": None if objective is None or p95 is None else p95 <= objective,
+                "within_objective": wait.get("within_budget")
+            }
+        return {
+            "enabled": config.enabled,
+            "in_flight": self.in_flight,
+            "max_concurrent": config.max_concurrent,
+            "classes": classes,
+            "queues": [
+                {"tenant": f.tenant, "workload": f.workload, "queued": len(f.queue), "deficit": round(f.deficit, 1)}
+                for f in self._flows.values() if f.queue
+            ]
+        }
+
+# Instancia global
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,10 @@
+"""
+Estimación barata de tokens - Sin tokenizador del proveedor
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproximación habitual: ~4 caracteres por token"""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
@@ -0,0 +1,165 @@
+"""
+Model Cascade - Cheap model first, escalate only when the local score is low
+"""
+
+import re
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.core.config import get_config
+from src.core.metrics import LatencyMetrics
+from src.rag.color_segments import segment_ratios
+
+logger = logging.getLogger(__name__)
+
+# Refusals: the model says it cannot answer. Hedges ("maybe", "quizás") and
+# short answers ("Canberra.") are not a signal of a wrong answer
+_REFUSAL_RE = re.compile(
+    r"\b(no estoy segur[oa]|no lo s[eé]|no tengo (suficiente )?informaci[oó]n|no puedo|"
+    r"not sure|i don'?t know|i cannot|i can'?t)\b",
+    re.IGNORECASE
+)
+_ERROR_RE = re.compile(r"^\s*(\[ROJO\])?\s*(Error|System error)\b")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_error(response: str) -> bool:
+    return bool(_ERROR_RE.match(response or ""))
+
+
+class ModelCascade:
+    """
+    Runs a generation callable tier by tier (models from CascadeConfig,
+    cheapest first). Each answer is scored locally on three signals:
+
+    - coverage: share of the non-[ROJO] text marked as verified ([NORMAL],
+      half for [AZUL]); flagging unverifiable claims in [ROJO] is not penalised
+    - support: verifier claim support, or the best retrieval score
+    - confidence: 0 for empty answers and refusals, 1 otherwise
+
+    Signals that do not apply (e.g. no documents) are left out and the
+    weights renormalised, so a direct answer only escalates on a refusal.
+    Errors are never escalated.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.escalations = 0
+        self.tier_latency = LatencyMetrics()
+        self._final_tiers: Dict[int, int] = {}
+
+    @staticmethod
+    def confidence(response: str) -> float:
+        if is_error(response) or not _WORD_RE.search(response or ""):
+            return 0.0
+        return 0.0 if _REFUSAL_RE.search(response) else 1.0
+
+    def score(self, response: str, retrieval_score: Optional[float] = None,
+              verification: Optional[Dict[str, Any]] = None, grounded: bool = True) -> Dict[str, Any]:
+        """Local score 0-100 and its signals"""
+        config = get_config().cascade
+        signals: Dict[str, float] = {"confidence": self.confidence(response)}
+        weights: Dict[str, float] = {"confidence": config.confidence_weight}
+
+        if grounded:
+            ratios = segment_ratios(response)
+            assessed = 1.0 - ratios["ROJO"]
+            signals["coverage"] = (ratios["NORMAL"] + 0.5 * ratios["AZUL"]) / assessed if assessed > 0 else 0.0
+            weights["coverage"] = config.coverage_weight
+            if verification and verification.get("checked"):
+                signals["support"] = verification["supported"] / verification["checked"]
+            else:
+                signals["support"] = retrieval_score or 0.0
+            weights["support"] = config.support_weight
+
+        total = sum(weights.values())
+        value = sum(signals[k] * weights[k] for k in signals) / total if total else 0.0
+        return {"score": round(value * 100.0, 2), "signals": {k: round(v, 4) for k, v in signals.items()}}
+
+    @staticmethod
+    def tiers() -> List[Dict[str, str]]:
+        """Per-tier model maps {provider: model}; providers with fewer tiers repeat their last model"""
+        config = get_config().cascade
+        depth = max((len(models) for models in config.tiers.values()), default=0)
+        return [
+            {provider: models[min(i, len(models) - 1)] for provider, models in config.tiers.items() if models}
+            for i in range(depth)
+        ]
+
+    @staticmethod
+    def enabled(escalate: Optional[bool] = None) -> bool:
+        """The mode profile decides when set (opt-in per mode), otherwise cascade.enabled"""
+        return get_config().cascade.enabled if escalate is None else escalate
+
+    def first_options(self, llm_options: Dict[str, Any], escalate: Optional[bool] = None) -> Dict[str, Any]:
+        """LLM options of the first call run() will make"""
+        tiers = self.tiers() if self.enabled(escalate) else []
+        return {**llm_options, "models": tiers[0]} if tiers else llm_options
+
+    async def run(
+        self,
+        generate: Callable[[Dict[str, Any]], Awaitable[str]],
+        assess: Callable[[str], Dict[str, Any]],
+        llm_options: Dict[str, Any],
+        deadline=None,
+        escalate: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        generate(llm_options) -> response; assess(response) -> {"response", "score", ...}.
+        Returns the accepted assessment plus {"cascade": metadata}. Without
+        escalation (disabled or mode profile) a single call keeps llm_options.
+        """
+        config = get_config().cascade
+        tiers = self.tiers() if self.enabled(escalate) else []
+        if not tiers:
+            assessment = assess(await generate(llm_options))
+            return {**assessment, "cascade": None}
+
+        self.requests += 1
+        tried = []
+        assessment: Dict[str, Any] = {}
+        for index, models in enumerate(tiers):
+            if index:
+                if deadline is not None and not deadline.has_budget(get_config().deadlines.min_llm_budget):
+                    break
+                self.escalations += 1
+                logger.info(f"🪜 Cascada: puntuación {assessment['score']} < {config.escalation_threshold}, escalando al nivel {index}")
+            started = time.perf_counter()
+            response = await generate({**llm_options, "models": models})
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.tier_latency.observe(f"tier_{index}", elapsed_ms)
+
+            assessment = assess(response)
+            tried.append({
+                "tier": index,
+                "models": models,
+                "score": assessment["score"],
+                "latency_ms": round(elapsed_ms, 2)
+            })
+            if is_error(assessment["response"]) or assessment["score"] >= config.escalation_threshold:
+                break
+
+        final_tier = tried[-1]["tier"]
+        self._final_tiers[final_tier] = self._final_tiers.get(final_tier, 0) + 1
+        return {
+            **assessment,
+            "cascade": {
+                "final_tier": final_tier,
+                "escalated": final_tier > 0,
+                "threshold": config.escalation_threshold,
+                "tiers": tried
+            }
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "escalations": self.escalations,
+            "escalation_rate": round(self.escalations / self.requests, 4) if self.requests else 0.0,
+            "final_tiers": {f"tier_{k}": v for k, v in sorted(self._final_tiers.items())},
+            "tier_latency": self.tier_latency.snapshot()
+        }
+
+# Global instance
+model_cascade = ModelCascade()
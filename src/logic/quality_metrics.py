@@ -0,0 +1,165 @@
+"""
+Local Quality Metrics Engine - Scores answers without extra LLM calls
+"""
+
+import re
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.core.config import QualityGateConfig, get_config
+from src.rag.analyzers import detect_language, get_analyzer
+from src.rag.color_segments import parse_segments, segment_ratios
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?;。！？])\s+|\n+")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_ERROR_RE = re.compile(r"^\s*(\[ROJO\])?\s*(Error|System error)\b")
+
+# Answers shorter than this (in words) are penalised on execution
+_MIN_WORDS = 8
+_LONG_SENTENCE_WORDS = 35
+_LONG_WORD_CHARS = 13
+
+
+class QualityMetricsEngine:
+    """
+    Computes the QualityMetricsMetadata scores from the answer text, its
+    color segment proportions and the retrieval scores, then applies the
+    QualityGateConfig weights and thresholds.
+
+    - clarity: sentence length, long words and repetition (0-100, higher is better)
+    - truth_risk: unverified color share, unsupported claims, weak retrieval (0-100, lower is better)
+    - execution: query terms addressed and adequate length (0-100)
+    - strategy: grounded share, retrieval support and structure (0-100)
+    """
+
+    @staticmethod
+    def _plain_text(response: str) -> str:
+        return "".join(segment.text for segment in parse_segments(response)) or response or ""
+
+    def clarity(self, text: str) -> float:
+        sentences = [s for s in _SENTENCE_RE.split(text) if s and s.strip()]
+        if not sentences:
+            return 0.0
+        words = _WORD_RE.findall(text)
+        if not words:
+            return 0.0
+
+        lengths = np.fromiter((len(_WORD_RE.findall(s)) for s in sentences), dtype=np.float32, count=len(sentences))
+        word_lengths = np.fromiter((len(w) for w in words), dtype=np.float32, count=len(words))
+        lowered = [w.lower() for w in words if len(w) > 3]
+
+        penalty = (
+            0.35 * np.clip((lengths.mean() - 20.0) / 30.0, 0.0, 1.0)
+            + 0.25 * float((lengths > _LONG_SENTENCE_WORDS).mean())
+            + 0.20 * min(float((word_lengths >= _LONG_WORD_CHARS).mean()) * 4.0, 1.0)
+            + 0.20 * (1.0 - len(set(lowered)) / len(lowered) if len(lowered) > 20 else 0.0)
+        )
+        return float(np.clip(1.0 - penalty, 0.0, 1.0) * 100.0)
+
+    def truth_risk(self, ratios: Dict[str, float], verification: Optional[Dict[str, Any]],
+                   retrieval_score: Optional[float]) -> float:
+        color_risk = ratios['ROJO'] + 0.25 * ratios['AZUL'] + 0.5 * ratios['unmarked']
+        if verification and verification.get("checked"):
+            claim_risk = verification["downgraded"] / verification["checked"]
+        else:
+            claim_risk = color_risk
+        support_risk = 1.0 - retrieval_score if retrieval_score is not None else 1.0
+        risk = np.dot([0.5, 0.3, 0.2], [color_risk, claim_risk, support_risk])
+        return float(np.clip(risk, 0.0, 1.0) * 100.0)
+
+    def execution(self, query: str, text: str) -> float:
+        words = len(_WORD_RE.findall(text))
+        if not words:
+            return 0.0
+        analyzer = get_analyzer(detect_language(query, default='es'))
+        query_terms = set(analyzer.analyze(query))
+        coverage = len(query_terms & set(analyzer.analyze(text))) / len(query_terms) if query_terms else 1.0
+        length = min(words / _MIN_WORDS, 1.0)
+        return float((0.6 * coverage + 0.4 * length) * 100.0)
+
+    def strategy(self, ratios: Dict[str, float], retrieval_score: Optional[float], text: str) -> float:
+        sentences = sum(1 for s in _SENTENCE_RE.split(text) if s and s.strip())
+        structure = min(sentences / 3.0, 1.0)
+        grounded = ratios['NORMAL'] + 0.5 * ratios['AZUL']
+        support = retrieval_score if retrieval_score is not None else 0.0
+        return float(np.dot([0.5, 0.3, 0.2], [grounded, support, structure]) * 100.0)
+
+    @staticmethod
+    def overall(scores: Dict[str, float], config: QualityGateConfig) -> float:
+        weights = config.metric_weights
+        keys = ('clarity', 'truth_risk', 'execution', 'strategy')
+        w = np.array([weights.get(k, 0.0) for k in keys], dtype=np.float64)
+        # truth_risk counts inverted: low risk is good quality
+        values = np.array([
+            scores['clarity_score'], 100.0 - scores['truth_risk'],
+            scores['execution_score'], scores['strategy_score']
+        ], dtype=np.float64)
+        return float(values @ w / w.sum()) if w.sum() > 0 else float(values.mean())
+
+    def gate(self, metrics: Dict[str, Any], config: QualityGateConfig) -> Dict[str, Any]:
+        """Apply thresholds; reporting only, no recovery round trip"""
+        issues: List[str] = metrics["issues_detected"]
+        critical = metrics["truth_risk"] >= config.critical_truth_threshold
+        passed = not issues
+        gate_result = "critical" if critical else ("pass" if passed else "fail")
+        return {
+            "passed": passed,
+            "gate_result": gate_result,
+            "recovery_mode": "flag" if not passed and config.enable_auto_recovery else "none",
+            "recovery_applied": "none",
+            "blocked": False,
+            "message": "Quality gate passed" if passed else f"Quality issues: {', '.join(issues)}",
+            "truth_risk": metrics["truth_risk"]
+        }
+
+    def evaluate(self, query: str, response: str, retrieval=None,
+                 verification: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Returns {"quality_metrics": {...}, "quality_gate": {...}, "truth_risk_score": float}.
+        `retrieval` is a RetrievalResult (or None when no documents were used).
+        """
+        started = time.perf_counter()
+        config = get_config().quality_gate
+        text = self._plain_text(response)
+        ratios = segment_ratios(response)
+        retrieval_score = retrieval.best_score if retrieval is not None and retrieval.scored_chunks else None
+
+        scores = {
+            "clarity_score": self.clarity(text),
+            "truth_risk": self.truth_risk(ratios, verification, retrieval_score),
+            "execution_score": self.execution(query, text),
+            "strategy_score": self.strategy(ratios, retrieval_score, text)
+        }
+        if _ERROR_RE.match(response or ""):
+            scores["execution_score"] = scores["strategy_score"] = 0.0
+        scores["response_quality_score"] = self.overall(scores, config)
+
+        issues = []
+        if _ERROR_RE.match(response or ""):
+            issues.append("error_response")
+        if scores["clarity_score"] < config.clarity_threshold:
+            issues.append("low_clarity")
+        if scores["truth_risk"] > config.truth_risk_threshold:
+            issues.append("high_truth_risk")
+        if scores["response_quality_score"] < config.quality_threshold:
+            issues.append("low_quality")
+        if verification and verification.get("downgraded"):
+            issues.append("unsupported_claims")
+
+        metrics = {key: round(value, 2) for key, value in scores.items()}
+        metrics["issues_detected"] = issues
+        metrics["color_ratios"] = ratios
+        metrics["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return {
+            "quality_metrics": metrics,
+            "quality_gate": self.gate(metrics, config),
+            "truth_risk_score": metrics["truth_risk"]
+        }
+
+# Global instance
+quality_metrics_engine = QualityMetricsEngine()
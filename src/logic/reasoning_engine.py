@@ -41,33 +41,42 @@ class ReasoningEngine:
     async def _generate_llm_response(self, query: str, context: Dict) -> str:
         """Usar cliente LLM unificado"""
         try:
-            api_key = context.get('api_key')
-            provider = context.get('provider', 'openai')
-            
-            if not api_key:
+            if not context.get('api_key'):
                 return "Error: No API key provided"
             
-            # Detectar proveedor por API key
-            if api_key.startswith("ds-"):
-                provider = "deepseek"
-            elif api_key.startswith("sk-"):
-                provider = "openai"
-            
-            result = await llm_client.query(
-                prompt=query,
-                api_key=api_key,
-                provider=provider
-            )
-            
-            if result["success"]:
-                return result["response"]
-            else:
-                return f"Error: {result.get('error', 'Unknown error')}"
+            return self.to_response(await self.query_llm(query, context))
                 
         except Exception as e:
             logger.error(f"Error generating LLM response: {e}")
             return f"System error: {str(e)}"
 
+    @staticmethod
+    def to_response(result: Dict) -> str:
+        """Texto de la respuesta o el error del resultado de llm_client"""
+        if result["success"]:
+            return result["response"]
+        return f"Error: {result.get('error', 'Unknown error')}"
+
+    @staticmethod
+    def detect_provider(api_key: str, provider: str = 'openai') -> str:
+        """Detectar proveedor por API key"""
+        if api_key.startswith("ds-"):
+            return "deepseek"
+        if api_key.startswith("sk-"):
+            return "openai"
+        return provider
+
+    async def query_llm(self, query: str, context: Dict) -> Dict:
+        """Llamada al LLM con el proveedor detectado por la API key; devuelve el resultado de llm_client"""
+        api_key = context.get('api_key')
+        return await llm_client.query(
+            prompt=query,
+            api_key=api_key,
+            provider=self.detect_provider(api_key, context.get('provider', 'openai')),
+            deadline=context.get('deadline'),
+            **context.get('llm_options', {})
+        )
+
     def get_status(self) -> Dict:
         """Get reasoning engine status"""
         return {
@@ -5,10 +5,20 @@ Sistema de conocimiento aumentado con documentos
 
 from .knowledge_base import KnowledgeBase
 from .rag_orchestrator import RAGOrchestrator
+from .relevance_gate import RelevanceGate
+from .analyzers import Analyzer, get_analyzer
+from .term_dictionary import TermDictionary
+from .ingestion import Chunk, DocumentIngestor
 
 __all__ = [
     'KnowledgeBase',
-    'RAGOrchestrator'
+    'RAGOrchestrator',
+    'RelevanceGate',
+    'Analyzer',
+    'get_analyzer',
+    'TermDictionary',
+    'Chunk',
+    'DocumentIngestor'
 ]
 
 __version__ = "1.0.0"
@@ -0,0 +1,198 @@
+"""
+Analizadores por idioma - Tokenización, palabras vacías y stemming ligero
+para los 20 idiomas de documentos que ofrece la interfaz
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Idiomas sin espacios entre palabras: se indexan por bigramas de caracteres
+_BIGRAM_LANGUAGES = frozenset({'zh', 'ja', 'th'})
+
+# Idiomas de escritura latina: se eliminan los acentos (orden = desempate)
+_LATIN_LANGUAGES = ('es', 'en', 'fr', 'de', 'it', 'pt', 'nl', 'sv', 'pl', 'tr', 'vi', 'id')
+
+_STOPWORDS: Dict[str, str] = {
+    'es': """a al algo como con de del el ella ellos en entre es esta este esto
+        fue ha hay la las le les lo los mas me mi muy no nos o para pero por
+        que se ser si sin sobre son su sus tambien te un una uno unos y ya
+        cual cuando donde quien cuanto cuantos cuantas""",
+    'en': """a about an and are as at be been but by can could do does for from
+        had has have how i if in into is it its me my no not of on or our so
+        than that the their them then there these they this to was we were
+        what when where which who why will with would you your""",
+    'fr': """a au aux avec ce ces dans de des du elle en est et etre il ils je
+        la le les leur lui mais me mes on ou par pas pour qu que qui quel
+        quelle quand comment sa se ses son sont sur ta te tu un une vous""",
+    'de': """aber als am an auch auf aus bei bin bis das dass dem den der des die
+        du ein eine einem einen einer er es fur hat ich ihr im in ist ja
+        kann mit nach nicht noch oder sie sind so uber um und von vor was
+        wer wie wir wo zu zum zur""",
+    'it': """a al alla anche che chi come con da dei del della di e ed gli ha il
+        in io la le lo ma mi ne non o per piu quale quando quanto se si sono
+        su tra un una uno""",
+    'pt': """a ao aos as com como da das de do dos e ela ele em entre esta este
+        foi ha isso mais mas na nas no nos o os ou para pela pelo por qual
+        quando que quem se sem ser seu sua sao tem um uma""",
+    'nl': """aan al als bij dat de den der die dit door een en er het hij hoe
+        ik in is je maar met na naar niet of om op over te tot uit van voor
+        wat wie waar ze zijn""",
+    'sv': """att av de den det dig du en ett for fran har hon hur i jag med men
+        min nar och om pa som till under var vad vem vi ar""",
+    'pl': """a ale co czy do i ich jak jest ja jego ktory na nie o od po sie
+        ta te to w z za ze""",
+    'tr': """ve bir bu da de icin ile mi mu ne nasil nedir ne zaman kim o
+        gibi daha cok en""",
+    'ru': """а в во вы да для до его её если есть же за и из или им как к
+        когда кто ли мы на не но о от по с так то ты у что это я""",
+    'el': """και το η ο τα των του της σε με για από που είναι ένα μια""",
+    'vi': """la cua va cac co mot nhung duoc trong cho khong nay voi""",
+    'id': """dan di ke dari yang ini itu untuk dengan adalah apa bagaimana
+        berapa tidak pada""",
+}
+
+# Sufijos para stemming ligero (del más largo al más corto)
+_SUFFIXES: Dict[str, Tuple[str, ...]] = {
+    'es': ('amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'uciones',
+           'acion', 'ucion', 'mente', 'idades', 'idad', 'ables', 'ibles',
+           'able', 'ible', 'istas', 'ista', 'osos', 'osas', 'oso', 'osa',
+           'ando', 'iendo', 'ados', 'idos', 'adas', 'idas', 'ado', 'ido',
+           'ada', 'ida', 'ar', 'er', 'ir', 'es', 's', 'a', 'o', 'e'),
+    'pt': ('amentos', 'imentos', 'amento', 'imento', 'acoes', 'acao', 'mente',
+           'idades', 'idade', 'aveis', 'ivel', 'avel', 'ando', 'endo', 'indo',
+           'ados', 'idos', 'ado', 'ido', 'ar', 'er', 'ir', 'es', 's', 'a',
+           'o', 'e'),
+    'it': ('amenti', 'imenti', 'amento', 'imento', 'azioni', 'azione', 'mente',
+           'ita', 'abili', 'ibili', 'abile', 'ibile', 'ando', 'endo', 'are',
+           'ere', 'ire', 'i', 'e', 'a', 'o'),
+    'fr': ('issements', 'issement', 'ations', 'ation', 'ements', 'ement',
+           'ments', 'ment', 'ites', 'ite', 'ables', 'able', 'euses', 'euse',
+           'eux', 'er', 'es', 'e', 's', 'x'),
+    'en': ('ational', 'ations', 'ation', 'nesses', 'ness', 'ments', 'ment',
+           'ingly', 'edly', 'ings', 'ing', 'ies', 'ied', 'ed', 'ly', 'es', 's'),
+    'de': ('ungen', 'heiten', 'keiten', 'heit', 'keit', 'lich', 'isch', 'ung',
+           'ern', 'em', 'en', 'er', 'es', 'e', 's'),
+    'nl': ('heden', 'heid', 'ingen', 'ing', 'lijk', 'en', 'e', 's'),
+    'sv': ('heter', 'het', 'arna', 'erna', 'orna', 'ande', 'ende', 'ar', 'er',
+           'or', 'en', 'et', 'a', 'e'),
+}
+
+_MIN_STEM = 3
+
+
+def strip_accents(text: str) -> str:
+    """Eliminar marcas diacríticas (solo para escrituras latinas)"""
+    normalized = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+
+class Analyzer:
+    """Analizador de texto para un idioma concreto"""
+
+    def __init__(self, language: str, stopwords: Iterable[str] = (),
+                 suffixes: Tuple[str, ...] = (), bigrams: bool = False,
+                 fold_accents: bool = False):
+        self.language = language
+        self.fold_accents = fold_accents
+        self.stopwords = frozenset(self._normalize(w) for w in stopwords)
+        self.suffixes = suffixes
+        self.bigrams = bigrams
+
+    def _normalize(self, text: str) -> str:
+        text = text.lower()
+        return strip_accents(text) if self.fold_accents else text
+
+    def stem(self, token: str) -> str:
+        """Stemming ligero: quitar el sufijo más largo que deje raíz suficiente"""
+        for suffix in self.suffixes:
+            if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+                return token[:-len(suffix)]
+        return token
+
+    def tokenize(self, text: str) -> List[str]:
+        """Tokens normalizados, sin palabras vacías y sin stemming"""
+        tokens = []
+        for word in _WORD_RE.findall(self._normalize(text)):
+            if word in self.stopwords:
+                continue
+            if self.bigrams and not word.isascii():
+                if len(word) == 1:
+                    tokens.append(word)
+                else:
+                    tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+            elif len(word) > 1:
+                tokens.append(word)
+        return tokens
+
+    def analyze(self, text: str) -> List[str]:
+        """Tokenizar + stemming: términos listos para el índice"""
+        return [self.stem(token) for token in self.tokenize(text)]
+
+    def stopword_hits(self, text: str) -> int:
+        """Cuántas palabras vacías del idioma aparecen (detección de idioma)"""
+        return sum(1 for w in _WORD_RE.findall(self._normalize(text)) if w in self.stopwords)
+
+
+def _build_analyzers() -> Dict[str, Analyzer]:
+    languages = ['es', 'en', 'zh', 'fr', 'de', 'it', 'pt', 'ru', 'ja', 'ko',
+                 'ar', 'hi', 'tr', 'nl', 'sv', 'pl', 'vi', 'th', 'id', 'el']
+    return {
+        lang: Analyzer(
+            language=lang,
+            stopwords=_STOPWORDS.get(lang, '').split(),
+            suffixes=_SUFFIXES.get(lang, ()),
+            bigrams=lang in _BIGRAM_LANGUAGES,
+            fold_accents=lang in _LATIN_LANGUAGES
+        )
+        for lang in languages
+    }
+
+
+_ANALYZERS = _build_analyzers()
+# Idiomas de documentos que ofrece la interfaz
+SUPPORTED_LANGUAGES = tuple(_ANALYZERS)
+
+# Rangos Unicode para detectar escrituras no latinas
+_SCRIPT_RANGES = (
+    ('ja', ('぀', 'ヿ')),   # Hiragana / Katakana
+    ('ko', ('가', '힯')),   # Hangul
+    ('zh', ('一', '鿿')),   # CJK
+    ('th', ('฀', '๿')),
+    ('ar', ('؀', 'ۿ')),
+    ('hi', ('ऀ', 'ॿ')),
+    ('el', ('Ͱ', 'Ͽ')),
+    ('ru', ('Ѐ', 'ӿ')),
+)
+
+
+def normalize_language(language: Optional[str], default: str = 'es') -> str:
+    """
+    Código de idioma admitido ('es-ES' -> 'es'); los desconocidos pasan a
+    `default` para no crear analizadores ni índices por cada valor recibido
+    """
+    language = (language or default).strip().lower().split('-')[0]
+    return language if language in _ANALYZERS else default
+
+
+def get_analyzer(language: Optional[str]) -> Analyzer:
+    """Analizador para un código de idioma (cabecera X-Documents-Language)"""
+    return _ANALYZERS[normalize_language(language)]
+
+
+def detect_language(text: str, default: str = 'es') -> str:
+    """
+    Detección barata del idioma de la consulta: primero por escritura,
+    después por palabras vacías de los idiomas latinos
+    """
+    for language, (low, high) in _SCRIPT_RANGES:
+        if any(low <= c <= high for c in text):
+            return language
+
+    best, best_hits = default, 0
+    for language in _LATIN_LANGUAGES:
+        hits = _ANALYZERS[language].stopword_hits(text)
+        if hits > best_hits or (hits == best_hits and hits and language == default):
+            best, best_hits = language, hits
+    return best
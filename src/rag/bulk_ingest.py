@@ -0,0 +1,320 @@
+"""
+Ingesta masiva - Troceado, firmas MinHash e índices por shard en un pool de procesos
+
+Los ficheros se reparten en shards contiguos (en el orden de la carpeta) de
+tamaño parecido en bytes; cada proceso trocea su shard en un ChunkStore,
+calcula las firmas y construye el índice de cada idioma configurado. Los
+shards se fusionan en orden, así que el resultado es el mismo que en serie.
+Con --output el corpus se guarda (almacén, firmas y documentos) y el
+servidor lo abre al arrancar si `ingestion.corpus_file` apunta a él.
+
+    python -m src.rag.bulk_ingest [src/rag/documents] [--workers 8] [--languages es,en] [--output corpus.chunks]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.config import get_config
+from src.core.serialization import dumps, loads
+from src.rag.analyzers import get_analyzer
+from src.rag.chunk_store import ChunkStore
+from src.rag.dedup import duplicate_detector
+from src.rag.index import TermIndex
+from src.rag.ingestion import SUPPORTED_EXTENSIONS, document_ingestor
+
+logger = logging.getLogger(__name__)
+
+# Ficheros que acompañan al almacén guardado (mismo nombre + sufijo)
+SIGNATURES_SUFFIX = ".signatures.npy"
+DOCUMENTS_SUFFIX = ".documents.json"
+
+
+def document_paths(documents_path: str) -> List[str]:
+    """Documentos admitidos de una carpeta, en orden de nombre"""
+    if not os.path.isdir(documents_path):
+        return []
+    return [
+        os.path.join(documents_path, name) for name in sorted(os.listdir(documents_path))
+        if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+    ]
+
+
+def index_text(chunk) -> str:
+    """Texto indexado: el encabezado de la sección también puntúa"""
+    return f"{chunk.heading}\n{chunk.text}" if chunk.heading else chunk.text
+
+
+@dataclass
+class Shard:
+    """Resultado de un shard: fragmentos, firmas e índices con posiciones locales"""
+    store: ChunkStore
+    signatures: np.ndarray
+    indexes: Dict[str, TermIndex]
+    documents: Dict[str, Dict[str, Any]]
+    bytes: int
+
+
+@dataclass
+class Corpus:
+    """Corpus fusionado, listo para KnowledgeBase.install"""
+    store: ChunkStore
+    signatures: np.ndarray
+    indexes: Dict[str, TermIndex] = field(default_factory=dict)
+    documents: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+def build_shard(paths: Sequence[str], languages: Sequence[str] = ()) -> Shard:
+    """Trabajo de un proceso del pool (también se usa en serie)"""
+    store = ChunkStore()
+    documents: Dict[str, Dict[str, Any]] = {}
+    size = 0
+    for path in paths:
+        name = os.path.basename(path)
+        count = store.extend(document_ingestor.ingest_file(path, source="server"))
+        documents[name] = {
+            "format": SUPPORTED_EXTENSIONS[os.path.splitext(name)[1].lower()],
+            "bytes": os.path.getsize(path),
+            "chunks": count
+        }
+        size += documents[name]["bytes"]
+    store.freeze()
+
+    texts = [index_text(chunk) for chunk in store] if languages else []
+    indexes = {}
+    for language in languages:
+        index = TermIndex(get_analyzer(language))
+        index.add(texts)
+        indexes[language] = index
+    signatures = np.array(
+        [duplicate_detector.hasher.signature(chunk.text) for chunk in store], dtype=np.uint64
+    ).reshape(len(store), duplicate_detector.hasher.num_perm)
+    return Shard(store, signatures, indexes, documents, size)
+
+
+def merge_shards(shards: Sequence[Shard]) -> Corpus:
+    """Unir shards en orden: posiciones de los índices desplazadas por los fragmentos anteriores"""
+    indexes: Dict[str, TermIndex] = {}
+    for shard in shards:
+        for language, index in shard.indexes.items():
+            indexes.setdefault(language, TermIndex(index.analyzer)).extend(index)
+    documents: Dict[str, Dict[str, Any]] = {}
+    for shard in shards:
+        documents.update(shard.documents)
+    num_perm = duplicate_detector.hasher.num_perm
+    signatures = np.concatenate([shard.signatures for shard in shards]) if shards else np.zeros((0, num_perm), np.uint64)
+    return Corpus(ChunkStore.concat(shard.store for shard in shards), signatures, indexes, documents)
+
+
+def save_corpus(corpus: Corpus, path: str):
+    """Guardar el almacén, las firmas MinHash y los documentos; los índices se reconstruyen al cargar"""
+    corpus.store.save(path)
+    with open(path + SIGNATURES_SUFFIX, "wb") as f:
+        np.save(f, corpus.signatures)
+    with open(path + DOCUMENTS_SUFFIX, "wb") as f:
+        f.write(dumps(corpus.documents))
+
+
+def load_corpus(path: str, languages: Optional[Sequence[str]] = None) -> Corpus:
+    """Abrir un corpus guardado con save_corpus (almacén y firmas con mmap). Raises ValueError/OSError"""
+    store = ChunkStore.load(path)
+    signatures = np.load(path + SIGNATURES_SUFFIX, mmap_mode="r")
+    if signatures.shape[0] != len(store):
+        raise ValueError(f"Signatures do not match the chunk store: {path}")
+    with open(path + DOCUMENTS_SUFFIX, "rb") as f:
+        documents = loads(f.read())
+    languages = get_config().ingestion.languages if languages is None else languages
+    texts = [index_text(chunk) for chunk in store] if languages else []
+    indexes = {}
+    for language in dict.fromkeys(get_analyzer(lang).language for lang in languages):
+        indexes[language] = TermIndex(get_analyzer(language))
+        indexes[language].add(texts)
+    return Corpus(store, signatures, indexes, documents)
+
+
+def split_shards(paths: Sequence[str], count: int) -> List[List[str]]:
+    """Rangos contiguos de ficheros con bytes parecidos (al menos un fichero por shard)"""
+    sizes = [os.path.getsize(path) for path in paths]
+    target = sum(sizes) / max(1, count)
+    shards: List[List[str]] = [[]]
+    filled = 0
+    for path, size in zip(paths, sizes):
+        if shards[-1] and filled >= target * len(shards) and len(shards) < count:
+            shards.append([])
+        shards[-1].append(path)
+        filled += size
+    return [shard for shard in shards if shard]
+
+
+class BulkIngestor:
+    """Construye el corpus en un pool de procesos e informa del progreso"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.path: Optional[str] = None
+        self._reset()
+
+    def _reset(self):
+        self.status = "idle"
+        self.workers = 0
+        self.files_total = 0
+        self.files_done = 0
+        self.shards_total = 0
+        self.shards_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.chunks = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.elapsed = 0.0
+
+    @staticmethod
+    def resolve_workers(workers: Optional[int] = None) -> int:
+        workers = get_config().ingestion.workers if workers is None else workers
+        return workers if workers > 0 else os.cpu_count() or 1
+
+    def build(self, paths: Sequence[str], workers: Optional[int] = None, languages: Optional[Sequence[str]] = None,
+              progress: Optional[Callable[["BulkIngestor"], None]] = None) -> Corpus:
+        """Trocear e indexar `paths`; con un solo proceso no se crea pool"""
+        config = get_config().ingestion
+        languages = [get_analyzer(lang).language for lang in (config.languages if languages is None else languages)]
+        self._reset()
+        self.status = "running"
+        self.workers = min(self.resolve_workers(workers), max(1, len(paths)))
+        self.files_total = len(paths)
+        self.bytes_total = sum(os.path.getsize(path) for path in paths)
+        self.started_at = time.time()
+        started = time.perf_counter()
+        try:
+            if self.workers == 1:
+                shards = [build_shard(paths, languages)]
+                self._shard_done(shards[0], len(paths), progress)
+            else:
+                shards = self._build_parallel(paths, languages, config, progress)
+            corpus = merge_shards(shards)
+            self.status = "done"
+            return corpus
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            raise
+        finally:
+            self.elapsed = time.perf_counter() - started
+            logger.info(f"📚 Ingesta: {self.files_done} ficheros, {self.chunks} fragmentos en {self.elapsed:.2f}s "
+                        f"({self.workers} procesos, {self._throughput():.1f} MB/s)")
+
+    def start(self, documents_path: str, on_done: Callable[[Corpus], None], workers: Optional[int] = None) -> bool:
+        """Re-importar una carpeta en segundo plano; on_done recibe el corpus. False si ya hay una en curso"""
+        if self._task is not None and not self._task.done():
+            return False
+        self._reset()
+        self.status = "scheduled"
+        self.path = documents_path
+        self._task = asyncio.create_task(self.run(documents_path, on_done, workers))
+        return True
+
+    async def run(self, documents_path: str, on_done: Callable[[Corpus], None], workers: Optional[int] = None):
+        """El pool trabaja desde un hilo: el bucle de eventos sigue atendiendo consultas"""
+        try:
+            corpus = await asyncio.to_thread(self.build, document_paths(documents_path), workers)
+        except Exception as e:
+            logger.error(f"Error en la ingesta masiva de {documents_path}: {e}")
+            return
+        on_done(corpus)
+
+    async def stop(self):
+        """Deja de esperar la ingesta en curso (los procesos terminan su shard)"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _build_parallel(self, paths, languages, config, progress) -> List[Shard]:
+        groups = split_shards(paths, self.workers * config.shards_per_worker)
+        self.shards_total = len(groups)
+        results: List[Optional[Shard]] = [None] * len(groups)
+        context = multiprocessing.get_context(config.start_method)
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            futures = {pool.submit(build_shard, group, languages): i for i, group in enumerate(groups)}
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                self._shard_done(results[i], len(groups[i]), progress)
+        return results
+
+    def _shard_done(self, shard: Shard, files: int, progress):
+        self.shards_done += 1
+        self.shards_total = max(self.shards_total, self.shards_done)
+        self.files_done += files
+        self.bytes_done += shard.bytes
+        self.chunks += len(shard.store)
+        if progress is not None:
+            progress(self)
+
+    def _throughput(self) -> float:
+        return self.bytes_done / 1e6 / self.elapsed if self.elapsed else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        elapsed = self.elapsed if self.status != "running" else time.time() - (self.started_at or time.time())
+        return {
+            "status": self.status,
+            "path": self.path,
+            "workers": self.workers,
+            "files": {"done": self.files_done, "total": self.files_total},
+            "shards": {"done": self.shards_done, "total": self.shards_total},
+            "bytes": {"done": self.bytes_done, "total": self.bytes_total},
+            "chunks": self.chunks,
+            "progress": round(self.bytes_done / self.bytes_total, 4) if self.bytes_total else 0.0,
+            "mb_per_second": round(self.bytes_done / 1e6 / elapsed, 2) if elapsed else 0.0,
+            "error": self.error,
+            "started_at": self.started_at,
+            "elapsed": round(elapsed, 3)
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="src/rag/documents", help="documents folder")
+    parser.add_argument("--workers", type=int, default=None, help="processes (0: one per core, 1: no pool)")
+    parser.add_argument("--languages", default=None, help="comma-separated index languages")
+    parser.add_argument("--output", default=None,
+                        help="save the corpus for the server (ingestion.corpus_file), opened with mmap")
+    args = parser.parse_args(argv)
+
+    def report(ingestor: BulkIngestor):
+        stats = ingestor.get_stats()
+        print(f"\r  shards {stats['shards']['done']}/{stats['shards']['total']}  "
+              f"ficheros {stats['files']['done']}/{stats['files']['total']}  "
+              f"{stats['progress']:.0%}  {stats['chunks']} fragmentos  {stats['mb_per_second']:.1f} MB/s",
+              end="", flush=True)
+
+    paths = document_paths(args.path)
+    languages = args.languages.split(",") if args.languages else None
+    ingestor = BulkIngestor()
+    corpus = ingestor.build(paths, workers=args.workers, languages=languages, progress=report)
+    print()
+    stats = ingestor.get_stats()
+    print(f"{len(corpus.documents)} documentos, {len(corpus.store)} fragmentos, "
+          f"{stats['bytes']['done'] / 1e6:.1f} MB en {stats['elapsed']:.2f}s con {stats['workers']} procesos")
+    for language, index in corpus.indexes.items():
+        print(f"  índice '{language}': {len(index.postings)} términos")
+    if args.output:
+        save_corpus(corpus, args.output)
+        print(f"Guardado: {args.output} (arranca el servidor con SUBOTAI__INGESTION__CORPUS_FILE={args.output})")
+
+
+# Instancia global
+bulk_ingestor = BulkIngestor()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+"""
+Almacén compacto de fragmentos - Un único buffer UTF-8 con columnas numéricas
+
+Los textos de todos los fragmentos viven seguidos en un buffer (bytes o un
+fichero mapeado con mmap) y cada fragmento es una fila de columnas (offset,
+longitud, documento, posición, offsets de origen, encabezado, tokens).
+Los fragmentos se leen a través de vistas con __slots__: `data` es un
+memoryview del buffer (sin copia) y `text` se decodifica al pedirlo.
+
+    store = ChunkStore()
+    store.extend(document_ingestor.ingest_file(path))
+    store.freeze()
+    store.save("corpus.chunks")
+    store = ChunkStore.load("corpus.chunks")  # mmap, sin leer el fichero
+"""
+import mmap
+import logging
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from src.core.serialization import dumps, loads
+from src.llm.tokens import estimate_tokens
+from src.rag.ingestion import Chunk
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SCS1"
+_HEADER_LENGTH = 4
+_ALIGN = 8
+
+# Columna -> (typecode de array, dtype de numpy)
+COLUMNS = {
+    "offset": ("Q", np.uint64),    # inicio del texto en el buffer
+    "length": ("I", np.uint32),    # bytes UTF-8 del texto
+    "doc": ("I", np.uint32),       # índice en doc_ids
+    "position": ("I", np.uint32),  # orden del fragmento dentro del documento
+    "start": ("Q", np.uint64),     # offsets en bytes dentro del documento de origen
+    "end": ("Q", np.uint64),
+    "heading": ("I", np.uint32),   # índice en headings (0 = sin encabezado)
+    "tokens": ("I", np.uint32),    # estimación de tokens del texto
+}
+
+
+class ChunkView:
+    """Fragmento del almacén: mismos atributos que Chunk, leídos de las columnas"""
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: "ChunkStore", row: int):
+        self.store = store
+        self.row = row
+
+    @property
+    def doc_id(self) -> str:
+        return self.store.doc_ids[self.store.columns["doc"][self.row]]
+
+    @property
+    def source(self) -> str:
+        return self.store.doc_sources[self.store.columns["doc"][self.row]]
+
+    @property
+    def position(self) -> int:
+        return int(self.store.columns["position"][self.row])
+
+    @property
+    def chunk_id(self) -> str:
+        return f"{self.doc_id}#{self.position}"
+
+    @property
+    def start(self) -> int:
+        return int(self.store.columns["start"][self.row])
+
+    @property
+    def end(self) -> int:
+        return int(self.store.columns["end"][self.row])
+
+    @property
+    def heading(self) -> str:
+        return self.store.headings[self.store.columns["heading"][self.row]]
+
+    @property
+    def tokens(self) -> int:
+        return int(self.store.columns["tokens"][self.row])
+
+    @property
+    def data(self) -> memoryview:
+        """Bytes UTF-8 del texto, sin copiar el buffer"""
+        offset = int(self.store.columns["offset"][self.row])
+        return self.store.buffer[offset:offset + int(self.store.columns["length"][self.row])]
+
+    @property
+    def text(self) -> str:
+        return str(self.data, "utf-8")
+
+    def to_chunk(self) -> Chunk:
+        return Chunk(
+            chunk_id=self.chunk_id,
+            doc_id=self.doc_id,
+            text=self.text,
+            source=self.source,
+            position=self.position,
+            start=self.start,
+            end=self.end,
+            heading=self.heading
+        )
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ChunkView) and other.store is self.store and other.row == self.row
+
+    def __hash__(self) -> int:
+        return hash((id(self.store), self.row))
+
+    def __repr__(self) -> str:
+        return f"ChunkView({self.chunk_id!r}, {self.tokens} tokens)"
+
+
+class ChunkStore:
+    """
+    Secuencia de fragmentos respaldada por un buffer contiguo. Mientras se
+    construye, las columnas son `array` y el buffer un bytearray; freeze()
+    las convierte en arrays de NumPy y bytes. Un almacén congelado no admite
+    más fragmentos.
+    """
+
+    def __init__(self):
+        self.buffer: Union[bytearray, memoryview] = bytearray()
+        self.columns: Dict[str, Any] = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+        self.doc_ids: List[str] = []
+        self.doc_sources: List[str] = []
+        self.headings: List[str] = [""]
+        self._docs: Dict[str, int] = {}
+        self._headings: Dict[str, int] = {"": 0}
+        self._mmap: Optional[mmap.mmap] = None
+        self.frozen = False
+
+    def add(self, chunk: Chunk) -> ChunkView:
+        if self.frozen:
+            raise RuntimeError("ChunkStore is frozen")
+        doc = self._doc_index(chunk.doc_id, chunk.source)
+        heading = self._heading_index(chunk.heading)
+
+        data = chunk.text.encode("utf-8")
+        row = len(self)
+        columns = self.columns
+        columns["offset"].append(len(self.buffer))
+        columns["length"].append(len(data))
+        columns["doc"].append(doc)
+        columns["position"].append(chunk.position)
+        columns["start"].append(chunk.start)
+        columns["end"].append(chunk.end)
+        columns["heading"].append(heading)
+        columns["tokens"].append(estimate_tokens(chunk.text))
+        self.buffer += data
+        return ChunkView(self, row)
+
+    def extend(self, chunks: Iterable[Chunk]) -> int:
+        """Añadir fragmentos; devuelve cuántos"""
+        count = 0
+        for chunk in chunks:
+            self.add(chunk)
+            count += 1
+        return count
+
+    def freeze(self) -> "ChunkStore":
+        """Columnas a NumPy (sin copia) y buffer inmutable"""
+        if not self.frozen:
+            self.columns = {
+                name: np.frombuffer(column, dtype=COLUMNS[name][1]) if len(column) else np.zeros(0, COLUMNS[name][1])
+                for name, column in self.columns.items()
+            }
+            self.buffer = memoryview(bytes(self.buffer))
+            self.frozen = True
+        return self
+
+    @classmethod
+    def concat(cls, stores: Iterable["ChunkStore"]) -> "ChunkStore":
+        """Unir almacenes en orden (p. ej. los fragmentos de la ingesta en paralelo)"""
+        stores = [store.freeze() for store in stores]
+        merged = cls()
+        parts = {name: [] for name in COLUMNS}
+        buffer_offset = 0
+        for store in stores:
+            docs = np.array([merged._doc_index(doc_id, source) for doc_id, source in zip(store.doc_ids, store.doc_sources)],
+                            dtype=np.uint32)
+            headings = np.array([merged._heading_index(heading) for heading in store.headings], dtype=np.uint32)
+            columns = dict(store.columns)
+            columns["offset"] = columns["offset"] + np.uint64(buffer_offset)
+            columns["doc"] = docs[columns["doc"]] if len(store) else columns["doc"]
+            columns["heading"] = headings[columns["heading"]] if len(store) else columns["heading"]
+            for name in COLUMNS:
+                parts[name].append(columns[name])
+            buffer_offset += len(store.buffer)
+        merged.columns = {
+            name: np.concatenate(arrays).astype(COLUMNS[name][1], copy=False) if arrays else np.zeros(0, COLUMNS[name][1])
+            for name, arrays in parts.items()
+        }
+        merged.buffer = memoryview(b"".join(store.buffer for store in stores))
+        merged.frozen = True
+        return merged
+
+    def _doc_index(self, doc_id: str, source: str) -> int:
+        doc = self._docs.get(doc_id)
+        if doc is None:
+            doc = self._docs[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_sources.append(source)
+        return doc
+
+    def _heading_index(self, heading: str) -> int:
+        index = self._headings.get(heading)
+        if index is None:
+            index = self._headings[heading] = len(self.headings)
+            self.headings.append(heading)
+        return index
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Para enviar almacenes entre procesos: congelado y sin mmap"""
+        self.freeze()
+        return {
+            "buffer": bytes(self.buffer),
+            "columns": {name: np.array(column) for name, column in self.columns.items()},
+            "doc_ids": self.doc_ids,
+            "doc_sources": self.doc_sources,
+            "headings": self.headings
+        }
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__()
+        self.buffer = memoryview(state["buffer"])
+        self.columns = state["columns"]
+        for doc_id, source in zip(state["doc_ids"], state["doc_sources"]):
+            self._doc_index(doc_id, source)
+        self.headings = state["headings"]
+        self._headings = {heading: i for i, heading in enumerate(self.headings)}
+        self.frozen = True
+
+    def __len__(self) -> int:
+        return len(self.columns["offset"])
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [ChunkView(self, row) for row in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("chunk index out of range")
+        return ChunkView(self, item)
+
+    def __iter__(self) -> Iterator[ChunkView]:
+        for row in range(len(self)):
+            yield ChunkView(self, row)
+
+    def doc_rows(self, doc_id: str) -> np.ndarray:
+        """Filas de los fragmentos de un documento"""
+        doc = self._docs.get(doc_id)
+        if doc is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.asarray(self.columns["doc"]) == doc)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria de textos y columnas (sin las tablas de documentos y encabezados)"""
+        return len(self.buffer) + sum(len(column) * column.itemsize for column in self.columns.values())
+
+    def save(self, path: str):
+        """Cabecera JSON, columnas alineadas a 8 bytes y buffer, en un solo fichero"""
+        self.freeze()
+        header = dumps({
+            "count": len(self),
+            "docs": [[doc_id, source] for doc_id, source in zip(self.doc_ids, self.doc_sources)],
+            "headings": self.headings,
+            "columns": list(COLUMNS),
+            "buffer": len(self.buffer)
+        })
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(_HEADER_LENGTH, "little"))
+            f.write(header)
+            offset = len(MAGIC) + _HEADER_LENGTH + len(header)
+            for name in COLUMNS:
+                padding = -offset % _ALIGN
+                f.write(b"\0" * padding)
+                data = self.columns[name].tobytes()
+                f.write(data)
+                offset += padding + len(data)
+            f.write(self.buffer)
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True) -> "ChunkStore":
+        """Abrir un almacén guardado; con mmap las columnas y el buffer apuntan al fichero"""
+        with open(path, "rb") as f:
+            if use_mmap:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                data = memoryview(mapped)
+            else:
+                mapped = None
+                data = memoryview(f.read())
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"Not a chunk store: {path}")
+
+        offset = len(MAGIC)
+        header_length = int.from_bytes(data[offset:offset + _HEADER_LENGTH], "little")
+        offset += _HEADER_LENGTH
+        header = loads(bytes(data[offset:offset + header_length]))
+        offset += header_length
+
+        store = cls()
+        store._mmap = mapped
+        count = header["count"]
+        columns = {}
+        for name in header["columns"]:
+            offset += -offset % _ALIGN
+            dtype = np.dtype(COLUMNS[name][1])
+            columns[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            offset += count * dtype.itemsize
+        store.columns = columns
+        store.buffer = data[offset:offset + header["buffer"]]
+        for doc_id, source in header["docs"]:
+            store._doc_index(doc_id, source)
+        store.headings = header["headings"]
+        store._headings = {heading: i for i, heading in enumerate(store.headings)}
+        store.frozen = True
+        return store
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "chunks": len(self),
+            "documents": len(self.doc_ids),
+            "buffer_bytes": len(self.buffer),
+            "bytes": self.nbytes,
+            "tokens": int(np.asarray(self.columns["tokens"], dtype=np.uint64).sum()) if len(self) else 0,
+            "mmap": self._mmap is not None
+        }
@@ -0,0 +1,48 @@
+"""
+Segmentos de color del Juez - [NORMAL], [AZUL] y [ROJO]
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+COLORS = ('NORMAL', 'AZUL', 'ROJO')
+
+_SEGMENT_RE = re.compile(r"\[(NORMAL|AZUL|ROJO)\](.*?)\[/\1\]", re.DOTALL)
+
+
+@dataclass
+class Segment:
+    """Tramo de la respuesta; color None = texto sin marcar"""
+    color: Optional[str]
+    text: str
+
+
+def parse_segments(text: str) -> List[Segment]:
+    """Dividir la respuesta en segmentos, conservando el texto sin marcar"""
+    segments: List[Segment] = []
+    position = 0
+    for match in _SEGMENT_RE.finditer(text or ""):
+        if match.start() > position:
+            segments.append(Segment(None, text[position:match.start()]))
+        segments.append(Segment(match.group(1), match.group(2)))
+        position = match.end()
+    if text and position < len(text):
+        segments.append(Segment(None, text[position:]))
+    return segments
+
+
+def render_segments(segments: List[Segment]) -> str:
+    return "".join(s.text if s.color is None else f"[{s.color}]{s.text}[/{s.color}]" for s in segments)
+
+
+def segment_ratios(text: str) -> Dict[str, float]:
+    """Proporción de caracteres por color (incluye 'unmarked')"""
+    counts = {color: 0 for color in COLORS}
+    counts['unmarked'] = 0
+    for segment in parse_segments(text):
+        size = len(segment.text.strip())
+        counts[segment.color or 'unmarked'] += size
+    total = sum(counts.values())
+    if not total:
+        return {key: 0.0 for key in counts}
+    return {key: round(value / total, 4) for key, value in counts.items()}
@@ -0,0 +1,163 @@
+"""
+Compresión extractiva del contexto - Conserva solo las frases útiles de los
+fragmentos recuperados antes de llamar al Juez
+"""
+import re
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional
+
+import numpy as np
+
+from src.core.config import get_config
+from src.llm.tokens import estimate_tokens
+from src.rag.analyzers import get_analyzer
+from src.rag.ingestion import Chunk
+
+logger = logging.getLogger(__name__)
+
+# Fin de frase: puntuación latina/CJK seguida de espacio, o salto de línea
+_SENTENCE_RE = re.compile(r"(?<=[.!?;。！？])\s+|\n+")
+
+
+@dataclass
+class Sentence:
+    chunk: Chunk
+    index: int
+    text: str
+    tokens: int
+
+
+class ContextCompressor:
+    """
+    Puntúa frases contra la consulta con una matriz de coincidencias
+    (frases x términos de la consulta) ponderada por rareza del término, y
+    conserva las mejores más sus vecinas hasta un ratio o presupuesto de tokens.
+    """
+
+    @staticmethod
+    def split_sentences(chunk: Chunk) -> List[Sentence]:
+        parts = [p.strip() for p in _SENTENCE_RE.split(chunk.text) if p and p.strip()]
+        return [Sentence(chunk, i, text, estimate_tokens(text)) for i, text in enumerate(parts)]
+
+    def score_sentences(self, sentences: List[Sentence], term_groups: List[FrozenSet[str]],
+                        docs_language: str, chunk_scores: Dict[str, float]) -> np.ndarray:
+        analyzer = get_analyzer(docs_language)
+        term_to_group: Dict[str, int] = {}
+        for g, group in enumerate(term_groups):
+            for term in group:
+                term_to_group.setdefault(term, g)
+
+        features = np.zeros((len(sentences), len(term_groups)), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            groups = {term_to_group[t] for t in analyzer.analyze(sentence.text) if t in term_to_group}
+            if groups:
+                features[i, list(groups)] = 1.0
+
+        # Términos raros entre las frases candidatas pesan más (idf suavizado)
+        df = features.sum(axis=0)
+        weights = np.log1p(len(sentences) / (1.0 + df))
+        scores = features @ weights
+
+        # Desempate por la puntuación del fragmento de origen
+        prior = np.fromiter((chunk_scores.get(s.chunk.chunk_id, 0.0) for s in sentences),
+                            dtype=np.float32, count=len(sentences))
+        return scores + 0.01 * prior
+
+    def compress(self, chunks: List[Chunk], term_groups: List[FrozenSet[str]], docs_language: str,
+                 chunk_scores: Optional[Dict[str, float]] = None,
+                 token_budget: Optional[int] = None, ratio: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Devuelve {"content", "kept_chunks", "stats"}; el contenido mantiene la
+        atribución por documento e id de fragmento. `token_budget` y `ratio`
+        sustituyen a los valores de la configuración (perfiles por modo).
+        """
+        config = get_config().compression
+        sentences = [s for chunk in chunks for s in self.split_sentences(chunk)]
+        original_tokens = sum(s.tokens for s in sentences)
+
+        if not sentences or not term_groups:
+            return {"content": None, "kept_chunks": chunks, "stats": {"applied": False}}
+
+        budget = int(original_tokens * (config.ratio if ratio is None else ratio))
+        cap = config.token_budget if token_budget is None else token_budget
+        if cap:
+            budget = min(budget, cap)
+
+        scores = self.score_sentences(sentences, term_groups, docs_language, chunk_scores or {})
+        order = np.argsort(-scores, kind="stable")
+
+        selected = set()
+        used = 0
+        for i in order:
+            if scores[i] <= 0.01 and selected:
+                break
+            # La frase y sus vecinas del mismo fragmento
+            window = [j for j in range(i - config.neighbors, i + config.neighbors + 1)
+                      if 0 <= j < len(sentences) and sentences[j].chunk is sentences[i].chunk]
+            extra = sum(sentences[j].tokens for j in window if j not in selected)
+            if selected and used + extra > budget:
+                continue
+            selected.update(window)
+            used += extra
+
+        content, kept_chunks = self._render(sentences, sorted(selected))
+        stats = {
+            "applied": True,
+            "original_tokens": original_tokens,
+            "compressed_tokens": used,
+            "ratio": round(used / original_tokens, 3) if original_tokens else 1.0,
+            "sentences_kept": len(selected),
+            "sentences_total": len(sentences)
+        }
+        logger.info(f"✂️ Contexto comprimido: {original_tokens} -> {used} tokens ({len(selected)}/{len(sentences)} frases)")
+        return {"content": content, "kept_chunks": kept_chunks, "stats": stats}
+
+    def compress_retrieval(self, retrieval, token_budget: Optional[int] = None,
+                           ratio: Optional[float] = None) -> Dict[str, Any]:
+        """Comprimir el contenido de un RetrievalResult (si está activado)"""
+        if not get_config().compression.enabled or not retrieval.scored_chunks:
+            return {"content": retrieval.content, "kept_chunks": retrieval.packed_chunks, "stats": {"applied": False}}
+
+        result = self.compress(
+            retrieval.packed_chunks,
+            retrieval.term_groups,
+            retrieval.docs_language,
+            chunk_scores={chunk.chunk_id: score for chunk, score in retrieval.scored_chunks},
+            token_budget=token_budget,
+            ratio=ratio
+        )
+        if not result["content"]:
+            result["content"] = retrieval.content
+            result["kept_chunks"] = retrieval.packed_chunks
+        return result
+
+    @staticmethod
+    def _render(sentences: List[Sentence], selected: List[int]):
+        """Agrupar por documento y fragmento, con elipsis entre huecos"""
+        by_doc: Dict[str, Dict[str, List[Sentence]]] = {}
+        chunks: Dict[str, Chunk] = {}
+        for i in selected:
+            s = sentences[i]
+            by_doc.setdefault(s.chunk.doc_id, {}).setdefault(s.chunk.chunk_id, []).append(s)
+            chunks[s.chunk.chunk_id] = s.chunk
+
+        parts = []
+        for doc_id, doc_chunks in by_doc.items():
+            body = []
+            for chunk_id, chunk_sentences in sorted(doc_chunks.items(), key=lambda kv: chunks[kv[0]].position):
+                chunk = chunks[chunk_id]
+                text = ""
+                previous = None
+                for s in chunk_sentences:
+                    if previous is not None and s.index != previous + 1:
+                        text += " …"
+                    text += (" " if text else "") + s.text
+                    previous = s.index
+                prefix = f"[{chunk_id}]" + (f" {chunk.heading}:" if chunk.heading else "")
+                body.append(f"{prefix} {text}")
+            parts.append(f"--- {doc_id} ---\n" + "\n\n".join(body) + "\n\n")
+        return "".join(parts), list(chunks.values())
+
+# Instancia global
+context_compressor = ContextCompressor()
@@ -0,0 +1,147 @@
+"""
+Detección de casi-duplicados - MinHash + LSH a nivel de fragmento
+"""
+import re
+import zlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.core.config import get_config
+from src.rag.analyzers import strip_accents
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Primo de Mersenne 2^31 - 1: a * h + b cabe en uint64 con h de 32 bits
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+class MinHasher:
+    """Firmas MinHash sobre shingles de palabras"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 42):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(strip_accents(text.lower()))
+        n = self.shingle_size
+        if len(words) < n:
+            grams = [" ".join(words)] if words else []
+        else:
+            grams = [" ".join(words[i:i + n]) for i in range(len(words) - n + 1)]
+        return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in set(grams)), dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        # (num_perm, num_shingles) -> mínimo por permutación
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimación de la similitud de Jaccard"""
+        return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+class LSHIndex:
+    """Índice LSH por bandas: solo se comparan firmas que comparten una banda"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16):
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: Dict[tuple, List[int]] = {}
+
+    def _keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            yield band, rows.tobytes()
+
+    def add(self, key: int, signature: np.ndarray):
+        for bucket in self._keys(signature):
+            self._buckets.setdefault(bucket, []).append(key)
+
+    def candidates(self, signature: np.ndarray) -> set:
+        found = set()
+        for bucket in self._keys(signature):
+            found.update(self._buckets.get(bucket, ()))
+        return found
+
+
+class DuplicateDetector:
+    """
+    Calcula firmas una sola vez (caché por hash del contenido) y colapsa
+    casi-duplicados en una lista de fragmentos ya ordenada por relevancia
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, cache_size: Optional[int] = None):
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.bands = bands
+        # None: tamaño configurable en caliente (caches.signature_size)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        # Las recuperaciones también corren en hilos (asyncio.to_thread)
+        self._lock = threading.Lock()
+
+    def signature(self, text: str) -> np.ndarray:
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        # La firma se calcula fuera del cerrojo
+        signature = self.hasher.signature(text)
+        limit = self.cache_size or get_config().caches.signature_size
+        with self._lock:
+            self._cache[key] = signature
+            while len(self._cache) > limit:
+                self._cache.popitem(last=False)
+        return signature
+
+    def collapse(self, ranked: list, signatures: list, threshold: float, prefer_source: str = "server"):
+        """
+        ranked: [(chunk, score)] en orden de relevancia; signatures en paralelo.
+        Devuelve (conservados, descartados). Si un duplicado es del servidor y
+        el conservado no, se intercambian manteniendo la posición y la mejor
+        puntuación.
+        """
+        lsh = LSHIndex(num_perm=self.hasher.num_perm, bands=self.bands)
+        kept: list = []
+        kept_signatures: list = []
+        dropped: list = []
+
+        for (chunk, score), signature in zip(ranked, signatures):
+            duplicate_of: Optional[int] = None
+            for candidate in lsh.candidates(signature):
+                if MinHasher.similarity(signature, kept_signatures[candidate]) >= threshold:
+                    duplicate_of = candidate
+                    break
+
+            if duplicate_of is None:
+                lsh.add(len(kept), signature)
+                kept.append((chunk, score))
+                kept_signatures.append(signature)
+                continue
+
+            kept_chunk, kept_score = kept[duplicate_of]
+            if chunk.source == prefer_source and kept_chunk.source != prefer_source:
+                kept[duplicate_of] = (chunk, max(score, kept_score))
+                dropped.append(kept_chunk)
+            else:
+                dropped.append(chunk)
+
+        return kept, dropped
+
+# Instancia global
+duplicate_detector = DuplicateDetector()
@@ -0,0 +1,124 @@
+"""
+Almacén de documentos subidos - Fragmentos e índices referenciables por handle
+"""
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, List
+
+from src.core.config import get_config
+from src.rag.analyzers import get_analyzer
+from src.rag.index import TermIndex
+from src.rag.ingestion import Chunk, document_ingestor
+from src.rag.knowledge_base import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredDocument:
+    """Documento de usuario ya troceado; el índice se construye por idioma bajo demanda"""
+    handle: str
+    name: str
+    format: str
+    bytes: int
+    chunks: List[Chunk]
+    # Huella de la API key que lo subió: solo ese tenant lo usa o lo borra
+    tenant: str = ""
+    created_at: float = field(default_factory=time.monotonic)
+    _indexes: Dict[str, TermIndex] = field(default_factory=dict, repr=False)
+
+    def index_for(self, docs_language: str) -> TermIndex:
+        index = self._indexes.get(docs_language)
+        if index is None:
+            index = TermIndex(get_analyzer(docs_language))
+            index.add(KnowledgeBase._index_text(chunk) for chunk in self.chunks)
+            self._indexes[docs_language] = index
+        return index
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "handle": self.handle,
+            "name": self.name,
+            "format": self.format,
+            "bytes": self.bytes,
+            "chunks": len(self.chunks)
+        }
+
+
+class DocumentStore:
+    """
+    Documentos subidos por streaming, troceados una sola vez y reutilizados
+    en consultas posteriores. Acotado por número (LRU) y caducidad. Cada
+    handle pertenece al tenant que lo subió; para otro tenant no existe.
+    """
+
+    def __init__(self):
+        self._documents: "OrderedDict[str, StoredDocument]" = OrderedDict()
+
+    def add(self, name: str, stream: BinaryIO, size: int, tenant: str = "") -> StoredDocument:
+        """Trocear y guardar un documento desde un stream (p. ej. el spool de la subida)"""
+        return self.put(self.chunk(name, stream, size, tenant))
+
+    @staticmethod
+    def chunk(name: str, stream: BinaryIO, size: int, tenant: str = "") -> StoredDocument:
+        """Solo el troceado, sin tocar el almacén: puede ejecutarse en un hilo"""
+        head = stream.read(4096)
+        stream.seek(0)
+        fmt = document_ingestor.detect_format(name, head)
+        chunks = list(document_ingestor.iter_chunks(stream, f"USUARIO: {name}", source="user", fmt=fmt))
+        return StoredDocument(
+            handle=f"doc_{uuid.uuid4().hex}",
+            name=name,
+            format=fmt,
+            bytes=size,
+            chunks=chunks,
+            tenant=tenant
+        )
+
+    def put(self, document: StoredDocument) -> StoredDocument:
+        """Registrar un documento troceado (desde el bucle de eventos, como get/resolve)"""
+        self._documents[document.handle] = document
+        self._evict()
+        logger.info(f"📁 Documento subido: {document.name} ({document.bytes} bytes, "
+                    f"{len(document.chunks)} fragmentos) -> {document.handle}")
+        return document
+
+    def get(self, handle: str, tenant: str = "") -> StoredDocument:
+        """Raises KeyError if the handle is unknown, expired or owned by another tenant"""
+        self._evict()
+        document = self._documents.get(handle)
+        if document is None or document.tenant != tenant:
+            raise KeyError(handle)
+        self._documents.move_to_end(handle)
+        return document
+
+    def resolve(self, handles: List[str], tenant: str = "") -> List[StoredDocument]:
+        return [self.get(handle, tenant) for handle in dict.fromkeys(handles)]
+
+    def remove(self, handle: str, tenant: str = "") -> bool:
+        document = self._documents.get(handle)
+        if document is None or document.tenant != tenant:
+            return False
+        del self._documents[handle]
+        return True
+
+    def _evict(self):
+        config = get_config().uploads
+        cutoff = time.monotonic() - config.handle_ttl
+        for handle in [h for h, d in self._documents.items() if d.created_at < cutoff]:
+            del self._documents[handle]
+        while len(self._documents) > config.max_documents:
+            self._documents.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "documents": len(self._documents),
+            "bytes": sum(d.bytes for d in self._documents.values()),
+            "chunks": sum(len(d.chunks) for d in self._documents.values())
+        }
+
+# Instancia global
+document_store = DocumentStore()
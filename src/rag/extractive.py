@@ -0,0 +1,116 @@
+"""
+Respuesta extractiva sin LLM - Devuelve el pasaje de la BD cuando una
+pregunta frecuente (FAQ) coincide con la consulta con alta confianza
+"""
+import re
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.config import get_config
+from src.rag.analyzers import get_analyzer
+from src.rag.ingestion import Chunk
+from src.rag.knowledge_base import RetrievalResult
+
+logger = logging.getLogger(__name__)
+
+# "P: ... R: ...", "Q: ... A: ...", "Pregunta: ... Respuesta: ..."
+_QA_RE = re.compile(
+    r"^\s*(?:P|Q|Pregunta|Question|Frage|Domanda|Pergunta)\s*[:.-]\s*(?P<q>.+?)\s*\n+"
+    r"\s*(?:R|A|Respuesta|Answer|Antwort|Réponse|Risposta|Resposta)\s*[:.-]\s*(?P<a>.+)\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+# "¿Pregunta?" sola en su párrafo y la respuesta en el siguiente
+_LEADING_QUESTION_RE = re.compile(
+    r"^\s*(?P<q>¿?[^\n?]{3,200}\?)[ \t]*\n[ \t]*\n\s*(?P<a>.+)$", re.DOTALL
+)
+# Documentos de preguntas frecuentes por nombre de fichero o sección
+_FAQ_DOCUMENT_RE = re.compile(
+    r"faq|preguntas[\s_-]*frecuentes|frequently[\s_-]*asked|häufig[\s_-]*gestellte", re.IGNORECASE
+)
+
+# Política por modo de procesamiento: forzar, decidir por umbral o desactivar
+MODE_POLICY = {
+    'extractive': 'force',
+    'auto': 'auto',
+    'fast': 'auto',
+}
+
+
+def _is_faq_document(chunk: Chunk) -> bool:
+    return bool(_FAQ_DOCUMENT_RE.search(chunk.doc_id) or _FAQ_DOCUMENT_RE.search(chunk.heading))
+
+
+def parse_faq(chunk: Chunk) -> Optional[Tuple[str, str]]:
+    """(pregunta, respuesta) si el fragmento tiene forma de FAQ"""
+    # Un par explícito en el texto manda sobre el encabezado de la sección.
+    # Una pregunta suelta solo cuenta en documentos FAQ: en prosa suele ser retórica
+    match = _QA_RE.match(chunk.text)
+    if not match and _is_faq_document(chunk):
+        match = _LEADING_QUESTION_RE.match(chunk.text)
+    if match and match.group('a').strip():
+        return match.group('q').strip(), match.group('a').strip()
+
+    if chunk.heading and chunk.heading.rstrip().endswith('?'):
+        return chunk.heading, chunk.text
+    return None
+
+
+class ExtractiveAnswerer:
+    """Camino rápido: cero llamadas al LLM para preguntas frecuentes"""
+
+    def match_confidence(self, retrieval: RetrievalResult, question: str) -> float:
+        """
+        Coincidencia en ambos sentidos entre la consulta y la pregunta de la
+        FAQ (media armónica): evita que una consulta corta case con cualquier
+        pregunta larga y viceversa
+        """
+        groups = retrieval.term_groups
+        if not groups:
+            return 0.0
+        question_terms = set(get_analyzer(retrieval.docs_language).analyze(question))
+        if not question_terms:
+            return 0.0
+
+        matched_groups = [g for g in groups if g & question_terms]
+        query_coverage = len(matched_groups) / len(groups)
+        covered_terms = set().union(*matched_groups) & question_terms if matched_groups else set()
+        question_coverage = len(covered_terms) / len(question_terms)
+        if not query_coverage or not question_coverage:
+            return 0.0
+        return 2 * query_coverage * question_coverage / (query_coverage + question_coverage)
+
+    def answer(self, retrieval: RetrievalResult, mode: str = 'auto') -> Optional[Dict[str, Any]]:
+        config = get_config().extractive
+        policy = MODE_POLICY.get(mode, 'off')
+        if policy == 'off' or (policy == 'auto' and not config.enabled):
+            return None
+        # El pasaje está en el idioma de la BD: solo se devuelve tal cual si coincide
+        if retrieval.query_language != retrieval.docs_language and policy != 'force':
+            return None
+
+        best = None
+        for chunk, _ in retrieval.scored_chunks[:config.max_candidates]:
+            faq = parse_faq(chunk)
+            if not faq:
+                continue
+            confidence = self.match_confidence(retrieval, faq[0])
+            if best is None or confidence > best[0]:
+                best = (confidence, chunk, faq)
+
+        if best is None:
+            return None
+        confidence, chunk, (question, answer) = best
+        if policy == 'auto' and confidence < config.confidence_threshold:
+            return None
+
+        logger.info(f"⚡ Respuesta extractiva desde {chunk.chunk_id} (confianza {confidence:.2f})")
+        return {
+            "response": f"[NORMAL]{answer}[/NORMAL]",
+            "chunk_id": chunk.chunk_id,
+            "question": question,
+            "confidence": round(confidence, 4),
+            "forced": policy == 'force'
+        }
+
+# Instancia global
+extractive_answerer = ExtractiveAnswerer()
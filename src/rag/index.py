@@ -0,0 +1,43 @@
+"""
+Índice invertido de términos - Recuperación local de fragmentos
+"""
+from typing import Dict, FrozenSet, Iterable, List
+
+from src.rag.analyzers import Analyzer
+
+
+class TermIndex:
+    """Índice invertido término -> posiciones de fragmentos, para un idioma"""
+
+    def __init__(self, analyzer: Analyzer):
+        self.analyzer = analyzer
+        self.postings: Dict[str, List[int]] = {}
+        self.size = 0
+
+    def add(self, texts: Iterable[str]):
+        """Indexar textos; las posiciones continúan a partir de `size`"""
+        for text in texts:
+            position = self.size
+            for term in set(self.analyzer.analyze(text)):
+                self.postings.setdefault(term, []).append(position)
+            self.size += 1
+
+    def extend(self, other: "TermIndex"):
+        """Añadir al final el índice de otro bloque de fragmentos (fusión de shards)"""
+        for term, positions in other.postings.items():
+            self.postings.setdefault(term, []).extend(position + self.size for position in positions)
+        self.size += other.size
+
+    def match(self, term_groups: List[FrozenSet[str]]) -> Dict[int, int]:
+        """
+        Número de grupos de términos de la consulta que aparecen en cada
+        fragmento. Un grupo son las alternativas (traducciones) de un término.
+        """
+        counts: Dict[int, int] = {}
+        for group in term_groups:
+            positions = set()
+            for term in group:
+                positions.update(self.postings.get(term, ()))
+            for position in positions:
+                counts[position] = counts.get(position, 0) + 1
+        return counts
@@ -0,0 +1,155 @@
+"""
+Pipeline de ingesta de documentos - Lectura incremental, detección de formato
+y troceado por encabezados y párrafos con offsets de origen
+"""
+import io
+import os
+import re
+import codecs
+import logging
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {'.txt': 'text', '.md': 'markdown', '.markdown': 'markdown'}
+
+_HEADING_RE = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s{0,3}(```|~~~)")
+
+
+@dataclass
+class Chunk:
+    """Fragmento de un documento con su posición en el fichero de origen"""
+    chunk_id: str
+    doc_id: str
+    text: str
+    source: str = "server"
+    position: int = 0
+    # Offsets en bytes (UTF-8) dentro del documento de origen
+    start: int = 0
+    end: int = 0
+    heading: str = ""
+
+
+class DocumentIngestor:
+    """
+    Trocea documentos sin cargarlos enteros: se leen por líneas (acotadas a
+    `max_line_bytes`) y se emite cada fragmento en cuanto se cierra.
+    Se usa igual para los documentos del servidor y los del navegador.
+    """
+
+    def __init__(self, max_chunk_chars: int = 1500, max_line_bytes: int = 64 * 1024):
+        self.max_chunk_chars = max_chunk_chars
+        self.max_line_bytes = max_line_bytes
+
+    @staticmethod
+    def detect_format(name: str, head: bytes = b"") -> str:
+        """Formato por extensión y, si no la hay, por el contenido inicial"""
+        ext = os.path.splitext(name)[1].lower()
+        if ext in SUPPORTED_EXTENSIONS:
+            return SUPPORTED_EXTENSIONS[ext]
+        sample = head.decode('utf-8', errors='ignore')
+        for line in sample.splitlines():
+            if _HEADING_RE.match(line) or _FENCE_RE.match(line):
+                return 'markdown'
+        return 'text'
+
+    def _iter_lines(self, stream: BinaryIO) -> Iterator[tuple]:
+        """(offset_inicio, offset_fin, línea) leyendo en bloques acotados"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        offset = 0
+        while True:
+            raw = stream.readline(self.max_line_bytes)
+            if not raw:
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield offset, offset, tail
+                return
+            line = decoder.decode(raw)
+            yield offset, offset + len(raw), line
+            offset += len(raw)
+
+    def iter_chunks(self, stream: BinaryIO, doc_id: str, source: str = "server",
+                    fmt: Optional[str] = None) -> Iterator[Chunk]:
+        """Generar fragmentos por encabezados (markdown) y párrafos"""
+        if fmt is None:
+            head = stream.peek(4096)[:4096] if hasattr(stream, 'peek') else b""
+            fmt = self.detect_format(doc_id, head)
+        markdown = fmt == 'markdown'
+
+        position = 0
+        heading = ""
+        in_fence = False
+        lines = []
+        size = 0
+        start = end = 0
+
+        def flush():
+            nonlocal position, lines, size
+            text = "".join(lines).strip()
+            lines = []
+            size = 0
+            if not text:
+                return None
+            chunk = Chunk(
+                chunk_id=f"{doc_id}#{position}",
+                doc_id=doc_id,
+                text=text,
+                source=source,
+                position=position,
+                start=start,
+                end=end,
+                heading=heading
+            )
+            position += 1
+            return chunk
+
+        for line_start, line_end, line in self._iter_lines(stream):
+            if markdown and _FENCE_RE.match(line):
+                in_fence = not in_fence
+
+            heading_match = _HEADING_RE.match(line) if markdown and not in_fence else None
+            if heading_match:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+                heading = heading_match.group(2)
+                continue
+
+            if not line.strip() and not in_fence:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+                continue
+
+            if not lines:
+                start = line_start
+            lines.append(line)
+            size += len(line)
+            end = line_end
+
+            # Párrafos enormes: cortar en límite de línea
+            if size >= self.max_chunk_chars:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+
+        chunk = flush()
+        if chunk:
+            yield chunk
+
+    def ingest_file(self, path: str, source: str = "server", doc_id: Optional[str] = None) -> Iterator[Chunk]:
+        """Trocear un fichero del disco de forma incremental"""
+        doc_id = doc_id or os.path.basename(path)
+        with open(path, 'rb') as f:
+            yield from self.iter_chunks(f, doc_id, source=source)
+
+    def ingest_text(self, name: str, content: str, source: str = "user", doc_id: Optional[str] = None) -> Iterator[Chunk]:
+        """Trocear un documento recibido como texto (p. ej. desde el navegador)"""
+        data = content.encode('utf-8')
+        fmt = self.detect_format(name, data[:4096])
+        yield from self.iter_chunks(io.BytesIO(data), doc_id or name, source=source, fmt=fmt)
+
+# Instancia global
+document_ingestor = DocumentIngestor()
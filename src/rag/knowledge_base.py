@@ -3,56 +3,323 @@ Gestor de Base de Conocimiento - Busca en documentos
 """
 import os
 import logging
-from typing import List, Optional, Dict
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Dict, FrozenSet, Sequence, Tuple
+
+import numpy as np
+
+from src.core.cache import TTLCache, make_key
+from src.core.config import get_config
+from src.llm.tokens import estimate_tokens
+from src.rag.analyzers import get_analyzer, detect_language
+from src.rag.bulk_ingest import Corpus, bulk_ingestor, document_paths, index_text, load_corpus, merge_shards
+from src.rag.chunk_store import ChunkStore, ChunkView
+from src.rag.dedup import duplicate_detector
+from src.rag.index import TermIndex
+from src.rag.ingestion import Chunk, document_ingestor
+from src.rag.term_dictionary import term_dictionary
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class RetrievalResult:
+    """Resultado de una búsqueda: contenido para el Juez + puntuaciones"""
+    content: Optional[str]
+    scored_chunks: List[Tuple[Chunk, float]] = field(default_factory=list)
+    # Fragmentos empaquetados en `content`, en orden de relevancia
+    packed_chunks: List[Chunk] = field(default_factory=list)
+    term_groups: List[FrozenSet[str]] = field(default_factory=list)
+    query_terms: int = 0
+    query_language: str = "es"
+    docs_language: str = "es"
+    duplicates_collapsed: int = 0
+    dedup_tokens_saved: int = 0
+    # top-k efectivo (el del perfil del modo si lo hay)
+    top_k: int = 0
+
+    @property
+    def best_score(self) -> float:
+        return self.scored_chunks[0][1] if self.scored_chunks else 0.0
+
+    @property
+    def best_chunk(self) -> Optional[Chunk]:
+        return self.scored_chunks[0][0] if self.scored_chunks else None
+
+    def to_metadata(self) -> Dict[str, Any]:
+        return {
+            "query_language": self.query_language,
+            "docs_language": self.docs_language,
+            "cross_lingual": self.query_language != self.docs_language,
+            "matched_chunks": len(self.scored_chunks),
+            "duplicates_collapsed": self.duplicates_collapsed,
+            "dedup_tokens_saved": self.dedup_tokens_saved,
+            "chunk_ids": [chunk.chunk_id for chunk, _ in self.scored_chunks[:self.top_k or get_config().retrieval.top_k]]
+        }
+
+
 class KnowledgeBase:
     def __init__(self, documents_path: str = "src/rag/documents"):
         self.documents_path = documents_path
-        self.documents = self._load_documents()
-    
-    def _load_documents(self) -> dict:
-        """Cargar todos los documentos de la carpeta"""
-        documents = {}
-        
+        # Resultados de consultas solo contra documentos del servidor (precalentables)
+        self.retrieval_cache = TTLCache(lambda: (get_config().caches.retrieval_size, get_config().caches.retrieval_ttl))
+        self.install(self._load_documents())
+
+    def _load_documents(self) -> Corpus:
+        """Cargar y trocear todos los documentos (.txt / .md) de la carpeta, o abrir el corpus guardado"""
+        corpus_file = get_config().ingestion.corpus_file
+        if corpus_file:
+            try:
+                corpus = load_corpus(corpus_file)
+                logger.info(f"📚 Corpus guardado: {corpus_file} ({len(corpus.documents)} documentos, "
+                            f"{len(corpus.store)} fragmentos)")
+                return corpus
+            except (OSError, ValueError) as e:
+                logger.error(f"No se pudo abrir el corpus guardado {corpus_file}, se ingiere la carpeta: {e}")
         if not os.path.exists(self.documents_path):
             os.makedirs(self.documents_path)
             logger.warning(f"Creada carpeta vacía: {self.documents_path}")
-            return documents
-        
-        for filename in os.listdir(self.documents_path):
-            if filename.endswith('.txt'):
-                filepath = os.path.join(self.documents_path, filename)
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    documents[filename] = content
-                    logger.info(f"Cargado documento: {filename} ({len(content)} chars)")
-        
-        return documents
-    
-    def search(self, query: str, user_documents: List[Dict] = None):
-        """Buscar respuesta - DEVUELVE TODO (docs servidor + docs usuario)"""
-        all_content = ""
-        doc_count = 0
-        
-        # 1. Documentos por defecto del servidor
-        for filename, content in self.documents.items():
-            all_content += f"--- {filename} ---\n{content}\n\n"
-            doc_count += 1
-        
-        # 2. Documentos del usuario (desde navegador)
+            return merge_shards([])
+
+        paths = document_paths(self.documents_path)
+        # Los procesos del pool (spawn) vuelven a importar este módulo: ahí nunca se crea otro pool
+        parallel = len(paths) >= get_config().ingestion.parallel_min_files and multiprocessing.parent_process() is None
+        corpus = bulk_ingestor.build(paths, workers=None if parallel else 1)
+        for filename, info in corpus.documents.items():
+            logger.info(f"Cargado documento: {filename} ({info['chunks']} fragmentos)")
+        return corpus
+
+    def install(self, corpus: Corpus, documents_path: Optional[str] = None):
+        """
+        Sustituir el corpus del servidor (carga inicial o re-importación).
+        Firmas e índices se guardan junto al almacén al que pertenecen, así
+        una consulta en curso nunca mezcla el corpus anterior con el nuevo.
+        """
+        # doc_id -> información del documento (formato, tamaño, fragmentos)
+        self.documents: Dict[str, Dict[str, Any]] = corpus.documents
+        # Firmas MinHash de los fragmentos del servidor (calculadas una vez), una fila por fragmento
+        self._signatures: Tuple[ChunkStore, np.ndarray] = (corpus.store, corpus.signatures)
+        # Índices por idioma de documentos (los no construidos en la ingesta, bajo demanda)
+        self._indexes: Dict[str, Tuple[ChunkStore, TermIndex]] = {
+            language: (corpus.store, index) for language, index in corpus.indexes.items()
+        }
+        # Fragmentos del servidor en un almacén compacto (un buffer + columnas)
+        self.chunks: ChunkStore = corpus.store
+        if documents_path is not None:
+            self.documents_path = documents_path
+        # Versión del corpus: cambia si cambian los documentos del servidor
+        self.version = make_key(sorted((name, info["bytes"], info["chunks"]) for name, info in self.documents.items()))[:12]
+        self.retrieval_cache.clear()
+
+    def _build_user_chunks(self, user_documents: List[Dict]) -> List[Chunk]:
+        """Trocear documentos del navegador con el mismo pipeline que el servidor"""
+        chunks: List[Chunk] = []
+        for doc in user_documents:
+            chunks.extend(document_ingestor.ingest_text(
+                doc['name'], doc['content'], source="user", doc_id=f"USUARIO: {doc['name']}"
+            ))
+        return chunks
+
+    _index_text = staticmethod(index_text)
+
+    def _index_for(self, docs_language: str, chunks: ChunkStore) -> TermIndex:
+        """Índice de los fragmentos del servidor `chunks` con el analizador del idioma"""
+        store, index = self._indexes.get(docs_language, (None, None))
+        if store is not chunks:
+            index = TermIndex(get_analyzer(docs_language))
+            index.add(self._index_text(chunk) for chunk in chunks)
+            if chunks is self.chunks:
+                self._indexes[docs_language] = (chunks, index)
+            logger.info(f"🗂️ Índice '{docs_language}' construido ({index.size} fragmentos, {len(index.postings)} términos)")
+        return index
+
+    def analyze_query(self, query: str, docs_language: str) -> Tuple[List[FrozenSet[str]], str]:
+        """
+        Términos de la consulta expresados en el idioma de los documentos.
+        Cada grupo contiene las alternativas de un término de la consulta:
+        el propio término y sus traducciones del diccionario bilingüe.
+        """
+        docs_analyzer = get_analyzer(docs_language)
+        query_language = detect_language(query, default=docs_analyzer.language)
+        query_analyzer = get_analyzer(query_language)
+
+        groups: List[FrozenSet[str]] = []
+        seen = set()
+        for token in query_analyzer.tokenize(query):
+            term = query_analyzer.stem(token)
+            if term in seen:
+                continue
+            seen.add(term)
+            if query_language == docs_analyzer.language:
+                groups.append(frozenset((term,)))
+            else:
+                # Nombres propios y cifras suelen coincidir sin traducir
+                alternatives = {docs_analyzer.stem(token)}
+                alternatives.update(term_dictionary.translate(term, query_language, docs_analyzer.language))
+                groups.append(frozenset(alternatives))
+        return groups, query_language
+
+    def score_chunks(self, term_groups: List[FrozenSet[str]], chunks: Sequence[Chunk], index: TermIndex) -> List[Tuple[Chunk, float]]:
+        """
+        Puntuación léxica barata: fracción de términos distintos de la
+        consulta presentes en cada fragmento (0.0 - 1.0)
+        """
+        if not term_groups:
+            return []
+        return [
+            (chunks[position], matched / len(term_groups))
+            for position, matched in index.match(term_groups).items()
+        ]
+
+    def retrieve(self, query: str, user_documents: List[Dict] = None, docs_language: str = 'es', deadline=None,
+                 stored_documents: List[Any] = None, top_k: Optional[int] = None) -> RetrievalResult:
+        """
+        Buscar y puntuar fragmentos (docs servidor + docs usuario + documentos
+        subidos referenciados por handle).
+        Con poco presupuesto de tiempo se omite el colapso de duplicados.
+        `top_k` sustituye al de la configuración (perfiles por modo).
+        Sin documentos de usuario el resultado completo se cachea.
+        """
+        docs_language = get_analyzer(docs_language).language
+        top_k = top_k or get_config().retrieval.top_k
+        full = deadline is None or deadline.has_budget(get_config().deadlines.min_stage_budget)
+        cache_key = None
+        if not user_documents and not stored_documents:
+            cache_key = make_key(" ".join(query.lower().split()), docs_language, top_k)
+            cached = self.retrieval_cache.get(cache_key)
+            if cached is not None:
+                scored, term_groups, query_language, duplicates, tokens_saved = cached[0]
+                return self._result(scored, [], term_groups, query_language, docs_language, duplicates, tokens_saved, top_k)
+
+        term_groups, query_language = self.analyze_query(query, docs_language)
+
+        chunks = self.chunks
+        scored = self.score_chunks(term_groups, chunks, self._index_for(docs_language, chunks))
+
+        user_chunks: List[Chunk] = []
         if user_documents:
-            for doc in user_documents:
-                all_content += f"--- USUARIO: {doc['name']} ---\n{doc['content']}\n\n"
-                doc_count += 1
-            logger.info(f"📁 Añadidos {len(user_documents)} documentos de usuario")
-        
-        if not all_content:
+            user_chunks = self._build_user_chunks(user_documents)
+            user_index = TermIndex(get_analyzer(docs_language))
+            user_index.add(self._index_text(chunk) for chunk in user_chunks)
+            scored.extend(self.score_chunks(term_groups, user_chunks, user_index))
+            logger.info(f"📁 Añadidos {len(user_documents)} documentos de usuario ({len(user_chunks)} fragmentos)")
+
+        # Documentos subidos previamente: troceados e indexados una sola vez
+        for document in stored_documents or ():
+            user_chunks.extend(document.chunks)
+            scored.extend(self.score_chunks(term_groups, document.chunks, document.index_for(docs_language)))
+
+        # Orden estable: servidor antes que usuario a igual puntuación
+        scored.sort(key=lambda item: item[1], reverse=True)
+        duplicates = tokens_saved = 0
+        if full:
+            scored, duplicates, tokens_saved = self._collapse_duplicates(scored, top_k)
+            # Sin colapso de duplicados (deadline) el resultado no se guarda
+            if cache_key is not None:
+                self.retrieval_cache.set(cache_key, (scored, term_groups, query_language, duplicates, tokens_saved))
+
+        return self._result(scored, user_chunks, term_groups, query_language, docs_language, duplicates, tokens_saved, top_k,
+                            chunks)
+
+    def _result(self, scored, user_chunks, term_groups, query_language, docs_language,
+                duplicates, tokens_saved, top_k: int, chunks: Optional[ChunkStore] = None) -> RetrievalResult:
+        """
+        Empaqueta los top-k fragmentos. Si nada puntúa, los k primeros por
+        posición (la compuerta de relevancia enviará la consulta al camino
+        directo): nunca se materializa el corpus entero.
+        """
+        if scored:
+            packed = [chunk for chunk, _ in scored[:top_k]]
+        else:
+            chunks = self.chunks if chunks is None else chunks
+            packed = [*chunks[:top_k], *user_chunks[:top_k]][:top_k]
+        content = self.pack(packed)
+
+        return RetrievalResult(
+            content=content,
+            scored_chunks=scored,
+            packed_chunks=packed,
+            term_groups=term_groups,
+            query_terms=len(term_groups),
+            query_language=query_language,
+            docs_language=docs_language,
+            duplicates_collapsed=duplicates,
+            dedup_tokens_saved=tokens_saved,
+            top_k=top_k
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "documents": len(self.documents),
+            "chunks": len(self.chunks),
+            "chunk_store": self.chunks.get_stats(),
+            "indexes": {lang: {"chunks": index.size, "terms": len(index.postings)} for lang, (_, index) in list(self._indexes.items())},
+            "retrieval_cache": self.retrieval_cache.get_stats()
+        }
+
+    def _signature(self, chunk: Chunk):
+        store, signatures = self._signatures
+        if isinstance(chunk, ChunkView) and chunk.store is store:
+            return signatures[chunk.row]
+        return duplicate_detector.signature(chunk.text)
+
+    def _collapse_duplicates(self, scored: List[Tuple[Chunk, float]],
+                             top_k: int) -> Tuple[List[Tuple[Chunk, float]], int, int]:
+        """
+        Colapsar casi-duplicados antes de empaquetar el prompt, prefiriendo la
+        copia del servidor. Solo se examina la cabeza del ranking (según el
+        top-k efectivo).
+        """
+        config = get_config().retrieval
+        if not config.dedup_enabled or len(scored) < 2:
+            return scored, 0, 0
+
+        window = scored[:top_k * config.dedup_window_factor]
+        kept, dropped = duplicate_detector.collapse(
+            window, [self._signature(chunk) for chunk, _ in window], config.dedup_threshold
+        )
+        if not dropped:
+            return scored, 0, 0
+
+        # Tokens que habrían ido al Juez como copias dentro del top-k original
+        in_prompt = {id(chunk) for chunk, _ in scored[:top_k]}
+        tokens_saved = sum(self._tokens(chunk) for chunk in dropped if id(chunk) in in_prompt)
+        logger.info(f"🧬 Duplicados colapsados: {len(dropped)} (~{tokens_saved} tokens ahorrados)")
+        return kept + scored[len(window):], len(dropped), tokens_saved
+
+    @staticmethod
+    def _tokens(chunk: Chunk) -> int:
+        return chunk.tokens if isinstance(chunk, ChunkView) else estimate_tokens(chunk.text)
+
+    def pack(self, chunks) -> Optional[str]:
+        """Contenido para el Juez: fragmentos agrupados por documento"""
+        by_doc: Dict[str, List[Chunk]] = {}
+        for chunk in chunks:
+            by_doc.setdefault(chunk.doc_id, []).append(chunk)
+
+        parts = []
+        for doc_id, doc_chunks in by_doc.items():
+            doc_chunks.sort(key=lambda c: c.position)
+            body = []
+            heading = ""
+            for c in doc_chunks:
+                # Repetir el encabezado de sección solo cuando cambia
+                if c.heading and c.heading != heading:
+                    body.append(f"## {c.heading}")
+                heading = c.heading
+                body.append(c.text)
+            parts.append(f"--- {doc_id} ---\n" + "\n\n".join(body) + "\n\n")
+        content = "".join(parts)
+        if not content:
             return None
-        
-        logger.info(f"🔍 RAG: Enviando {doc_count} documentos al Juez ({len(self.documents)} servidor + {len(user_documents) if user_documents else 0} usuario)")
-        return all_content
+        logger.info(f"🔍 RAG: Enviando {sum(len(c) for c in by_doc.values())} fragmentos de {len(by_doc)} documentos al Juez")
+        return content
+
+    def search(self, query: str, user_documents: List[Dict] = None, docs_language: str = 'es') -> Optional[str]:
+        """Buscar respuesta - contenido listo para el Juez"""
+        return self.retrieve(query, user_documents=user_documents, docs_language=docs_language).content
 
 # Instancia global
 knowledge_base = KnowledgeBase()
@@ -39,8 +39,11 @@ Respuesta: "[NORMAL]El agua hierve a 100°C[/NORMAL] [AZUL]según fuentes verifi
 
 Responde de forma natural, integrando los colores en el texto fluido."""
 
-    async def generate_response(self, query: str, knowledge_content: str, api_key: str, provider: str, docs_language: str = 'es') -> str:
-        """Genera respuesta combinando fuentes con colores"""
+    async def generate_response(self, query: str, knowledge_content: str, api_key: str, provider: str, docs_language: str = 'es', deadline=None, **llm_options) -> str:
+        """
+        Genera respuesta combinando fuentes con colores.
+        llm_options (perfil del modo): models, max_tokens, model
+        """
         try:
             # Mapeo de códigos a nombres de idioma
             language_names = {
@@ -78,7 +81,9 @@ Ahora genera la respuesta:"""
             result = await llm_client.query(
                 prompt=full_prompt,
                 api_key=api_key,
-                provider=provider
+                provider=provider,
+                deadline=deadline,
+                **llm_options
             )
             
             if result["success"]:
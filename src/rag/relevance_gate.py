@@ -0,0 +1,49 @@
+"""
+Compuerta de relevancia - Evita el Juez RAG cuando la BD no puede responder
+"""
+import logging
+from typing import Dict, Any
+
+from src.core.config import get_config
+from src.rag.knowledge_base import RetrievalResult
+
+logger = logging.getLogger(__name__)
+
+
+class RelevanceGate:
+    """
+    Decide localmente si merece la pena construir el prompt del Juez.
+    La puntuación es la del mejor fragmento, ya normalizada por el número
+    de términos de la consulta.
+    """
+
+    def evaluate(self, retrieval: RetrievalResult) -> Dict[str, Any]:
+        config = get_config().retrieval
+        score = retrieval.best_score
+        best_chunk = retrieval.best_chunk
+
+        if not retrieval.content:
+            passed = False
+            reason = "empty_knowledge_base"
+        elif not config.relevance_gate_enabled:
+            passed = True
+            reason = "gate_disabled"
+        elif score >= config.relevance_threshold:
+            passed = True
+            reason = "relevant"
+        else:
+            passed = False
+            reason = "below_threshold"
+
+        logger.info(f"🚦 Relevancia: {score:.2f} (umbral {config.relevance_threshold}) -> {'RAG' if passed else 'directo'}")
+        return {
+            "passed": passed,
+            "score": round(score, 4),
+            "threshold": config.relevance_threshold,
+            "reason": reason,
+            "best_chunk": best_chunk.chunk_id if best_chunk else None,
+            "query_terms": retrieval.query_terms
+        }
+
+# Instancia global
+relevance_gate = RelevanceGate()
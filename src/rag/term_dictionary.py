@@ -0,0 +1,114 @@
+"""
+Diccionario bilingüe de términos - Mapea términos de la consulta al idioma
+de los documentos para la recuperación local entre idiomas
+"""
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from src.core.config import get_config
+from src.rag.analyzers import get_analyzer
+
+logger = logging.getLogger(__name__)
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class TermDictionary:
+    """
+    Diccionario enchufable: se registran pares de idiomas desde código o desde
+    ficheros JSON `<origen>-<destino>.json` ({"palabra": ["traducción", ...]}).
+    Claves y traducciones se guardan ya analizadas (stems), de modo que las
+    búsquedas usan los mismos términos que el índice.
+    """
+
+    def __init__(self, dictionaries_path: str = "src/rag/dictionaries", cache_size: Optional[int] = None):
+        self.dictionaries_path = dictionaries_path
+        # None: tamaño configurable en caliente (caches.translation_size)
+        self.cache_size = cache_size
+        self._entries: Dict[Tuple[str, str], Dict[str, set]] = {}
+        self._cache: "OrderedDict[Tuple[str, str, str], FrozenSet[str]]" = OrderedDict()
+        # Las recuperaciones también corren en hilos (asyncio.to_thread)
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.load_directory(dictionaries_path)
+
+    def load_directory(self, path: str) -> int:
+        """Cargar todos los diccionarios `xx-yy.json` de una carpeta"""
+        loaded = 0
+        if not os.path.isdir(path):
+            return loaded
+
+        for filename in sorted(os.listdir(path)):
+            name, ext = os.path.splitext(filename)
+            if ext != '.json' or name.count('-') != 1:
+                continue
+            source, target = name.split('-')
+            try:
+                with open(os.path.join(path, filename), 'r', encoding='utf-8') as f:
+                    self.register(source, target, json.load(f))
+                loaded += 1
+                logger.info(f"📚 Diccionario cargado: {source} -> {target}")
+            except (OSError, ValueError) as e:
+                logger.error(f"Error cargando diccionario {filename}: {e}")
+        return loaded
+
+    def register(self, source: str, target: str, mapping: Dict[str, Iterable[str]], bidirectional: bool = True):
+        """Registrar (o ampliar) un par de idiomas"""
+        source_analyzer = get_analyzer(source)
+        target_analyzer = get_analyzer(target)
+        forward = self._entries.setdefault((source, target), {})
+        backward = self._entries.setdefault((target, source), {}) if bidirectional else None
+
+        for word, translations in mapping.items():
+            if isinstance(translations, str):
+                translations = [translations]
+            keys = source_analyzer.analyze(word)
+            values = {stem for t in translations for stem in target_analyzer.analyze(t)}
+            for key in keys:
+                forward.setdefault(key, set()).update(values)
+            if backward is not None:
+                for value in values:
+                    backward.setdefault(value, set()).update(keys)
+
+        with self._lock:
+            self._cache.clear()
+
+    def has_pair(self, source: str, target: str) -> bool:
+        return (source, target) in self._entries
+
+    def translate(self, term: str, source: str, target: str) -> FrozenSet[str]:
+        """Traducciones (ya analizadas) de un término, con caché LRU"""
+        if source == target:
+            return frozenset((term,))
+
+        key = (source, target, term)
+        limit = self.cache_size or get_config().caches.translation_size
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+
+            self.cache_misses += 1
+            translations = frozenset(self._entries.get((source, target), {}).get(term, _EMPTY))
+            self._cache[key] = translations
+            while len(self._cache) > limit:
+                self._cache.popitem(last=False)
+        return translations
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "pairs": len(self._entries),
+            "cache_size": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses
+        }
+
+# Instancia global
+term_dictionary = TermDictionary()
@@ -0,0 +1,145 @@
+"""
+Verificador local de afirmaciones - Alinea los segmentos [NORMAL] del Juez
+con los fragmentos recuperados sin otra llamada al LLM
+"""
+import re
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.core.config import get_config
+from src.rag.analyzers import get_analyzer
+from src.rag.color_segments import Segment, parse_segments, render_segments
+from src.rag.ingestion import Chunk
+from src.rag.knowledge_base import knowledge_base
+
+logger = logging.getLogger(__name__)
+
+_CLAIM_RE = re.compile(r"(?<=[.!?;。！？])\s+|\n+")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def _numbers(text: str) -> set:
+    """Cifras normalizadas (sin separadores de miles/decimales)"""
+    return {re.sub(r"[.,]", "", n) for n in _NUMBER_RE.findall(text)}
+
+
+class ClaimVerifier:
+    """
+    Cada afirmación [NORMAL] se compara con los fragmentos mediante dos
+    señales vectorizadas: cobertura de términos (con traducción si la
+    afirmación está en otro idioma) y bigramas de términos compartidos.
+    Las cifras de la afirmación deben aparecer en el fragmento.
+    """
+
+    @staticmethod
+    def split_claims(text: str) -> List[str]:
+        return [c.strip() for c in _CLAIM_RE.split(text) if c and c.strip()]
+
+    def score_claims(self, claims: List[str], chunks: List[Chunk], docs_language: str) -> np.ndarray:
+        """Matriz (afirmaciones x fragmentos) de soporte en 0-1"""
+        analyzer = get_analyzer(docs_language)
+        chunk_terms = [analyzer.analyze(c.text) for c in chunks]
+
+        vocabulary: Dict[str, int] = {}
+        for terms in chunk_terms:
+            for term in terms:
+                vocabulary.setdefault(term, len(vocabulary))
+        chunk_bigrams = [set(zip(terms, terms[1:])) for terms in chunk_terms]
+
+        # Matriz binaria fragmentos x vocabulario
+        chunk_matrix = np.zeros((len(chunks), max(len(vocabulary), 1)), dtype=np.float32)
+        for i, terms in enumerate(chunk_terms):
+            chunk_matrix[i, [vocabulary[t] for t in set(terms)]] = 1.0
+        chunk_numbers = [_numbers(c.text) for c in chunks]
+        check_numbers = get_config().verifier.check_numbers
+
+        scores = np.zeros((len(claims), len(chunks)), dtype=np.float32)
+        for i, claim in enumerate(claims):
+            groups, claim_language = knowledge_base.analyze_query(claim, docs_language)
+            if not groups:
+                continue
+
+            # Grupos x vocabulario: un grupo casa si alguna alternativa aparece
+            group_matrix = np.zeros((len(groups), chunk_matrix.shape[1]), dtype=np.float32)
+            for g, group in enumerate(groups):
+                columns = [vocabulary[t] for t in group if t in vocabulary]
+                if columns:
+                    group_matrix[g, columns] = 1.0
+            coverage = ((group_matrix @ chunk_matrix.T) > 0).mean(axis=0)
+
+            if claim_language == analyzer.language:
+                claim_terms = analyzer.analyze(claim)
+                claim_bigrams = set(zip(claim_terms, claim_terms[1:]))
+                if claim_bigrams:
+                    bigram_overlap = np.array(
+                        [len(claim_bigrams & b) / len(claim_bigrams) for b in chunk_bigrams],
+                        dtype=np.float32
+                    )
+                    coverage = 0.6 * coverage + 0.4 * bigram_overlap
+
+            if check_numbers:
+                numbers = _numbers(claim)
+                if numbers:
+                    consistent = np.array([numbers <= n for n in chunk_numbers], dtype=np.float32)
+                    coverage = coverage * consistent
+
+            scores[i] = coverage
+        return scores
+
+    def verify(self, response: str, chunks: List[Chunk], docs_language: str) -> Dict[str, Any]:
+        """
+        Devuelve {"response", "claims", "checked", "supported", "downgraded"}.
+        Las afirmaciones sin soporte pasan de [NORMAL] a [ROJO].
+        """
+        config = get_config().verifier
+        segments = parse_segments(response)
+        normal_claims = [
+            (s_index, claim)
+            for s_index, segment in enumerate(segments) if segment.color == 'NORMAL'
+            for claim in self.split_claims(segment.text)
+        ]
+        if not normal_claims or not chunks:
+            return {"response": response, "claims": [], "checked": 0, "supported": 0, "downgraded": 0}
+
+        scores = self.score_claims([c for _, c in normal_claims], chunks, docs_language)
+
+        claims_meta = []
+        rebuilt: Dict[int, List[Segment]] = {}
+        for (s_index, claim), row in zip(normal_claims, scores):
+            supported = bool(row.max() >= config.support_threshold)
+            best = np.argsort(-row)[:3]
+            chunk_ids = [chunks[j].chunk_id for j in best if row[j] >= config.support_threshold]
+            claims_meta.append({
+                "text": claim,
+                "supported": supported,
+                "score": round(float(row.max()), 4),
+                "chunk_ids": chunk_ids
+            })
+            rebuilt.setdefault(s_index, []).append(Segment('NORMAL' if supported else 'ROJO', claim))
+
+        output: List[Segment] = []
+        for s_index, segment in enumerate(segments):
+            if s_index not in rebuilt:
+                output.append(segment)
+                continue
+            for k, claim_segment in enumerate(rebuilt[s_index]):
+                if k:
+                    output.append(Segment(None, " "))
+                output.append(claim_segment)
+
+        supported = sum(1 for c in claims_meta if c["supported"])
+        downgraded = len(claims_meta) - supported
+        if downgraded:
+            logger.info(f"🔎 Verificador: {downgraded}/{len(claims_meta)} afirmaciones sin soporte -> ROJO")
+        return {
+            "response": render_segments(output),
+            "claims": claims_meta,
+            "checked": len(claims_meta),
+            "supported": supported,
+            "downgraded": downgraded
+        }
+
+# Instancia global
+claim_verifier = ClaimVerifier()
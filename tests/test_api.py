@@ -11,6 +11,9 @@ from fastapi.testclient import TestClient
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.api.app import app
+from src.api.admission import AdmissionController, AdmissionRejected
+from src.core.config import AdmissionConfig, UploadConfig, get_config
+from src.rag.document_store import document_store
 
 client = TestClient(app)
 
@@ -123,6 +126,38 @@ class TestAPIEndpoints:
             
             response = client.post("/api/query", json=request_data)
             assert response.status_code == 200
+
+    def test_client_context_cannot_set_server_keys(self):
+        """Mode, key and deadline come from the request fields and headers, not from `context`"""
+        from src.core.metrics import mode_latency
+        response = client.post("/api/query", json={
+            "query": "Test query with context",
+            "context": {"forced_mode": "mode-from-client", "api_key": "sk-injected", "llm_options": {"max_tokens": 1}}
+        })
+        assert response.status_code == 200
+        assert "mode-from-client" not in mode_latency.snapshot()
+        assert response.json()["metadata"]["profile"]["mode"] == "auto"
+
+    def test_client_context_cannot_inject_documents(self, monkeypatch):
+        """Documents only arrive through the typed `user_documents` and `document_ids` fields"""
+        from src.core.subotai_core import SubotaiCore
+        contexts = []
+        process_query = SubotaiCore.process_query
+
+        async def capture(self, query, context=None):
+            contexts.append(dict(context))
+            return await process_query(self, query, context)
+        monkeypatch.setattr(SubotaiCore, "process_query", capture)
+
+        response = client.post("/api/query", json={
+            "query": "Test query with context",
+            "context": {
+                "stored_documents": [{"handle": "doc_fake"}],
+                "user_documents": [{"name": "big.txt", "content": "x " * 10}]
+            }
+        })
+        assert response.status_code == 200
+        assert "stored_documents" not in contexts[0] and "user_documents" not in contexts[0]
     
     def test_error_handling(self):
         """Test API error handling"""
@@ -134,6 +169,35 @@ class TestAPIEndpoints:
         # Should return validation error for too long query
         assert response.status_code in [200, 422]
     
+    def test_deadline_headers(self):
+        """Expired or malformed deadlines are rejected before any work"""
+        import time
+        response = client.post("/api/query", json={"query": "Test"},
+                               headers={"X-Deadline": str(time.time() - 10)})
+        assert response.status_code == 504
+
+        response = client.post("/api/query", json={"query": "Test"},
+                               headers={"X-Request-Timeout": "soon"})
+        assert response.status_code == 400
+
+    def test_static_assets_from_memory(self):
+        """Web interface is served precompressed with content-hash ETags"""
+        response = client.get("/app", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["cache-control"] == "no-cache"
+        etag = response.headers["etag"]
+
+        response = client.get("/app", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        response = client.get("/static/index.html", headers={"Accept-Encoding": "gzip;q=0, br;q=0"})
+        assert response.headers["content-encoding"] == "identity"
+        assert response.headers["content-type"] == "text/html; charset=utf-8"
+        response = client.get("/static/index.html", headers={"Accept-Encoding": "*;q=0.5, br;q=0"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert client.get("/static/missing.js").status_code == 404
+
     def test_api_root_endpoint(self):
         """Test API root endpoint"""
         response = client.get("/api/")
@@ -219,6 +283,242 @@ class TestAPIIntegration:
         assert 0 <= quality["response_quality_score"] <= 100
 
 
+class TestAdmissionControl:
+    """Admission controller: in-flight cap, bounded queues, priorities"""
+
+    def _controller(self):
+        return AdmissionController(AdmissionConfig(
+            max_in_flight=1,
+            max_queue_wait=1.0,
+            routes={"/api/query": "interactive", "/api/bulk": "batch"},
+            queue_sizes={"interactive": 1, "batch": 1}
+        ))
+
+    def test_rejects_when_queue_is_full(self):
+        import asyncio
+
+        async def scenario():
+            controller = self._controller()
+            await controller.acquire("/api/query")
+            waiter = asyncio.ensure_future(controller.acquire("/api/query"))
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected) as exc:
+                await controller.acquire("/api/query")
+            assert exc.value.reason == "queue_full"
+            assert exc.value.retry_after >= 1
+            controller.release("/api/query")
+            await waiter
+            return controller.get_stats()
+
+        stats = asyncio.run(scenario())
+        assert stats["rejected"]["/api/query"]["queue_full"] == 1
+        assert stats["admitted"]["/api/query"] == 2
+
+    def test_interactive_served_before_batch(self):
+        import asyncio
+
+        async def scenario():
+            controller = self._controller()
+            await controller.acquire("/api/query")
+            order = []
+
+            async def wait(route):
+                await controller.acquire(route)
+                order.append(route)
+                controller.release(route)
+
+            batch = asyncio.ensure_future(wait("/api/bulk"))
+            await asyncio.sleep(0)
+            interactive = asyncio.ensure_future(wait("/api/query"))
+            await asyncio.sleep(0)
+            controller.release("/api/query")
+            await asyncio.gather(batch, interactive)
+            return order
+
+        assert asyncio.run(scenario()) == ["/api/query", "/api/bulk"]
+
+    def test_admission_stats_endpoint(self):
+        response = client.get("/api/admission")
+        assert response.status_code == 200
+        data = response.json()
+        assert "queue_depth" in data
+        assert "rejected" in data
+
+    def test_shed_requests_and_preflights_keep_cors(self, monkeypatch):
+        from src.api.app import admission_controller
+
+        async def reject(route):
+            raise AdmissionRejected(route, "queue_full", 1)
+
+        monkeypatch.setattr(admission_controller, "acquire", reject)
+        origin = {"Origin": "https://example.com"}
+        preflight = client.options("/api/query", headers={**origin, "Access-Control-Request-Method": "POST"})
+        assert preflight.status_code == 200
+
+        response = client.post("/api/query", json={"query": "hola"}, headers=origin)
+        assert response.status_code == 503
+        assert "access-control-allow-origin" in response.headers
+
+
+
+class TestDocumentUploads:
+    """Streaming document uploads referenced by handle"""
+
+    auth = {"Authorization": "Bearer sk-owner"}
+
+    def test_multipart_upload_returns_handles(self):
+        files = [
+            ("files", ("volcanes.md", b"# Volcanes\n\nEl magma asciende por la chimenea.\n", "text/markdown")),
+            ("files", ("notas.txt", b"Primera nota.\n\nSegunda nota.\n", "text/plain")),
+        ]
+        assert client.post("/api/documents", files=files).status_code == 401
+        response = client.post("/api/documents", files=files, data={"comment": "ignored"}, headers=self.auth)
+        assert response.status_code == 200
+        documents = response.json()["documents"]
+        assert [d["name"] for d in documents] == ["volcanes.md", "notas.txt"]
+        assert documents[0]["format"] == "markdown"
+        assert documents[1]["chunks"] == 2
+
+        from src.llm.scheduler import llm_scheduler
+        stored = document_store.get(documents[0]["handle"], llm_scheduler.tenant_for("sk-owner"))
+        assert stored.chunks[0].doc_id == "USUARIO: volcanes.md"
+        assert client.delete(f"/api/documents/{documents[0]['handle']}", headers=self.auth).status_code == 200
+
+    def test_handles_are_private_to_the_uploading_key(self):
+        response = client.post("/api/documents", content=b"Texto plano.\n", headers={"X-Filename": "a.txt", **self.auth})
+        handle = response.json()["documents"][0]["handle"]
+        other = {"Authorization": "Bearer sk-other"}
+
+        query = {"query": "Test", "document_ids": [handle]}
+        assert client.post("/api/query", json=query, headers=other).status_code == 404
+        assert client.post("/api/query", json=query).status_code == 404
+        assert client.delete(f"/api/documents/{handle}").status_code == 401
+        assert client.delete(f"/api/documents/{handle}", headers=other).status_code == 404
+
+        assert client.post("/api/query", json=query, headers=self.auth).status_code == 200
+        assert client.delete(f"/api/documents/{handle}", headers=self.auth).status_code == 200
+
+    def test_raw_upload_and_limits(self):
+        response = client.post("/api/documents", content=b"Texto plano.\n", headers={"X-Filename": "a.txt", **self.auth})
+        assert response.json()["documents"][0]["name"] == "a.txt"
+
+        config = get_config()
+        original = config.uploads
+        config.uploads = UploadConfig(max_file_bytes=16, max_files=1)
+        try:
+            response = client.post("/api/documents", content=b"x" * 64, headers={"X-Filename": "big.txt", **self.auth})
+            assert response.status_code == 413
+            files = [("f", ("a.txt", b"a", "text/plain")), ("f", ("b.txt", b"b", "text/plain"))]
+            assert client.post("/api/documents", files=files, headers=self.auth).status_code == 413
+        finally:
+            config.uploads = original
+
+    def test_inline_documents_are_typed_and_bounded(self):
+        too_many = [{"name": f"d{i}.txt", "content": "x"} for i in range(17)]
+        response = client.post("/api/query", json={"query": "Test", "user_documents": too_many})
+        assert response.status_code == 422
+
+        response = client.post("/api/query", json={"query": "Test", "user_documents": [{"content": "sin nombre"}]})
+        assert response.status_code == 422
+
+    def test_query_with_unknown_handle(self):
+        response = client.post("/api/query", json={"query": "Test", "document_ids": ["doc_missing"]})
+        assert response.status_code == 404
+
+
+
+class TestAdminConfig:
+    """Hot-reloadable configuration through admin endpoints"""
+
+    def test_admin_disabled_without_token(self, monkeypatch):
+        monkeypatch.delenv("SUBOTAI_ADMIN_TOKEN", raising=False)
+        assert client.get("/api/admin/config").status_code == 403
+
+    def test_patch_applies_without_restart(self, monkeypatch):
+        from src.core.config import config_manager
+        monkeypatch.setenv("SUBOTAI_ADMIN_TOKEN", "secret")
+        headers = {"X-Admin-Token": "secret"}
+        try:
+            assert client.get("/api/admin/config", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+            response = client.patch("/api/admin/config", json={"llm": {"timeout": 12}}, headers=headers)
+            assert response.status_code == 200
+            assert response.json()["config"]["llm"]["timeout"] == 12.0
+            assert get_config().llm.timeout == 12.0
+
+            response = client.patch("/api/admin/config", json={"llm": {"timeout": "soon"}}, headers=headers)
+            assert response.status_code == 400
+        finally:
+            client.post("/api/admin/config/reload", headers=headers)
+        assert get_config().llm.timeout == config_manager.config.llm.timeout == 30.0
+
+    def test_patch_rejects_values_of_the_wrong_type(self, monkeypatch):
+        """Optional fields are checked against their annotation, not the current None"""
+        monkeypatch.setenv("SUBOTAI_ADMIN_TOKEN", "secret")
+        headers = {"X-Admin-Token": "secret"}
+        try:
+            for overrides in ({"modes": {"normal": {"top_k": "3"}}},
+                              {"modes": {"normal": {"verify": 1}}},
+                              {"modes": {"fast": {"models": {"openai": 4}}}},
+                              {"llm": {"timeout": None}}):
+                response = client.patch("/api/admin/config", json=overrides, headers=headers)
+                assert response.status_code == 400, overrides
+            assert get_config().modes.normal.top_k is None
+
+            response = client.patch("/api/admin/config", json={"modes": {"normal": {"top_k": 3}}}, headers=headers)
+            assert response.status_code == 200
+            assert get_config().modes.normal.top_k == 3
+        finally:
+            client.post("/api/admin/config/reload", headers=headers)
+
+    def test_query_log_summary_uses_installed_documents(self, monkeypatch, tmp_path):
+        from src.rag.knowledge_base import knowledge_base
+        monkeypatch.setenv("SUBOTAI_ADMIN_TOKEN", "secret")
+        (tmp_path / "docs").mkdir()
+        (tmp_path / "docs" / "importado.txt").write_text("Texto.\n", encoding="utf-8")
+        monkeypatch.setattr(knowledge_base, "documents_path", str(tmp_path / "docs"))
+        monkeypatch.setattr(get_config().query_log, "directory", str(tmp_path / "logs"))
+
+        response = client.get("/api/admin/query-log", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert response.json()["summary"]["never_retrieved"] == ["importado.txt"]
+
+
+class TestAdminProfiling:
+    """Time-boxed CPU profiles and tracemalloc snapshots, admin only"""
+
+    def test_cpu_profile_returns_collapsed_stacks(self, monkeypatch):
+        monkeypatch.setenv("SUBOTAI_ADMIN_TOKEN", "secret")
+        headers = {"X-Admin-Token": "secret"}
+        assert client.post("/api/admin/profile/cpu?seconds=0.1").status_code == 401
+
+        response = client.post("/api/admin/profile/cpu?seconds=0.2&interval_ms=2&idle=true", headers=headers)
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() and ";" in line for line in lines)
+
+        response = client.post("/api/admin/profile/cpu?seconds=0.1&mode=cprofile", headers=headers)
+        assert response.status_code == 200 and "function calls" in response.text
+
+    def test_memory_snapshot_and_diff(self, monkeypatch):
+        import tracemalloc
+        monkeypatch.setenv("SUBOTAI_ADMIN_TOKEN", "secret")
+        headers = {"X-Admin-Token": "secret"}
+        assert client.get("/api/admin/profile/memory/snapshot", headers=headers).status_code == 409
+        try:
+            assert client.post("/api/admin/profile/memory/start", headers=headers).json()["tracing"] is True
+            snapshot = client.get("/api/admin/profile/memory/snapshot?baseline=true&top=5", headers=headers).json()
+            assert set(snapshot["areas"]) == {"knowledge_base", "caches", "request_buffers"}
+            assert len(snapshot["top"]) <= 5
+
+            client.post("/api/query", json={"query": "test", "user_documents": [{"name": "a.txt", "content": "x " * 5000}]})
+            diff = client.get("/api/admin/profile/memory/diff", headers=headers).json()
+            assert "size_diff_bytes" in diff and diff["top"]
+        finally:
+            client.post("/api/admin/profile/memory/stop", headers=headers)
+        assert not tracemalloc.is_tracing()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
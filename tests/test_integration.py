@@ -108,3 +108,541 @@ def test_error_handling():
     
     assert 'response' in result
     assert 'metadata' in result
+
+
+def test_extractive_fast_path_skips_llm(tmp_path, monkeypatch):
+    """FAQ matches are answered from the knowledge base without an LLM call"""
+    import asyncio
+    from src.core import subotai_core
+    from src.rag.knowledge_base import KnowledgeBase
+
+    (tmp_path / "faq.md").write_text(
+        "## ¿Dónde se piden las vacaciones?\n\nEn el portal del empleado.\n", encoding="utf-8"
+    )
+    monkeypatch.setattr(subotai_core, "knowledge_base", KnowledgeBase(documents_path=str(tmp_path)))
+
+    async def no_llm(*args, **kwargs):
+        raise AssertionError("LLM should not be called")
+    monkeypatch.setattr(subotai_core.rag_orchestrator, "generate_response", no_llm)
+
+    core = SubotaiCore()
+    result = asyncio.run(core.process_query("¿Dónde se piden las vacaciones?", {"api_key": "sk-test"}))
+
+    assert result["metadata"]["mode"] == "extractive"
+    assert result["metadata"]["llm_calls"] == 0
+    assert "[NORMAL]En el portal del empleado.[/NORMAL]" == result["response"]
+
+
+def test_llm_client_skips_call_without_deadline_budget():
+    """The upstream call is not started when the deadline cannot be met"""
+    import asyncio
+    from src.core.deadline import Deadline
+    from src.llm.llm_client import llm_client
+
+    result = asyncio.run(llm_client.query(
+        prompt="Hi", api_key="sk-test", provider="openai", deadline=Deadline.from_timeout(0.1)
+    ))
+
+    assert result["success"] is False
+    assert result["deadline_exceeded"] is True
+
+
+def test_run_cancellable_cancels_work_on_deadline():
+    """Pending work is cancelled once the request deadline passes"""
+    import asyncio
+    from src.api.cancellation import run_cancellable
+    from src.core.deadline import Deadline, DeadlineExceeded
+
+    class ConnectedRequest:
+        class url:
+            path = "/api/query"
+
+        async def is_disconnected(self):
+            return False
+
+    cancelled = []
+
+    async def slow_work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        with pytest.raises(DeadlineExceeded):
+            await run_cancellable(ConnectedRequest(), slow_work(), Deadline.from_timeout(0.05))
+
+    asyncio.run(scenario())
+    assert cancelled == [True]
+
+
+def test_llm_client_sends_and_parses_raw_json_bytes(monkeypatch):
+    """Provider payloads are encoded once to bytes and parsed from raw content"""
+    import asyncio
+    import httpx
+    from src.core.serialization import dumps, loads
+    from src.llm.llm_client import llm_client
+
+    sent = {}
+
+    def provider(request):
+        sent.update(loads(request.content))
+        body = {"model": "gpt-test", "choices": [{"message": {"content": "hola ñ"}}]}
+        return httpx.Response(200, content=dumps(body))
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(provider), **kwargs))
+
+    result = asyncio.run(llm_client.query(prompt="Hola", api_key="sk-test", provider="openai"))
+
+    assert sent["messages"] == [{"role": "user", "content": "Hola"}]
+    assert result["success"] is True
+    assert result["response"] == "hola ñ"
+
+
+def test_llm_scheduler_serves_interactive_tenant_ahead_of_bulk_backlog():
+    """Deficit round-robin: a light interactive tenant is not stuck behind a heavy batch tenant"""
+    import asyncio
+    from src.core.config import SchedulerConfig
+    from src.llm.scheduler import LLMScheduler
+
+    scheduler = LLMScheduler(SchedulerConfig(max_concurrent=1, quantum=100))
+    order = []
+
+    async def call(tenant, workload):
+        await scheduler.acquire(tenant, workload, cost=300)
+        order.append(tenant)
+        await asyncio.sleep(0)
+        scheduler.release()
+
+    async def scenario():
+        await scheduler.acquire("other", "interactive")  # holds the only slot
+        heavy = [asyncio.create_task(call("heavy", "batch")) for _ in range(10)]
+        await asyncio.sleep(0)
+        light = [asyncio.create_task(call("light", "interactive")) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        cancelled = asyncio.create_task(scheduler.acquire("light", "warmup"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+
+        scheduler.release()
+        await asyncio.gather(*heavy, *light)
+
+    asyncio.run(scenario())
+
+    assert order[:4].count("light") == 3
+    assert order.count("heavy") == 10
+    stats = scheduler.get_stats()
+    assert stats["in_flight"] == 0 and stats["queues"] == []
+    assert stats["classes"]["interactive"]["dispatched"] == 4
+    assert stats["classes"]["batch"]["wait"]["count"] == 10
+
+
+def test_llm_scheduler_rejects_zero_weights_and_still_serves_them():
+    """A weight of 0 is refused by the config; a scheduler built with one still makes progress"""
+    import asyncio
+    from src.core.config import ConfigManager, SchedulerConfig, SubotaiConfig
+    from src.llm.scheduler import LLMScheduler
+
+    manager = ConfigManager(SubotaiConfig())
+    for overrides in ({"class_weights": {"batch": 0}}, {"tenant_weights": {"abc": -1}}, {"quantum": 0}):
+        with pytest.raises(ValueError):
+            manager.update({"scheduler": overrides})
+    assert manager.config.scheduler.class_weights["batch"] == 2.0
+
+    scheduler = LLMScheduler(SchedulerConfig(max_concurrent=1, class_weights={"batch": 0.0}))
+
+    async def scenario():
+        await scheduler.acquire("other", "batch")  # holds the only slot
+        waiting = asyncio.create_task(scheduler.acquire("heavy", "batch", cost=5))
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(scenario())
+    assert scheduler.get_stats()["classes"]["batch"]["dispatched"] == 2
+
+
+def test_config_loads_file_then_env_and_swaps_on_update(tmp_path):
+    """File overrides defaults, SUBOTAI__* env vars override the file"""
+    import json
+    from src.core.config import ConfigManager, load_config
+
+    path = tmp_path / "subotai.json"
+    path.write_text(json.dumps({"llm": {"timeout": 20, "max_tokens": 500}, "retrieval": {"top_k": 4}}))
+    config = load_config(str(path), environ={"SUBOTAI__LLM__TIMEOUT": "12.5", "SUBOTAI__RETRIEVAL__DEDUP_ENABLED": "false",
+                                             "SUBOTAI__MODES__NORMAL__TOP_K": "6"})
+
+    assert config.llm.timeout == 12.5
+    assert config.modes.normal.top_k == 6
+    assert config.llm.max_tokens == 500
+    assert config.retrieval.top_k == 4
+    assert config.retrieval.dedup_enabled is False
+
+    manager = ConfigManager(config)
+    seen = []
+    manager.subscribe(lambda new: seen.append(new.llm.max_connections))
+    manager.update({"llm": {"max_connections": 5}})
+    assert manager.config.llm.max_connections == 5
+    assert config.llm.max_connections == 20  # the previous snapshot is untouched
+    assert seen == [5] and manager.version == 2
+
+    with pytest.raises(ValueError):
+        manager.update({"llm": {"unknown": 1}})
+
+
+def test_quality_metrics_engine_scores_locally(tmp_path):
+    """Grounded answers score lower truth risk than unverified ones; weights and thresholds apply"""
+    from src.core.config import QualityGateConfig, get_config
+    from src.logic.quality_metrics import QualityMetricsEngine
+    from src.rag.knowledge_base import KnowledgeBase
+
+    (tmp_path / "ciencia.txt").write_text("El agua hierve a 100 grados al nivel del mar.\n", encoding="utf-8")
+    kb = KnowledgeBase(documents_path=str(tmp_path))
+    query = "¿A qué temperatura hierve el agua?"
+    retrieval = kb.retrieve(query)
+    engine = QualityMetricsEngine()
+
+    grounded = engine.evaluate(query, "[NORMAL]El agua hierve a 100 grados al nivel del mar.[/NORMAL]", retrieval)
+    unverified = engine.evaluate(query, "[ROJO]Depende mucho de lo que quieras, la verdad.[/ROJO]")
+
+    metrics = grounded["quality_metrics"]
+    assert set(metrics) >= {"clarity_score", "truth_risk", "execution_score", "strategy_score", "response_quality_score"}
+    assert metrics["truth_risk"] < unverified["quality_metrics"]["truth_risk"]
+    assert metrics["response_quality_score"] > unverified["quality_metrics"]["response_quality_score"]
+    assert "high_truth_risk" in unverified["quality_metrics"]["issues_detected"]
+    assert unverified["quality_gate"]["gate_result"] == "critical"
+    assert grounded["truth_risk_score"] == metrics["truth_risk"]
+
+    config = get_config()
+    original = config.quality_gate
+    config.quality_gate = QualityGateConfig(metric_weights={"clarity": 1.0, "truth_risk": 0, "execution": 0, "strategy": 0})
+    try:
+        clarity_only = engine.evaluate(query, "[NORMAL]El agua hierve a 100 grados al nivel del mar.[/NORMAL]", retrieval)
+        assert clarity_only["quality_metrics"]["response_quality_score"] == clarity_only["quality_metrics"]["clarity_score"]
+    finally:
+        config.quality_gate = original
+
+
+def test_fast_mode_profile_top1_small_model_and_cache_first(tmp_path, monkeypatch):
+    """FAST packs one chunk, asks the profile model, answers repeats from cache and records latency"""
+    import asyncio
+    from src.core import subotai_core
+    from src.core.metrics import mode_latency
+    from src.rag.knowledge_base import KnowledgeBase
+
+    (tmp_path / "ciencia.txt").write_text(
+        "El agua hierve a 100 grados.\n\nEl agua se congela a 0 grados.\n", encoding="utf-8"
+    )
+    monkeypatch.setattr(subotai_core, "knowledge_base", KnowledgeBase(documents_path=str(tmp_path)))
+    calls = []
+
+    async def judge(**kwargs):
+        calls.append(kwargs)
+        return "[NORMAL]El agua hierve a 100 grados.[/NORMAL]"
+    monkeypatch.setattr(subotai_core.rag_orchestrator, "generate_response", judge)
+
+    core = SubotaiCore()
+    context = {"api_key": "sk-test", "forced_mode": "fast"}
+    first = asyncio.run(core.process_query("¿A qué temperatura hierve el agua?", dict(context)))
+    second = asyncio.run(core.process_query("¿A qué  temperatura hierve el agua?", dict(context)))
+
+    assert len(calls) == 1
+    assert calls[0]["models"] == {"openai": "gpt-4o-mini"} and calls[0]["max_tokens"] == 400
+    assert calls[0]["deadline"] is not None  # tight deadline from the profile
+    assert first["metadata"]["retrieval"]["chunk_ids"][:1] == ["ciencia.txt#0"]
+    assert "ciencia.txt#1" not in calls[0]["knowledge_content"]
+    assert first["metadata"]["verification"] is None
+    assert second["metadata"]["profile"]["cache_hit"] is True
+    assert mode_latency.snapshot()["fast"]["count"] >= 2
+
+
+def test_model_cascade_escalates_only_weak_answers(tmp_path, monkeypatch):
+    """The strong tier is called only when the cheap answer scores below threshold"""
+    import asyncio
+    from src.core import subotai_core
+    from src.core.config import get_config
+    from src.logic.cascade import model_cascade
+    from src.rag.knowledge_base import KnowledgeBase
+
+    (tmp_path / "ciencia.txt").write_text("El agua hierve a 100 grados al nivel del mar.\n", encoding="utf-8")
+    monkeypatch.setattr(subotai_core, "knowledge_base", KnowledgeBase(documents_path=str(tmp_path)))
+    monkeypatch.setattr(get_config().cascade, "enabled", True)
+    answers = {
+        "gpt-4o-mini": "[ROJO]No estoy seguro, quizás depende.[/ROJO]",
+        "gpt-4o": "[NORMAL]El agua hierve a 100 grados al nivel del mar.[/NORMAL]",
+    }
+    models = []
+
+    async def judge(**kwargs):
+        models.append(kwargs["models"]["openai"])
+        return answers[models[-1]]
+    monkeypatch.setattr(subotai_core.rag_orchestrator, "generate_response", judge)
+
+    before = model_cascade.escalations
+    core = SubotaiCore()
+    result = asyncio.run(core.process_query("¿A qué temperatura hierve el agua?", {"api_key": "sk-test"}))
+
+    assert models == ["gpt-4o-mini", "gpt-4o"]
+    assert result["response"] == answers["gpt-4o"]
+    cascade = result["metadata"]["cascade"]
+    assert cascade["escalated"] is True and cascade["tiers"][0]["score"] < cascade["threshold"]
+    assert model_cascade.escalations == before + 1
+
+    answers["gpt-4o-mini"] = answers["gpt-4o"]
+    models.clear()
+    result = asyncio.run(core.process_query("¿A qué temperatura hierve el agua? ", {"api_key": "sk-test"}))
+    assert models == ["gpt-4o-mini"] and result["metadata"]["cascade"]["escalated"] is False
+
+    # Una advertencia en [ROJO] junto a la respuesta verificada no escala
+    answers["gpt-4o-mini"] = answers["gpt-4o"] + " [ROJO]En altitud puede ser menos.[/ROJO]"
+    models.clear()
+    result = asyncio.run(core.process_query("¿A qué temperatura hierve el agua?  ", {"api_key": "sk-test"}))
+    assert models == ["gpt-4o-mini"] and result["metadata"]["cascade"]["escalated"] is False
+
+
+def test_model_cascade_is_opt_in_and_keeps_short_direct_answers(monkeypatch):
+    """Off by default (client model kept); direct answers escalate only on a refusal, not for being short or hedged"""
+    import asyncio
+    from src.core.config import get_config
+    from src.logic.cascade import model_cascade
+
+    calls = []
+
+    def generate(answers):
+        async def call(llm_options):
+            calls.append(llm_options.get("models"))
+            return answers[len(calls) - 1]
+        return call
+
+    def assess(answer):
+        return {"response": answer, **model_cascade.score(answer, grounded=False)}
+
+    def run(answers, escalate=None):
+        calls.clear()
+        return asyncio.run(model_cascade.run(generate(answers), assess, {}, escalate=escalate))
+
+    assert get_config().cascade.enabled is False
+    assert model_cascade.first_options({}) == {}
+    assert run(["Canberra."])["cascade"] is None and calls == [None]
+
+    # Opt-in por perfil de modo
+    for answer in ("Canberra.", "It might be Canberra.", "Quizás Canberra."):
+        outcome = run([answer], escalate=True)
+        assert outcome["cascade"]["escalated"] is False and len(calls) == 1, answer
+    outcome = run(["I don't know.", "Canberra."], escalate=True)
+    assert outcome["cascade"]["escalated"] is True and outcome["response"] == "Canberra."
+    assert calls == [{"openai": "gpt-4o-mini", "deepseek": "deepseek-chat"}, {"openai": "gpt-4o", "deepseek": "deepseek-reasoner"}]
+
+
+def test_speculative_direct_call_overlaps_retrieval(tmp_path, monkeypatch):
+    """Off-topic: the speculative call is the answer; on-topic: it is parked for the raw pane or cancelled"""
+    import asyncio
+    from src.core import subotai_core
+    from src.core.config import get_config
+    from src.core.speculation import speculation
+    from src.logic import reasoning_engine
+    from src.rag.knowledge_base import KnowledgeBase
+
+    (tmp_path / "ciencia.txt").write_text("El agua hierve a 100 grados al nivel del mar.\n", encoding="utf-8")
+    monkeypatch.setattr(subotai_core, "knowledge_base", KnowledgeBase(documents_path=str(tmp_path)))
+    monkeypatch.setattr(get_config().speculation, "enabled", True)
+    calls = []
+
+    async def llm_query(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.05)
+        return {"success": True, "response": "Una respuesta directa del modelo sin documentos."}
+    monkeypatch.setattr(reasoning_engine.llm_client, "query", llm_query)
+
+    async def judge(**kwargs):
+        return "[NORMAL]El agua hierve a 100 grados al nivel del mar.[/NORMAL]"
+    monkeypatch.setattr(subotai_core.rag_orchestrator, "generate_response", judge)
+
+    async def scenario():
+        core = SubotaiCore()
+        off_topic = await core.process_query("¿Quién pintó la Gioconda?", {"api_key": "sk-test"})
+        assert len(calls) == 1 and "models" not in calls[0]  # cascada desactivada: modelo del cliente
+        assert off_topic["response"].startswith("[ROJO]Una respuesta directa")
+        assert off_topic["metadata"]["speculation"]["outcome"] == "used"
+
+        on_topic = await core.process_query("¿A qué temperatura hierve el agua?", {"api_key": "sk-test"})
+        assert on_topic["metadata"]["rag_used"] is True
+        assert on_topic["metadata"]["speculation"]["outcome"] == "parked"
+        parked = speculation.claim(speculation.key("sk-test", "openai", "¿A qué temperatura hierve el agua?"))
+        assert (await speculation.wait(parked))["success"] is True
+
+        monkeypatch.setattr(get_config().speculation, "keep_for_raw", False)
+        wasted = speculation.tokens_wasted
+        on_topic = await core.process_query("¿A qué temperatura hierve el agua?", {"api_key": "sk-test"})
+        assert on_topic["metadata"]["speculation"]["outcome"] == "cancelled"
+        assert speculation.tokens_wasted > wasted
+
+    asyncio.run(scenario())
+    stats = speculation.get_stats()
+    assert stats["used"] >= 1 and stats["raw_reused"] >= 1 and stats["cancelled"] >= 1
+
+
+def test_cache_warmer_ranks_corpus_and_fills_retrieval_cache(tmp_path, monkeypatch):
+    """Most frequent queries first; retrieval is cached without any LLM call"""
+    import asyncio
+    import json
+    from src.core import subotai_core
+    from src.core.config import get_config
+    from src.core.warmup import CacheWarmer, rank_queries, read_corpus
+    from src.rag.knowledge_base import KnowledgeBase
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "ciencia.txt").write_text("El agua hierve a 100 grados al nivel del mar.\n", encoding="utf-8")
+    kb = KnowledgeBase(documents_path=str(docs))
+    monkeypatch.setattr(subotai_core, "knowledge_base", kb)
+    core = SubotaiCore()
+    monkeypatch.setattr(subotai_core, "_subotai_instance", core)
+
+    corpus = tmp_path / "queries.jsonl"
+    corpus.write_text("\n".join(json.dumps(r) for r in [
+        {"query": "¿A qué temperatura hierve el agua?"},
+        {"title": "¿Quién pintó la Gioconda?"},
+        {"query": "¿a qué  temperatura hierve el agua?"},
+        {"unrelated": 1},
+    ]), encoding="utf-8")
+    assert rank_queries(read_corpus(str(corpus)), 10) == [
+        ("¿A qué temperatura hierve el agua?", 2), ("¿Quién pintó la Gioconda?", 1)
+    ]
+
+    async def judge(**kwargs):
+        raise AssertionError("warm-up must not call the LLM")
+    monkeypatch.setattr(subotai_core.rag_orchestrator, "generate_response", judge)
+    monkeypatch.setattr(get_config().warmup, "rate", 0)
+    monkeypatch.setattr(get_config().warmup, "top_n", 1)
+    logged = []
+    monkeypatch.setattr(subotai_core.query_log, "record", lambda query, context, result: logged.append(query))
+
+    stats = asyncio.run(CacheWarmer().run([str(corpus)]))
+
+    assert stats["status"] == "done" and stats["queries_ranked"] == 1 and stats["retrievals_warmed"] == 1
+    assert logged == []  # las consultas del pre-calentamiento no vuelven al registro
+    assert len(core.answer_cache) == 0
+    hits = kb.retrieval_cache.hits
+    kb.retrieve("¿A qué temperatura hierve el agua?")
+    assert kb.retrieval_cache.hits == hits + 1
+
+
+def test_answer_cache_is_per_tenant_and_corpus_version(tmp_path, monkeypatch):
+    """Cached answers are only served to the API key that paid for them, and never from a replaced corpus"""
+    import asyncio
+    from src.core import subotai_core
+    from src.rag.knowledge_base import KnowledgeBase
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "ciencia.txt").write_text("El agua hierve a 100 grados al nivel del mar.\n", encoding="utf-8")
+    kb = KnowledgeBase(documents_path=str(docs))
+    monkeypatch.setattr(subotai_core, "knowledge_base", kb)
+    core = SubotaiCore()
+
+    async def judge(**kwargs):
+        return "[NORMAL]El agua hierve a 100 grados al nivel del mar.[/NORMAL]"
+    monkeypatch.setattr(subotai_core.rag_orchestrator, "generate_response", judge)
+
+    def ask(api_key):
+        return asyncio.run(core.process_query("¿A qué temperatura hierve el agua?", {"api_key": api_key, "forced_mode": "fast"}))
+
+    assert ask("sk-user")["metadata"]["profile"]["cache_hit"] is False
+    assert ask("sk-user")["metadata"]["profile"]["cache_hit"] is True
+    assert ask("sk-other")["metadata"]["profile"]["cache_hit"] is False
+
+    # Re-importar el corpus invalida las respuestas del anterior
+    (docs / "ciencia.txt").write_text("El agua hierve a 70 grados en la cima del Everest.\n", encoding="utf-8")
+    kb.install(kb._load_documents())
+    assert ask("sk-user")["metadata"]["profile"]["cache_hit"] is False
+
+
+def test_query_log_writes_in_background_and_aggregates(tmp_path, monkeypatch, capsys):
+    """Records are length-prefixed, rotate by size and summarize into top questions, stages and unused documents"""
+    import asyncio
+    from src.core import subotai_core
+    from src.core.config import get_config
+    from src.core.query_log import QueryLog, log_files, main, read_log, summarize
+    from src.core.warmup import read_corpus
+    from src.rag.knowledge_base import KnowledgeBase
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "ciencia.txt").write_text("El agua hierve a 100 grados al nivel del mar.\n", encoding="utf-8")
+    (docs / "historia.txt").write_text("Roma fue fundada según la tradición en el año 753 a. C.\n", encoding="utf-8")
+    monkeypatch.setattr(subotai_core, "knowledge_base", KnowledgeBase(documents_path=str(docs)))
+    log = QueryLog()
+    monkeypatch.setattr(subotai_core, "query_log", log)
+    logs = tmp_path / "logs"
+    monkeypatch.setattr(get_config().query_log, "directory", str(logs))
+    monkeypatch.setattr(get_config().query_log, "flush_interval", 0.01)
+    monkeypatch.setattr(get_config().query_log, "max_file_bytes", 600)
+
+    async def judge(**kwargs):
+        return "[NORMAL]El agua hierve a 100 grados al nivel del mar.[/NORMAL]"
+    monkeypatch.setattr(subotai_core.rag_orchestrator, "generate_response", judge)
+
+    async def scenario():
+        assert log.start()
+        core = SubotaiCore()
+        for query in ["¿A qué temperatura hierve el agua?"] * 3 + ["¿Cuándo hierve el agua del mar?"]:
+            await core.process_query(query, {"api_key": "sk-test"})
+            await asyncio.sleep(0.03)  # the request path never writes; the writer does
+        await log.stop()
+
+    asyncio.run(scenario())
+    assert log.written == 4 and log.dropped == 0
+    assert len(log_files(str(logs))) > 1  # rotated by size
+
+    with open(log_files(str(logs))[-1], "ab") as f:
+        f.write(b"\x40\x00\x00\x00{truncated")  # crash while writing: ignored
+    records = list(read_log(str(logs)))
+    assert [r["query"] for r in records][:1] == ["¿A qué temperatura hierve el agua?"] and len(records) == 4
+    assert records[0]["chunks"] == ["ciencia.txt#0"] and "retrieval" in records[0]["timings"]
+
+    summary = summarize(records, ["ciencia.txt", "historia.txt"], top=1)
+    assert summary["top_questions"] == [("¿A qué temperatura hierve el agua?", 3)]
+    assert summary["never_retrieved"] == ["historia.txt"]
+    assert "generation" in summary["slowest_stages"]
+    assert list(read_corpus(str(logs)))[-1] == "¿Cuándo hierve el agua del mar?"
+
+    main([str(logs), "--documents", str(docs)])
+    assert "historia.txt" in capsys.readouterr().out
+
+
+def test_health_and_status_read_the_refreshed_snapshot(monkeypatch):
+    """Probes never call the sources; a failing provider degrades status but not health"""
+    import asyncio
+    from src.core.config import get_config
+    from src.llm.llm_client import llm_client
+
+    core = SubotaiCore()
+    calls = []
+    core.status_monitor.add_source("probe", lambda: calls.append(1) or {"calls": len(calls)})
+
+    for _ in range(100):
+        assert core.get_health()["status"] == "healthy"
+        core.get_system_status()
+    assert len(calls) == 1
+
+    monkeypatch.setattr(llm_client, "_providers", {})
+    for _ in range(llm_client.FAILING_AFTER):
+        llm_client._record("openai", False, "ConnectTimeout")
+    monkeypatch.setattr(get_config().status, "refresh_interval", 0.01)
+
+    async def refreshed():
+        core.status_monitor.start()
+        await asyncio.sleep(0.05)
+        await core.status_monitor.stop()
+    asyncio.run(refreshed())
+
+    status = core.get_system_status()
+    assert len(calls) > 1
+    assert status["status"] == "degraded"
+    assert status["subsystems"]["llm"]["providers"]["openai"]["state"] == "failing"
+    assert core.get_health()["status"] == "healthy"
@@ -0,0 +1,356 @@
+"""
+Tests for SUBOTAI retrieval pipeline (knowledge base, relevance gate, analyzers)
+"""
+
+import pytest
+from src.core.config import get_config
+from src.rag.analyzers import get_analyzer
+from src.rag.bulk_ingest import BulkIngestor, document_paths, main as bulk_ingest_main
+from src.rag.chunk_store import ChunkStore
+from src.rag.color_segments import segment_ratios
+from src.rag.compression import ContextCompressor
+from src.rag.dedup import MinHasher
+from src.rag.document_store import DocumentStore
+from src.rag.extractive import ExtractiveAnswerer, parse_faq
+from src.rag.ingestion import Chunk, DocumentIngestor
+from src.rag.knowledge_base import KnowledgeBase
+from src.rag.relevance_gate import RelevanceGate
+from src.rag.term_dictionary import TermDictionary
+from src.rag.verifier import ClaimVerifier
+
+
+@pytest.fixture
+def kb(tmp_path):
+    """Knowledge base over a small temporary corpus"""
+    (tmp_path / "ciencia.txt").write_text(
+        "EBULLICIÓN DEL AGUA: El agua hierve a 100 grados Celsius al nivel del mar.\n\n"
+        "VELOCIDAD DE LA LUZ: 299,792 kilómetros por segundo en el vacío.\n",
+        encoding="utf-8"
+    )
+    return KnowledgeBase(documents_path=str(tmp_path))
+
+
+def test_chunks_are_paragraphs(kb):
+    assert len(kb.chunks) == 2
+    assert kb.chunks[0].doc_id == "ciencia.txt"
+
+
+def test_chunk_store_views_share_one_buffer(kb, tmp_path):
+    store = kb.chunks
+    chunk = store[1]
+    assert chunk.chunk_id == "ciencia.txt#1" and chunk.source == "server"
+    assert chunk.text.startswith("VELOCIDAD DE LA LUZ")
+    assert chunk.data.obj is store.buffer.obj
+    assert chunk.tokens == len(chunk.text) // 4
+
+    store.save(str(tmp_path / "corpus.chunks"))
+    loaded = ChunkStore.load(str(tmp_path / "corpus.chunks"))
+    assert [c.to_chunk() for c in loaded] == [c.to_chunk() for c in store]
+    assert loaded.get_stats()["mmap"] is True
+    with pytest.raises(RuntimeError):
+        loaded.add(chunk.to_chunk())
+
+
+def test_bulk_ingest_in_process_pool_matches_serial_build(tmp_path):
+    for i, area in enumerate(["nóminas", "almacén", "logística", "compras", "calidad", "ventas"]):
+        (tmp_path / f"proc{i}.md").write_text(
+            f"# Procedimiento de {area}\n\nRevisar el acceso cada semana.\n\nCopia de respaldo de {area}.\n",
+            encoding="utf-8"
+        )
+    paths = document_paths(str(tmp_path))
+    serial = BulkIngestor().build(paths, workers=1, languages=["es"])
+    ingestor = BulkIngestor()
+    parallel = ingestor.build(paths, workers=2, languages=["es"])
+
+    assert ingestor.get_stats()["shards"]["done"] > 1 and ingestor.get_stats()["progress"] == 1.0
+    assert [c.to_chunk() for c in parallel.store] == [c.to_chunk() for c in serial.store]
+    assert parallel.indexes["es"].postings == serial.indexes["es"].postings
+    assert (parallel.signatures == serial.signatures).all()
+
+    kb = KnowledgeBase(documents_path=str(tmp_path / "vacio"))
+    kb.install(parallel, str(tmp_path))
+    assert kb.retrieve("copia de respaldo de compras").best_chunk.doc_id == "proc3.md"
+
+
+def test_bulk_ingest_output_is_loaded_by_the_server(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "ciencia.txt").write_text("EBULLICIÓN DEL AGUA: El agua hierve a 100 grados.\n", encoding="utf-8")
+    output = str(tmp_path / "corpus.chunks")
+    bulk_ingest_main([str(docs), "--workers", "1", "--output", output])
+
+    version = KnowledgeBase(documents_path=str(docs)).version
+    monkeypatch.setattr(get_config().ingestion, "corpus_file", output)
+    kb = KnowledgeBase(documents_path=str(tmp_path / "vacio"))
+    assert kb.chunks.get_stats()["mmap"] is True
+    assert "es" in kb.get_stats()["indexes"]
+    assert kb.version == version
+    assert kb.retrieve("¿A qué temperatura hierve el agua?").best_chunk.doc_id == "ciencia.txt"
+
+
+def test_relevance_gate_passes_on_topic_query(kb):
+    retrieval = kb.retrieve("¿A qué temperatura hierve el agua?")
+    gate = RelevanceGate().evaluate(retrieval)
+
+    assert gate["passed"] is True
+    assert gate["score"] >= get_config().retrieval.relevance_threshold
+    assert gate["best_chunk"] == "ciencia.txt#0"
+
+
+def test_relevance_gate_rejects_off_topic_query(kb):
+    retrieval = kb.retrieve("Best way to learn machine learning?")
+    gate = RelevanceGate().evaluate(retrieval)
+
+    # Corpus exists, but it cannot answer the question
+    assert retrieval.content
+    assert gate["passed"] is False
+    assert gate["reason"] == "below_threshold"
+
+
+def test_zero_match_query_does_not_materialise_the_corpus(tmp_path, monkeypatch):
+    from src.rag.chunk_store import ChunkView
+    (tmp_path / "largo.txt").write_text(
+        "\n\n".join(f"Sección {i}: el inventario del almacén {i} se revisa cada lunes." for i in range(300)),
+        encoding="utf-8"
+    )
+    kb = KnowledgeBase(documents_path=str(tmp_path))
+    views = []
+    original = ChunkView.__init__
+
+    def counting(self, store, row):
+        views.append(row)
+        original(self, store, row)
+    monkeypatch.setattr(ChunkView, "__init__", counting)
+
+    retrieval = kb.retrieve("Best way to learn machine learning?")
+    assert not retrieval.scored_chunks
+    assert len(retrieval.packed_chunks) == get_config().retrieval.top_k
+    assert len(views) <= get_config().retrieval.top_k
+
+
+def test_relevance_gate_scores_user_documents(kb):
+    user_docs = [{"name": "manual.txt", "content": "El backup nocturno se lanza a las 02:00."}]
+    retrieval = kb.retrieve("¿A qué hora se lanza el backup nocturno?", user_documents=user_docs)
+    gate = RelevanceGate().evaluate(retrieval)
+
+    assert gate["passed"] is True
+    assert retrieval.best_chunk.source == "user"
+
+
+def test_analyzer_light_stemming_per_language():
+    assert get_analyzer("es").analyze("las velocidades") == get_analyzer("es").analyze("velocidad")
+    assert get_analyzer("en").analyze("the boiling") == ["boil"]
+    # CJK text is indexed by character bigrams
+    assert get_analyzer("zh").analyze("沸点") == ["沸点"]
+
+
+def test_unknown_documents_language_falls_back_without_new_indexes(kb):
+    from src.rag.analyzers import SUPPORTED_LANGUAGES, normalize_language
+    assert normalize_language("pt-BR") == "pt"
+    assert get_analyzer("zz") is get_analyzer("es")
+
+    kb.retrieve("agua", docs_language="es")
+    for code in ("zz", "qq-1", "x" * 40):
+        assert kb.retrieve("agua", docs_language=code).docs_language == "es"
+    assert list(kb._indexes) == ["es"]
+    assert "zz" not in SUPPORTED_LANGUAGES
+
+
+def test_cross_lingual_retrieval_uses_term_dictionary(kb):
+    retrieval = kb.retrieve("What is the speed of light?", docs_language="es")
+
+    assert retrieval.query_language == "en"
+    assert retrieval.best_chunk.chunk_id == "ciencia.txt#1"
+    assert RelevanceGate().evaluate(retrieval)["passed"] is True
+
+
+def test_term_dictionary_is_pluggable_and_cached(tmp_path):
+    dictionary = TermDictionary(dictionaries_path=str(tmp_path))
+    dictionary.register("fr", "es", {"lumière": ["luz"]})
+    term = get_analyzer("fr").analyze("lumière")[0]
+
+    assert dictionary.translate(term, "fr", "es") == frozenset({"luz"})
+    assert dictionary.translate(term, "fr", "es") == frozenset({"luz"})
+    assert dictionary.get_stats()["cache_hits"] == 1
+    # Pairs are registered in both directions by default
+    assert dictionary.translate("luz", "es", "fr") == frozenset({term})
+
+
+def test_ingestion_splits_markdown_by_headings_with_offsets(tmp_path):
+    path = tmp_path / "manual.md"
+    data = "# Backups\n\nSe lanzan a las 02:00.\n\n## Contraseñas\nCaducan cada 90 días.\n"
+    path.write_text(data, encoding="utf-8")
+
+    chunks = list(DocumentIngestor().ingest_file(str(path)))
+
+    assert [c.heading for c in chunks] == ["Backups", "Contraseñas"]
+    raw = data.encode("utf-8")
+    for chunk in chunks:
+        assert raw[chunk.start:chunk.end].decode("utf-8").strip() == chunk.text
+
+
+def test_ingestion_bounds_huge_paragraphs(tmp_path):
+    path = tmp_path / "grande.txt"
+    path.write_text("línea de relleno\n" * 5000, encoding="utf-8")
+
+    chunks = list(DocumentIngestor(max_chunk_chars=1000).ingest_file(str(path)))
+
+    assert len(chunks) > 50
+    assert all(len(c.text) <= 1100 for c in chunks)
+
+
+def test_user_documents_use_same_pipeline(kb):
+    ingestor = DocumentIngestor()
+    text = "# FAQ\n\nTexto uno.\n\nTexto dos.\n"
+    server_like = [c.text for c in ingestor.ingest_text("faq.md", text, source="server")]
+    user = kb._build_user_chunks([{"name": "faq.md", "content": text}])
+
+    assert [c.text for c in user] == server_like
+    assert all(c.source == "user" for c in user)
+
+
+def test_stored_documents_are_retrieved_by_handle(kb):
+    import io
+    store = DocumentStore()
+    data = b"Los volcanes expulsan magma y ceniza.\n"
+    document = store.chunk("volcanes.txt", io.BytesIO(data), len(data), tenant="t1")
+    assert store.get_stats()["documents"] == 0  # troceado sin tocar el almacén
+    store.put(document)
+
+    assert store.resolve([document.handle, document.handle], "t1") == [document]
+    with pytest.raises(KeyError):
+        store.resolve([document.handle], "t2")
+    assert store.remove(document.handle, "t2") is False
+    retrieval = kb.retrieve("¿Qué expulsan los volcanes?", stored_documents=[document])
+    assert retrieval.best_chunk.doc_id == "USUARIO: volcanes.txt"
+    assert "es" in document._indexes  # indexado una vez, reutilizado en consultas
+
+
+def test_near_duplicates_collapse_preferring_server_copy(kb):
+    copy = "EBULLICIÓN DEL AGUA: El agua hierve a 100 grados Celsius al nivel del mar!"
+    user_docs = [{"name": "copia.txt", "content": copy}, {"name": "copia2.txt", "content": copy}]
+    retrieval = kb.retrieve("¿A qué temperatura hierve el agua?", user_documents=user_docs)
+
+    ids = [chunk.chunk_id for chunk, _ in retrieval.scored_chunks]
+    assert "ciencia.txt#0" in ids
+    assert not any(chunk.source == "user" for chunk, _ in retrieval.scored_chunks)
+    assert retrieval.duplicates_collapsed == 2
+    assert retrieval.to_metadata()["dedup_tokens_saved"] > 0
+
+
+def test_mode_top_k_bounds_reported_chunks(kb):
+    retrieval = kb.retrieve("¿A qué temperatura hierve el agua?", top_k=1)
+    assert retrieval.top_k == 1
+    assert len(retrieval.to_metadata()["chunk_ids"]) == 1
+    assert len(retrieval.packed_chunks) == 1
+
+
+def test_retrieval_caches_survive_concurrent_threads(kb, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr(get_config().caches, "retrieval_size", 2)
+    queries = [f"¿A qué temperatura hierve el agua {i}?" for i in range(8)] * 50
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(kb.retrieve, queries))
+
+    assert all(r.best_chunk.chunk_id == "ciencia.txt#0" for r in results)
+    assert len(kb.retrieval_cache) <= 2
+
+
+def test_minhash_similarity_separates_distinct_text():
+    hasher = MinHasher()
+    a = hasher.signature("el agua hierve a 100 grados celsius al nivel del mar")
+    b = hasher.signature("la luz recorre 299792 kilómetros por segundo en el vacío")
+    assert MinHasher.similarity(a, a) == 1.0
+    assert MinHasher.similarity(a, b) < 0.2
+
+
+def test_compression_keeps_relevant_sentences_with_attribution(tmp_path):
+    filler = " ".join(f"El departamento {i} revisa inventario trimestral de material." for i in range(12))
+    (tmp_path / "manual.txt").write_text(
+        f"{filler} La contraseña del wifi caduca cada 90 días. {filler}\n", encoding="utf-8"
+    )
+    kb = KnowledgeBase(documents_path=str(tmp_path))
+    retrieval = kb.retrieve("¿Cada cuánto caduca la contraseña del wifi?")
+
+    result = ContextCompressor().compress_retrieval(retrieval)
+
+    assert "caduca cada 90 días" in result["content"]
+    assert "[manual.txt#0]" in result["content"]
+    assert result["stats"]["ratio"] <= 0.5
+
+
+@pytest.fixture
+def faq_kb(tmp_path):
+    (tmp_path / "faq.md").write_text(
+        "# Preguntas frecuentes\n\n"
+        "## ¿Cómo reseteo mi contraseña del correo?\n\n"
+        "Entra en intranet > Perfil > Seguridad y pulsa 'Restablecer'.\n\n"
+        "P: ¿Dónde se piden las vacaciones?\nR: En el portal del empleado, sección Ausencias.\n",
+        encoding="utf-8"
+    )
+    return KnowledgeBase(documents_path=str(tmp_path))
+
+
+def test_extractive_answer_for_faq_heading(faq_kb):
+    retrieval = faq_kb.retrieve("¿Cómo reseteo la contraseña del correo?")
+    answer = ExtractiveAnswerer().answer(retrieval)
+
+    assert answer is not None
+    assert answer["response"].startswith("[NORMAL]Entra en intranet")
+    assert answer["chunk_id"] == "faq.md#0"
+
+
+def test_extractive_answer_for_question_answer_pair(faq_kb):
+    retrieval = faq_kb.retrieve("¿Dónde se piden las vacaciones?")
+    answer = ExtractiveAnswerer().answer(retrieval)
+
+    assert "portal del empleado" in answer["response"]
+
+
+def test_extractive_answer_respects_mode(faq_kb):
+    retrieval = faq_kb.retrieve("¿Cómo reseteo la contraseña del correo?")
+
+    assert ExtractiveAnswerer().answer(retrieval, mode="strict") is None
+    # Forced mode answers even on a weak match
+    weak = faq_kb.retrieve("contraseña")
+    assert ExtractiveAnswerer().answer(weak, mode="extractive")["forced"] is True
+
+
+def test_rhetorical_questions_in_prose_are_not_faq(tmp_path):
+    """A leading question only counts in FAQ documents, with the answer in its own paragraph"""
+    prose = "¿Por qué importa la seguridad? Porque un descuido expone los datos de todos."
+    assert parse_faq(Chunk("manual.md#0", "manual.md", prose)) is None
+    assert parse_faq(Chunk("faq.md#0", "faq.md", prose)) is None
+    paragraph = "¿Por qué importa la seguridad?\n\nPorque un descuido expone los datos de todos."
+    assert parse_faq(Chunk("manual.md#0", "manual.md", paragraph)) is None
+    assert parse_faq(Chunk("faq.md#0", "faq.md", paragraph)) == (
+        "¿Por qué importa la seguridad?", "Porque un descuido expone los datos de todos."
+    )
+
+    (tmp_path / "manual.md").write_text(f"{prose}\n", encoding="utf-8")
+    retrieval = KnowledgeBase(documents_path=str(tmp_path)).retrieve("¿Por qué importa la seguridad?")
+    assert retrieval.scored_chunks
+    assert ExtractiveAnswerer().answer(retrieval) is None
+
+
+def test_verifier_downgrades_unsupported_claims(kb):
+    retrieval = kb.retrieve("¿A qué temperatura hierve el agua?")
+    response = (
+        "[NORMAL]El agua hierve a 100 grados Celsius al nivel del mar.[/NORMAL] "
+        "[AZUL]A más altitud hierve antes.[/AZUL] "
+        "[NORMAL]El agua hierve a 90 grados.[/NORMAL]"
+    )
+
+    result = ClaimVerifier().verify(response, retrieval.packed_chunks, "es")
+
+    assert result["checked"] == 2
+    assert result["downgraded"] == 1
+    assert result["claims"][0]["chunk_ids"] == ["ciencia.txt#0"]
+    assert "[ROJO]El agua hierve a 90 grados.[/ROJO]" in result["response"]
+    assert "[AZUL]A más altitud hierve antes.[/AZUL]" in result["response"]
+
+
+def test_color_segment_ratios():
+    ratios = segment_ratios("[NORMAL]aaaa[/NORMAL][ROJO]bbbb[/ROJO]")
+    assert ratios["NORMAL"] == 0.5 and ratios["ROJO"] == 0.5 and ratios["AZUL"] == 0.0